@@ -1,6 +1,12 @@
 __version__ = "0.2.0"
+from .api import PhotoPipeline, apply_plan, dedupe_archive
 from .config_loader import load_config
+from .options import RunOptions
 
 __all__ = [
+    "PhotoPipeline",
+    "apply_plan",
+    "dedupe_archive",
     "load_config",
-]
\ No newline at end of file
+    "RunOptions",
+]
@@ -0,0 +1,132 @@
+from pathlib import Path
+
+from . import dedupe, planner
+from .bulk_photo_mover import move_photos
+from .bulk_photo_processor import process_photos, watch_photos
+from .bulk_photo_renamer import rename_photos
+from .ingest import ingest_sources
+from .options import RunOptions
+from .pipeline import PIPELINE_MODES
+from .reporting import CallbackReporter
+from .sharding import parse_shard
+
+
+class PhotoPipeline:
+    """
+    Rename and move photos from one or more sources, for use from other programs.
+
+    `options` (a RunOptions, or keyword `settings`) say how, as for
+    process_photos(), move_photos() and rename_photos(). Nothing is
+    printed: progress and per-file events are handed to
+    `on_progress(done)` and `on_event(event)` (see
+    reporting.CallbackReporter), or to any reporting.Reporter given as
+    `reporter`. Errors are raised as exceptions. Example:
+
+        pipeline = PhotoPipeline("/media/sd/DCIM", "/archive", workers=4,
+                                 on_event=lambda event: log.info(event))
+        counts = pipeline.run()
+
+    `sources` is a folder or a list of folders; several folders are only
+    supported in 'full' mode and are ingested side by side (see
+    ingest.ingest_sources()). `target` is not needed in 'rename-only' mode.
+    `shard` ('i/N' or a sharding.Shard) limits the run to one of N parts
+    of the sources, so N processes or hosts can split one import.
+    `link_mode` 'hardlink', 'reflink' or 'copy' keeps the sources and is
+    not used in 'rename-only' mode. `disk_order` 'inode' or 'extent'
+    reads each source folder in disk order, which renames do not need.
+    Besides run(), a pipeline can watch() its source or plan() its work
+    for apply_plan().
+    """
+
+    def __init__(self, sources, target=None, mode="full", options=None, on_progress=None, on_event=None,
+                 reporter=None, **settings):
+        options = RunOptions.of(options, **settings)
+        if isinstance(options.shard, str):
+            options = options.replace(shard=parse_shard(options.shard))
+        if mode not in PIPELINE_MODES:
+            raise ValueError(f"Invalid mode '{mode}'. Must be 'full', 'rename-only', or 'move-only'.")
+        if isinstance(sources, (str, Path)):
+            sources = [sources]
+        self.sources = [Path(source) for source in sources]
+        if not self.sources:
+            raise ValueError("At least one source folder must be provided.")
+        if len(self.sources) > 1 and mode != "full":
+            raise ValueError("Several source folders can only be ingested with the full pipeline.")
+        if options.link_mode != "move" and mode == "rename-only":
+            raise ValueError(f"Link mode '{options.link_mode}' needs a target: use 'move-only' or 'full' mode.")
+        if target is None and mode != "rename-only":
+            raise ValueError(f"A target folder is needed in {mode} mode.")
+
+        self.target = Path(target) if target is not None else None
+        self.mode = mode
+        self.options = options
+        self.reporter = reporter or CallbackReporter(on_progress, on_event)
+
+    def run(self):
+        """
+        Process the sources and return the counts: processed, renamed,
+        moved, skipped and near_duplicates (summed over all sources).
+        """
+        if self.mode == "rename-only":
+            return rename_photos(self.sources[0], self.options, reporter=self.reporter)
+        if self.mode == "move-only":
+            return move_photos(self.sources[0], self.target, self.options, reporter=self.reporter)
+        if len(self.sources) == 1:
+            return process_photos(self.sources[0], self.target, self.options, reporter=self.reporter)
+
+        totals = {"processed": 0, "renamed": 0, "moved": 0, "skipped": 0, "near_duplicates": 0}
+        for counts in ingest_sources(self.sources, self.target, self.options, reporter=self.reporter).values():
+            for key in totals:
+                totals[key] += counts[key]
+        return totals
+
+    def watch(self, poll_interval=None):
+        """
+        Keep processing photos as they arrive in the source until interrupted
+        (KeyboardInterrupt), then return the counts; see
+        bulk_photo_processor.watch_photos(). Watching supports one source and
+        neither `shard`, `link_mode` nor `disk_order`.
+        """
+        source = self._single_source("watch mode", ("shard", "link_mode", "disk_order"))
+        return watch_photos(source, self.target, self.mode, self.options, poll_interval, self.reporter)
+
+    def plan(self, plan_file):
+        """
+        Write every rename and move to `plan_file` without touching any photo,
+        and return the counts per operation; see planner.plan_photos(). Plans
+        support one source and neither `shard`, `link_mode`, `disk_order`,
+        `near_duplicates` nor `thumbnails`. Apply them with apply_plan().
+        """
+        source = self._single_source("plans", ("shard", "link_mode", "disk_order", "near_duplicates", "thumbnails"))
+        options = {key: getattr(self.options, key) for key in ("workers", "use_index", "algorithm", "recursive",
+                                                               "use_capture_date", "layout", "max_entries")}
+        return planner.plan_photos(source, self.target, plan_file, mode=self.mode, reporter=self.reporter, **options)
+
+    def _single_source(self, what, unsupported):
+        if len(self.sources) > 1:
+            raise ValueError(f"Several source folders can only be ingested with the full pipeline, not with {what}.")
+        for option in unsupported:
+            if getattr(self.options, option) not in (None, "move"):
+                raise ValueError(f"'{option}' is not supported with {what}.")
+        return self.sources[0]
+
+
+def apply_plan(plan_file, workers=1, resume=False, on_progress=None, on_event=None, reporter=None):
+    """
+    Apply a plan written by PhotoPipeline.plan() and return the counts per
+    outcome; see planner.apply_plan(). Reports like PhotoPipeline.
+    """
+    reporter = reporter or CallbackReporter(on_progress, on_event)
+    return planner.apply_plan(plan_file, workers=workers, resume=resume, reporter=reporter)
+
+
+def dedupe_archive(archive, link_mode=None, test_mode=False, workers=1, use_index=True, algorithm='md5',
+                   on_progress=None, on_event=None, reporter=None):
+    """
+    Find the duplicate files of an archive and, with `link_mode`, replace the
+    extra copies by links; see dedupe.dedupe_archive(). Reports like
+    PhotoPipeline and returns the summary counts.
+    """
+    reporter = reporter or CallbackReporter(on_progress, on_event)
+    return dedupe.dedupe_archive(archive, link_mode=link_mode, test_mode=test_mode, workers=workers,
+                                 use_index=use_index, algorithm=algorithm, reporter=reporter)
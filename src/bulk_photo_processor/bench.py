@@ -0,0 +1,261 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from .bulk_photo_mover import move_photos
+from .bulk_photo_renamer import rename_photos
+from .disk_order import DISK_ORDERS, in_disk_order
+from .durability import DURABILITY_MODES
+from .hashing import calculate_checksum
+from .scanner import scan_files
+
+# (weight, smallest, largest) in bytes
+SIZE_PROFILES = {
+    "tiny": [(1, 4 * 1024, 64 * 1024)],
+    "photo": [(1, 1024 * 1024, 8 * 1024 * 1024)],
+    "mixed": [(9, 1024 * 1024, 8 * 1024 * 1024), (1, 20 * 1024 * 1024, 200 * 1024 * 1024)],
+}
+FILES_PER_FOLDER = 999  # like a camera's DCIM/100XXXXX folders
+_POOL_SIZE = 8 * 1024 * 1024
+_START = datetime(2015, 1, 1)
+
+
+def _write_file(path, size, unique, pool):
+    """Write `size` bytes: a unique header, then data from the shared random pool."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = unique.encode().ljust(64, b'\x00')[:size]
+    with path.open('wb') as f:
+        f.write(header)
+        remaining = size - len(header)
+        offset = len(unique) * 7919 % _POOL_SIZE
+        while remaining > 0:
+            chunk = pool[offset:offset + remaining]
+            f.write(chunk)
+            remaining -= len(chunk)
+            offset = 0
+
+
+def generate_tree(root, files=1000, duplicate_ratio=0.1, bursts=10, burst_size=5, size_profile="photo",
+                  seed=0, target=None):
+    """
+    Create a synthetic camera dump in '<root>/source' and an archive in `target`
+    (default '<root>/target'), and return a dict describing what was made.
+
+    The source holds `files` photos spread over DCIM-style subfolders:
+    - a `duplicate_ratio` share already renamed, with a byte-identical copy
+      in the archive (skipped as duplicates by the mover);
+    - `bursts` groups of `burst_size` already-renamed files sharing one name
+      in different subfolders, plus an archive file of that name and size
+      but other content (each needs a checksum and a '_NN' collision name);
+    - the rest named 'YYYYMMDD_HHMMSS.jpg', for the renamer.
+    File sizes are drawn from SIZE_PROFILES[size_profile]. The same seed
+    always produces the same tree.
+    """
+    if size_profile not in SIZE_PROFILES:
+        raise ValueError(f"Unknown size profile '{size_profile}'. Must be one of: {', '.join(SIZE_PROFILES)}.")
+
+    rng = random.Random(seed)
+    pool = rng.randbytes(_POOL_SIZE)
+    profile = SIZE_PROFILES[size_profile]
+    source = Path(root) / "source"
+    target = Path(target) if target else Path(root) / "target"
+    source.mkdir(parents=True, exist_ok=True)
+    target.mkdir(parents=True, exist_ok=True)
+
+    def random_size():
+        _, low, high = rng.choices(profile, weights=[weight for weight, _, _ in profile])[0]
+        return rng.randint(low, high)
+
+    # Distinct capture times, so only the planned bursts collide
+    seconds = rng.sample(range(10 * 365 * 24 * 3600), files)
+    timestamps = iter(_START + timedelta(seconds=s) for s in seconds)
+
+    def folder_for(number):
+        return source / "DCIM" / f"{100 + number // FILES_PER_FOLDER}BENCH"
+
+    burst_files = min(bursts * burst_size, files)
+    duplicates = min(int(files * duplicate_ratio), files - burst_files)
+    summary = {"files": files, "bytes": 0, "duplicates": duplicates, "collisions": 0, "to_rename": 0}
+    number = 0
+
+    for _ in range(burst_files // burst_size if burst_size else 0):
+        taken = next(timestamps)
+        name = f"{taken:%Y-%m-%dT%H_%M_%S}-000001.jpg"
+        size = random_size()
+        _write_file(target / f"{taken:%Y}" / f"{taken:%m}" / name, size, f"archive-{name}", pool)
+        for copy in range(burst_size):
+            # One per folder, so the names do not clash inside the source
+            folder = source / "DCIM" / f"{900 + copy}BURST"
+            _write_file(folder / name, size, f"burst-{copy}-{name}", pool)
+            summary["bytes"] += size
+            summary["collisions"] += 1
+            number += 1
+
+    for _ in range(duplicates):
+        taken = next(timestamps)
+        name = f"{taken:%Y-%m-%dT%H_%M_%S}-000001.jpg"
+        size = random_size()
+        _write_file(folder_for(number) / name, size, f"photo-{name}", pool)
+        _write_file(target / f"{taken:%Y}" / f"{taken:%m}" / name, size, f"photo-{name}", pool)
+        summary["bytes"] += size
+        number += 1
+
+    while number < files:
+        taken = next(timestamps)
+        size = random_size()
+        _write_file(folder_for(number) / f"{taken:%Y%m%d_%H%M%S}.jpg", size, f"raw-{taken}", pool)
+        summary["bytes"] += size
+        summary["to_rename"] += 1
+        number += 1
+
+    summary["source"] = str(source)
+    summary["target"] = str(target)
+    return summary
+
+
+def _source_files(source, disk_order=None):
+    entries = scan_files(source, recursive=True)
+    if disk_order:
+        entries = in_disk_order(entries, disk_order)
+    files = [Path(entry.path) for entry in entries]
+    return files, sum(path.stat().st_size for path in files)
+
+
+def drop_caches():
+    """
+    Write dirty data back and empty the page cache, so the next stage reads
+    from the disk and not from memory. Linux only, and needs root.
+    """
+    os.sync()
+    try:
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+    except OSError as e:
+        raise RuntimeError(f"Cannot drop the page cache (run as root on Linux): {e}") from e
+
+
+def _timed(stage, files, size, func, *args, cold=False, **kwargs):
+    if cold:
+        drop_caches()
+    # The stages print progress bars and summaries; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    return {
+        "stage": stage,
+        "files": files,
+        "bytes": size,
+        "seconds": elapsed,
+        "files_per_s": files / elapsed if elapsed else float('inf'),
+        "mb_per_s": size / elapsed / 1e6 if elapsed else float('inf'),
+    }
+
+
+def run_benchmark(source, target, algorithm='md5', workers=1, use_index=True, durability='none', disk_order=None,
+                  cold=False):
+    """
+    Time each stage of the pipeline on a generated tree, in pipeline order:
+    checksum of every source file, rename_photos() and move_photos(), both
+    recursive, syncing as `durability` says. The checksum and move stages
+    read each folder in `disk_order` when given. The source is consumed.
+    Returns one result dict per stage.
+
+    The tree was just written, so the data is likely in the page cache,
+    where read order hardly matters; with `cold`, the cache is dropped
+    before each stage (see drop_caches()). Put `target` on another
+    filesystem to measure cross-device copies.
+    """
+    files, size = _source_files(source, disk_order)
+    results = [
+        _timed("checksum", len(files), size, lambda: [calculate_checksum(path, algorithm) for path in files],
+               cold=cold),
+        _timed("rename", len(files), size, rename_photos, str(source), recursive=True, durability=durability,
+               cold=cold),
+    ]
+    files, size = _source_files(source)
+    results.append(_timed("move", len(files), size, move_photos, str(source), str(target), workers=workers,
+                          use_index=use_index, algorithm=algorithm, recursive=True, durability=durability,
+                          disk_order=disk_order, cold=cold))
+    for result in results:
+        result["durability"] = durability
+        result["disk_order"] = disk_order or "off"
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the photo pipeline on a synthetic source and archive tree."
+    )
+    parser.add_argument("-n", "--files", type=int, default=1000, help="Source photos to generate (default: 1000).")
+    parser.add_argument("--duplicates", type=float, default=0.1,
+                        help="Share of source photos already in the archive (default: 0.1).")
+    parser.add_argument("--bursts", type=int, default=10, help="Groups of photos sharing one name (default: 10).")
+    parser.add_argument("--burst-size", type=int, default=5, help="Photos per burst (default: 5).")
+    parser.add_argument("--sizes", choices=SIZE_PROFILES, default="photo",
+                        help="File size distribution (default: photo, 1-8 MiB).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument("--dir", help="Generate the trees here and keep them (default: a temporary folder).")
+    parser.add_argument("--target", help="Archive folder, e.g. on another filesystem (default: inside --dir).")
+    parser.add_argument("-a", "--algorithm", default="md5", help="Checksum algorithm (default: md5).")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker threads for the mover (default: 1).")
+    parser.add_argument("--no-index", action="store_true", help="Do not use the checksum index.")
+    parser.add_argument("--durability", nargs="+", choices=DURABILITY_MODES, default=["none"],
+                        help="Durability modes to compare, each on its own copy of the tree (default: none).")
+    parser.add_argument("--disk-order", nargs="+", choices=("off",) + DISK_ORDERS, default=["off"],
+                        help="Read orders to compare, each on its own copy of the tree (default: off, name order).")
+    parser.add_argument("--drop-caches", action="store_true",
+                        help="Empty the page cache before each stage, so data is read from the disk (needs root).")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results to a JSON file.")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        root = args.dir or stack.enter_context(tempfile.TemporaryDirectory(prefix="bulk_photo_bench_"))
+        target = args.target
+        if target and not args.dir:
+            # A generated archive outside the temporary folder is removed with it
+            target = stack.enter_context(tempfile.TemporaryDirectory(prefix="bulk_photo_bench_", dir=target))
+
+        # Each configuration with the tree it ran on and its results
+        runs = []
+        configurations = [(durability, disk_order) for durability in args.durability for disk_order in args.disk_order]
+        for durability, disk_order in configurations:
+            # The same seed gives every mode an identical tree
+            tree_root, tree_target = root, target
+            if len(configurations) > 1:
+                tree_root = Path(root) / f"{durability}-{disk_order}"
+                tree_target = Path(target) / f"{durability}-{disk_order}" if target else None
+            start = time.perf_counter()
+            tree = generate_tree(tree_root, args.files, args.duplicates, args.bursts, args.burst_size, args.sizes,
+                                 args.seed, tree_target)
+            print(f"Generated {tree['files']} files ({tree['bytes'] / 1e6:.1f} MB) in "
+                  f"{time.perf_counter() - start:.1f}s: {tree['to_rename']} to rename, "
+                  f"{tree['duplicates']} duplicates, {tree['collisions']} in collision bursts.")
+
+            results = run_benchmark(tree["source"], tree["target"], args.algorithm, args.workers,
+                                    not args.no_index, durability,
+                                    None if disk_order == "off" else disk_order, args.drop_caches)
+            runs.append({"durability": durability, "disk_order": disk_order, "tree": tree, "results": results})
+
+    print(f"{'durability':<11} {'disk order':<10} {'stage':<10} {'files':>8} {'seconds':>9} {'files/s':>10} "
+          f"{'MB/s':>9}")
+    for run in runs:
+        for result in run["results"]:
+            print(f"{result['durability']:<11} {result['disk_order']:<10} {result['stage']:<10} "
+                  f"{result['files']:>8} {result['seconds']:>9.3f} {result['files_per_s']:>10.1f} "
+                  f"{result['mb_per_s']:>9.1f}")
+
+    if args.json:
+        report = {"options": vars(args), "runs": runs}
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
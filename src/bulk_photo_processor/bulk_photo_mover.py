@@ -1,24 +1,26 @@
-import re
-import hashlib
 from pathlib import Path
-from tqdm import tqdm
-from colorama import Fore, Style
 
-
-def calculate_checksum(file_path, algorithm='md5'):
-    """Calculate the checksum of a file using the specified algorithm."""
-    hash_alg = hashlib.new(algorithm)
-    try:
-        with Path(file_path).open('rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_alg.update(chunk)
-    except Exception as e:
-        raise RuntimeError(f"Error calculating checksum for {file_path}: {e}")
-    return hash_alg.hexdigest()
-
-
-def move_photos(source_folder, target_folder, test_mode=False, verbose=False):
-    """Move photos from source to destination, organizing by year/month."""
+# Re-exported: these helpers used to live here
+from .hashing import calculate_checksum, compare_files, is_duplicate  # noqa: F401
+from .metrics import RunMetrics
+from .options import RunOptions
+from .patterns import (MOVE_PATTERN, VALID_EXTENSIONS, needs_capture_date, same_shot_pattern,  # noqa: F401
+                       target_path_for)
+from .pipeline import run_pipeline
+from .reporting import ConsoleReporter
+
+
+def move_photos(source_folder, target_folder, options=None, metrics=None, reporter=None, **settings):
+    """
+    Move photos from source to destination, organizing by year/month.
+
+    Photos keep their names: this is run_pipeline() in 'move-only' mode, so
+    duplicate checks run on `workers` threads while photos are moved one by
+    one in scan order, and a move to another filesystem is a verified copy.
+    `options` (a RunOptions, or keyword `settings`) say how. Stage times go
+    to `metrics`, output to `reporter` (the console by default).
+    Returns a dict of counts.
+    """
     source_path = Path(source_folder).resolve()
     target_path = Path(target_folder).resolve()
 
@@ -30,85 +32,27 @@ def move_photos(source_folder, target_folder, test_mode=False, verbose=False):
     except Exception as e:
         raise RuntimeError(f"Error creating destination directory '{target_path}': {e}")
 
+    options = RunOptions.of(options, **settings)
+    metrics = metrics or RunMetrics()
+    reporter = reporter or ConsoleReporter(options.verbose, options.test_mode)
     try:
-        files = [entry for entry in source_path.iterdir() if entry.is_file()]
-    except Exception as e:
-        raise RuntimeError(f"Error accessing files in source directory '{source_path}': {e}")
-
-    valid_extensions = {'.jpg', '.jpeg', '.png', '.mpg', '.mp4', '.avi', '.heic'}
-    pattern = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2})_(\d{2})_(\d{2})-\d{6}.*\..*')
-    files_to_move = [f for f in files if pattern.match(f.name) and f.suffix.lower() in valid_extensions]
-
-    if not files_to_move:
-        print("No files matching the pattern were found.")
-        return
-
-    moved_count = 0
-    skipped_count = 0
-
-    pbar = tqdm(
-        total=len(files_to_move),
-        ncols=70,
-        bar_format="{l_bar}%s{bar}%s{r_bar}" % (Fore.GREEN, Style.RESET_ALL)
-    )
-
-    for file in files_to_move:
-        try:
-            match = pattern.match(file.name)
-            if not match:
-                skipped_count += 1
-                pbar.update(1)
-                continue
-
-            year, month, *_ = match.groups()
-            subfolder_path = target_path / year / month
-            subfolder_path.mkdir(parents=True, exist_ok=True)
-
-            target_file_path = subfolder_path / file.name
-            target_file_path = target_file_path.with_suffix(target_file_path.suffix.lower())
-
-            # File already exists
-            if target_file_path.exists():
-                # Check for duplicate
-                if (
-                    file.stat().st_size == target_file_path.stat().st_size and
-                    calculate_checksum(file) == calculate_checksum(target_file_path)
-                ):
-                    skipped_count += 1
-                    if verbose:
-                        print(f"Duplicate file found and skipped: {file}")
-                    pbar.update(1)
-                    continue
-
-                # Generate unique filename
-                counter = 1
-                while True:
-                    new_file_name = f"{file.stem}_{counter:02}{file.suffix.lower()}"
-                    new_target_file_path = subfolder_path / new_file_name
-                    if not new_target_file_path.exists():
-                        target_file_path = new_target_file_path
-                        break
-                    counter += 1
-
-            if test_mode or verbose:
-                print(f"{file} --> {target_file_path}")
-
-            if not test_mode:
-                file.rename(target_file_path)
-
-            moved_count += 1
-            pbar.update(1)
-
-        except Exception as e:
-            raise RuntimeError(f"Error moving file '{file}': {e}")
-
-    pbar.close()
+        counts = run_pipeline(source_path, target_path, options, "move-only", metrics, reporter)
+    except BaseException:
+        metrics.save(options.report, options.prometheus, status="failed")
+        raise
+    metrics.save(options.report, options.prometheus)
 
     # Always show summary
-    total = moved_count + skipped_count
-    print(f"\nProcessed: {total} files")
-    print(f"Moved: {moved_count}")
-    print(f"Skipped (already existed or duplicate): {skipped_count}")
-
-    if moved_count == 0 and skipped_count > 0:
-        print("All files already exist in the destination. Nothing to move.")
+    if counts["processed"] == 0:
+        reporter.message("No files matching the pattern were found.")
+        return counts
+
+    reporter.message(f"\nProcessed: {counts['processed']} files")
+    reporter.message(f"Moved: {counts['moved']}")
+    reporter.message(f"Skipped (already existed or duplicate): {counts['skipped']}")
+    if options.near_duplicates is not None:
+        reporter.message(f"Near-duplicates flagged: {counts['near_duplicates']}")
+
+    if counts["moved"] == 0 and counts["skipped"] > 0:
+        reporter.message("All files already exist in the destination. Nothing to move.")
+    return counts
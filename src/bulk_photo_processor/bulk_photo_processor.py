@@ -1,11 +1,22 @@
 from pathlib import Path
-from .bulk_photo_renamer import rename_photos
-from .bulk_photo_mover import move_photos
+from .metrics import RunMetrics
+from .options import RunOptions
+from .pipeline import PIPELINE_MODES, TargetState, print_summary, run_pipeline
+from .reporting import ConsoleReporter
+from .scanner import FileEntry
+from .watcher import inotify_available, watch_batches
 
 
-def process_photos(source_folder, target_folder, test_mode, verbose):
+def process_photos(source_folder, target_folder, options=None, reporter=None, **settings):
     """
     Process photos by renaming and moving them.
+
+    Renaming and moving run as one streaming pipeline (see
+    pipeline.run_pipeline()): each photo is renamed and moved as soon as
+    the scan finds it, instead of renaming the whole source before
+    rescanning it for the mover. `options` (a RunOptions, or keyword
+    `settings`) say how; output goes to `reporter` (the console by
+    default, see reporting.py). Returns a dict of counts.
     """
     source_path = Path(source_folder).resolve()
     target_path = Path(target_folder).resolve()
@@ -14,23 +25,109 @@ def process_photos(source_folder, target_folder, test_mode, verbose):
     if not source_path.is_dir():
         raise FileNotFoundError(f"Source folder '{source_path}' does not exist or is not a directory.")
 
+    options = RunOptions.of(options, **settings)
+    reporter = reporter or ConsoleReporter(options.verbose, options.test_mode)
+
     # Validate or create the target folder
     if not target_path.exists():
         try:
             target_path.mkdir(parents=True, exist_ok=True)
-            if verbose:
-                print(f"Created target folder: {target_path}")
+            reporter.message(f"Created target folder: {target_path}", detail=True)
         except Exception as e:
             raise RuntimeError(f"Error creating target folder '{target_path}': {e}")
 
-    # Run the renamer function
-    rename_photos(str(source_path), test_mode=test_mode, verbose=verbose)
+    metrics = RunMetrics()
+    try:
+        if options.test_mode:
+            reporter.message("Test mode enabled. Files will not be renamed or moved.", detail=True)
+        counts = run_pipeline(source_path, target_path, options, metrics=metrics, reporter=reporter)
+    except BaseException:
+        metrics.save(options.report, options.prometheus, status="failed")
+        raise
+    metrics.save(options.report, options.prometheus)
+
+    # Always show summary
+    print_summary(counts, options.near_duplicates is not None, reporter)
+    return counts
+
+
+def watch_photos(source_folder, target_folder, mode="full", options=None, poll_interval=None, reporter=None,
+                 **settings):
+    """
+    Keep watching the source folder and process photos as they arrive.
+
+    The files that complete together (see watcher.watch_batches()) are
+    handed to run_pipeline() as one batch, so new photos reach the
+    destination within seconds without rescanning the source. Files already
+    in the source when the watch starts are processed too. `mode` is
+    'full', 'rename-only' or 'move-only'; `options` (a RunOptions, or
+    keyword `settings`) work as in process_photos(), except `shard`,
+    `link_mode` and `disk_order`, and `target_folder` may be None in
+    'rename-only' mode. All batches share one TargetState: the
+    destination is listed once per session, auto-split folders keep their
+    counts, sequence numbers carry on from batch to batch and the
+    thumbnail cache stays open. Runs until interrupted (Ctrl+C), then reports a summary to
+    `reporter` and returns the counts.
+    """
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Invalid mode '{mode}'. Must be 'full', 'rename-only', or 'move-only'.")
+
+    moving = mode in ("full", "move-only")
+    if target_folder is None and moving:
+        raise ValueError(f"A target folder is needed in {mode} mode.")
+
+    source_path = Path(source_folder).resolve()
+    target_path = Path(target_folder).resolve() if moving else None
+
+    if not source_path.is_dir():
+        raise FileNotFoundError(f"Source folder '{source_path}' does not exist or is not a directory.")
+    options = RunOptions.of(options, **settings)
+    options.check()
+    for option in ("shard", "link_mode", "disk_order"):
+        if getattr(options, option) not in (None, "move"):
+            raise ValueError(f"'{option}' is not supported in watch mode.")
+
+    if moving:
+        try:
+            target_path.mkdir(parents=True, exist_ok=True)
+        except Exception as e:
+            raise RuntimeError(f"Error creating target folder '{target_path}': {e}")
+    else:
+        options = options.replace(use_index=False, near_duplicates=None, thumbnails=None)
+
+    reporter = reporter or ConsoleReporter(options.verbose, options.test_mode)
+    metrics = RunMetrics()
+    state = TargetState(target_path, metrics, options)
+    counts = {"processed": 0, "renamed": 0, "moved": 0, "skipped": 0, "near_duplicates": 0}
+
+    backend = "polling" if poll_interval or not inotify_available() else "inotify"
+    reporter.message(f"Watching '{source_path}' for new photos ({backend}). Press Ctrl+C to stop.")
 
-    # Skip the mover function if in test mode
-    if test_mode:
-        if verbose:
-            print("Test mode enabled. Files will not be renamed or moved.")
-        return
+    arrivals = watch_batches(source_path, options.recursive, [target_path] if moving else [], poll_interval)
+    status = "ok"
+    try:
+        for batch in arrivals:
+            # A file may be gone by now: handled by a batch that was still running, or removed
+            entries = [FileEntry(path) for path in sorted(batch) if path.is_file()]
+            if not entries:
+                continue
+            batch_counts = run_pipeline(source_path, target_path, options, mode=mode, metrics=metrics,
+                                        reporter=reporter, state=state, entries=entries)
+            # Only the first batch can find a journal to resume
+            options = options.replace(resume=False)
+            for key in counts:
+                counts[key] += batch_counts[key]
+    except KeyboardInterrupt:
+        # Ctrl+C is how a watch ends; a batch it interrupted keeps its journal for --resume
+        pass
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        arrivals.close()
+        state.close()
+        metrics.save(options.report, options.prometheus, status=status)
 
-    # Run the mover function
-    move_photos(str(source_path), str(target_path), test_mode=test_mode, verbose=verbose)
+    reporter.message(f"\nStopped watching: {source_path}")
+    print_summary(counts, options.near_duplicates is not None, reporter)
+    return counts
@@ -0,0 +1,320 @@
+import os
+import sqlite3
+import struct
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Nothing past this many bytes is ever read from a file's metadata block
+MAX_METADATA_BYTES = 256 * 1024
+
+_EXIF_IFD_POINTER = 0x8769
+_DATE_TIME_ORIGINAL = 0x9003
+_DATE_TIME_DIGITIZED = 0x9004
+_DATE_TIME = 0x0132
+
+_QUICKTIME_EPOCH = datetime(1904, 1, 1, tzinfo=timezone.utc)
+_HEIF_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1', b'avif'}
+
+
+# ------------------------------------------------------------
+# EXIF / TIFF
+# ------------------------------------------------------------
+def _parse_exif_datetime(value):
+    try:
+        return datetime.strptime(value.strip('\x00 '), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None  # empty or '0000:00:00 00:00:00'
+
+
+def _read_ifd(tiff, offset, endian):
+    """Return {tag: ascii value} for the ASCII and LONG entries of one IFD."""
+    entries = {}
+    if offset + 2 > len(tiff):
+        return entries
+    (count,) = struct.unpack_from(endian + 'H', tiff, offset)
+    for i in range(count):
+        entry = offset + 2 + i * 12
+        if entry + 12 > len(tiff):
+            break
+        tag, field_type, n, raw = struct.unpack_from(endian + 'HHI4s', tiff, entry)
+        if field_type == 2:  # ASCII
+            if n <= 4:
+                data = raw[:n]
+            else:
+                (value_offset,) = struct.unpack(endian + 'I', raw)
+                data = tiff[value_offset:value_offset + n]
+            entries[tag] = data.decode('ascii', 'replace')
+        elif field_type == 4:  # LONG, used for the Exif IFD pointer
+            entries[tag] = struct.unpack(endian + 'I', raw)[0]
+    return entries
+
+
+def parse_tiff_capture_date(tiff):
+    """Return DateTimeOriginal (or a fallback date) from a TIFF/EXIF block."""
+    if tiff[:2] == b'II':
+        endian = '<'
+    elif tiff[:2] == b'MM':
+        endian = '>'
+    else:
+        return None
+
+    (ifd0_offset,) = struct.unpack_from(endian + 'I', tiff, 4)
+    ifd0 = _read_ifd(tiff, ifd0_offset, endian)
+    exif = {}
+    if isinstance(ifd0.get(_EXIF_IFD_POINTER), int):
+        exif = _read_ifd(tiff, ifd0[_EXIF_IFD_POINTER], endian)
+
+    for tags, tag in ((exif, _DATE_TIME_ORIGINAL), (exif, _DATE_TIME_DIGITIZED), (ifd0, _DATE_TIME)):
+        value = tags.get(tag)
+        if isinstance(value, str):
+            parsed = _parse_exif_datetime(value)
+            if parsed:
+                return parsed
+    return None
+
+
+# ------------------------------------------------------------
+# Container walkers (seek-based)
+# ------------------------------------------------------------
+def _jpeg_capture_date(f):
+    f.seek(2)  # after SOI
+    while True:
+        header = f.read(4)
+        if len(header) < 4 or header[0] != 0xFF:
+            return None
+        marker = header[1]
+        (length,) = struct.unpack('>H', header[2:])
+        if marker in (0xDA, 0xD9):  # start of scan / end of image: no more metadata
+            return None
+        if marker == 0xE1:
+            segment = f.read(length - 2)
+            if segment.startswith(b'Exif\x00\x00'):
+                return parse_tiff_capture_date(segment[6:])
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _iter_boxes(f, start, end):
+    """Yield (type, payload_offset, payload_size) for ISO BMFF boxes in [start, end)."""
+    offset = start
+    while end is None or offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack('>Q', f.read(8))
+            header_size = 16
+        elif size == 0:
+            size = os.fstat(f.fileno()).st_size - offset
+        if size < header_size:
+            return
+        yield box_type, offset + header_size, size - header_size
+        offset += size
+
+
+def _quicktime_capture_date(f):
+    for box_type, payload, size in _iter_boxes(f, 0, None):
+        if box_type != b'moov':
+            continue
+        for child_type, child_payload, _ in _iter_boxes(f, payload, payload + size):
+            if child_type != b'mvhd':
+                continue
+            f.seek(child_payload)
+            version = f.read(4)[0]
+            if version == 1:
+                (seconds,) = struct.unpack('>Q', f.read(8))
+            else:
+                (seconds,) = struct.unpack('>I', f.read(4))
+            if not seconds:
+                return None
+            # mvhd holds UTC; file names and EXIF use local time
+            utc = _QUICKTIME_EPOCH + timedelta(seconds=seconds)
+            return utc.astimezone().replace(tzinfo=None)
+        return None
+    return None
+
+
+def _heif_exif_location(meta):
+    """Return (offset, length) of the Exif item described by a 'meta' box payload."""
+    exif_item = None
+    locations = {}
+    position = 4  # FullBox version and flags
+    while position + 8 <= len(meta):
+        size, box_type = struct.unpack_from('>I4s', meta, position)
+        if size < 8:
+            break
+        body = meta[position + 8:position + size]
+        position += size
+
+        if box_type == b'iinf':
+            version = body[0]
+            cursor = 6 if version == 0 else 8
+            while cursor + 8 <= len(body):
+                infe_size, infe_type = struct.unpack_from('>I4s', body, cursor)
+                if infe_size < 8:
+                    break
+                infe = body[cursor + 8:cursor + infe_size]
+                cursor += infe_size
+                if infe_type != b'infe' or infe[0] < 2:
+                    continue
+                if infe[0] == 2:
+                    (item_id,) = struct.unpack_from('>H', infe, 4)
+                    item_type = infe[8:12]
+                else:
+                    (item_id,) = struct.unpack_from('>I', infe, 4)
+                    item_type = infe[10:14]
+                if item_type == b'Exif':
+                    exif_item = item_id
+
+        elif box_type == b'iloc':
+            version = body[0]
+            offset_size, length_size = body[4] >> 4, body[4] & 0x0F
+            base_offset_size, index_size = body[5] >> 4, body[5] & 0x0F
+            cursor = 6
+            if version < 2:
+                (item_count,) = struct.unpack_from('>H', body, cursor)
+                cursor += 2
+            else:
+                (item_count,) = struct.unpack_from('>I', body, cursor)
+                cursor += 4
+
+            def read_uint(width):
+                nonlocal cursor
+                value = int.from_bytes(body[cursor:cursor + width], 'big') if width else 0
+                cursor += width
+                return value
+
+            for _ in range(item_count):
+                item_id = read_uint(2 if version < 2 else 4)
+                construction_method = read_uint(2) & 0x0F if version in (1, 2) else 0
+                read_uint(2)  # data_reference_index
+                base_offset = read_uint(base_offset_size)
+                (extent_count,) = struct.unpack_from('>H', body, cursor)
+                cursor += 2
+                extents = []
+                for _ in range(extent_count):
+                    if version in (1, 2):
+                        read_uint(index_size)
+                    extents.append((read_uint(offset_size), read_uint(length_size)))
+                if construction_method == 0 and extents:
+                    extent_offset, extent_length = extents[0]
+                    locations[item_id] = (base_offset + extent_offset, extent_length)
+
+    return locations.get(exif_item) if exif_item is not None else None
+
+
+def _heif_capture_date(f):
+    for box_type, payload, size in _iter_boxes(f, 0, None):
+        if box_type != b'meta':
+            continue
+        f.seek(payload)
+        location = _heif_exif_location(f.read(min(size, MAX_METADATA_BYTES)))
+        if not location:
+            return None
+        offset, length = location
+        f.seek(offset)
+        item = f.read(min(length, MAX_METADATA_BYTES))
+        if len(item) < 4:
+            return None
+        (tiff_offset,) = struct.unpack_from('>I', item, 0)
+        exif = item[4 + tiff_offset:]
+        if exif.startswith(b'Exif\x00\x00'):
+            exif = exif[6:]
+        return parse_tiff_capture_date(exif)
+    return None
+
+
+def read_capture_date(file_path):
+    """
+    Return the capture time recorded inside a photo or video, or None.
+
+    JPEG files are read up to their EXIF block, HEIC/HEIF files up to the
+    Exif item referenced from their 'meta' box, and MP4/QuickTime files
+    only for the 'mvhd' header of their 'moov' box. Everything else is
+    skipped with seeks, so no image or video data is ever read.
+    """
+    try:
+        with Path(file_path).open('rb') as f:
+            head = f.read(12)
+            if head[:2] == b'\xff\xd8':
+                return _jpeg_capture_date(f)
+            if head[4:8] == b'ftyp':
+                if head[8:12] in _HEIF_BRANDS:
+                    return _heif_capture_date(f)
+                return _quicktime_capture_date(f)
+    except (OSError, struct.error, IndexError, ValueError, OverflowError):
+        return None
+    return None
+
+
+# ------------------------------------------------------------
+# Persistent cache
+# ------------------------------------------------------------
+def default_cache_path():
+    cache_root = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_root) / "bulk_photo_processor" / "capture_dates.sqlite"
+
+
+class CaptureDateCache:
+    """
+    Persistent cache of capture dates keyed by (path, size, mtime).
+
+    Files without a readable date are cached too, so reruns never open
+    the same unchanged file twice.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = Path(db_path) if db_path else default_cache_path()
+        self._lock = threading.Lock()
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS capture_dates (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    captured TEXT
+                )
+                """
+            )
+            self._conn.commit()
+        except (OSError, sqlite3.Error) as e:
+            raise RuntimeError(f"Error opening capture date cache '{self.db_path}': {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def capture_date(self, file_path, stat_result=None):
+        """Return the capture date of a file, reading its header only on a cache miss."""
+        key = str(Path(file_path).resolve())
+        st = stat_result or os.stat(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, captured FROM capture_dates WHERE path = ?", (key,)
+            ).fetchone()
+        if row and row[:2] == (st.st_size, st.st_mtime_ns):
+            return datetime.fromisoformat(row[2]) if row[2] else None
+
+        captured = read_capture_date(file_path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO capture_dates VALUES (?, ?, ?, ?)",
+                (key, st.st_size, st.st_mtime_ns, captured.isoformat() if captured else None),
+            )
+            self._conn.commit()
+        return captured
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
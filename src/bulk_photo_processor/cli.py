@@ -1,12 +1,36 @@
 import argparse
 from pathlib import Path
 
-from .bulk_photo_processor import process_photos
-from .bulk_photo_renamer import rename_photos
-from .bulk_photo_mover import move_photos
+from .api import PhotoPipeline, apply_plan, dedupe_archive
 from .config_loader import load_config, DEFAULT_CONFIG_PATH
+from .disk_order import DISK_ORDERS
+from .durability import DEFAULT_SYNC_EVERY, DEFAULT_SYNC_INTERVAL, DURABILITY_MODES
+from .hashing import STRATEGIES, set_default_strategy
+from .layout import DEFAULT_LAYOUT
+from .perceptual import DEFAULT_MAX_DISTANCE, PERCEPTUAL_HASHES
+from .reporting import ConsoleReporter
+from .thumbnails import DEFAULT_THUMBNAIL_CACHE_SIZE, DEFAULT_THUMBNAIL_SIZE, THUMBNAIL_FORMATS
+from .transfer import LINK_MODES, TRANSFER_MODES
 from .logger import setup_logger
 
+MB = 1024 * 1024
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def positive_float(value):
+    """argparse type for durations that must be above 0."""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be above 0, got {number}")
+    return number
+
 
 # ------------------------------------------------------------
 # Argument parsing
@@ -19,7 +43,8 @@ def parse_cli_args():
     parser.add_argument(
         "-s", "--source-folder",
         type=str,
-        help="Source folder containing photos."
+        action="append",
+        help="Source folder containing photos. Repeat to ingest several sources (e.g. SD cards) at once."
     )
 
     parser.add_argument(
@@ -46,6 +71,204 @@ def parse_cli_args():
         help="Verbose output."
     )
 
+    parser.add_argument(
+        "-r", "--recursive",
+        action="store_true",
+        help="Include photos in subfolders of the source folder."
+    )
+
+    parser.add_argument(
+        "--capture-date",
+        action="store_true",
+        help="Also handle photos without a timestamped name, using the capture date in their EXIF/video header."
+    )
+
+    parser.add_argument(
+        "-w", "--workers",
+        type=positive_int,
+        help="Number of threads used for duplicate checks (default: 1)."
+    )
+
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Do not use or update the checksum index in the destination folder."
+    )
+
+    parser.add_argument(
+        "-a", "--algorithm",
+        type=str,
+        help="Checksum algorithm for duplicate detection, e.g. md5, sha1, blake2b or xxh64 (default: md5)."
+    )
+
+    parser.add_argument(
+        "--hash-strategy",
+        choices=STRATEGIES,
+        help="How files are read for checksums (default: readinto). "
+             "Run 'python -m bulk_photo_processor.hashing <file>' to compare them."
+    )
+
+    parser.add_argument(
+        "--near-duplicates",
+        type=int,
+        nargs="?",
+        const=DEFAULT_MAX_DISTANCE,
+        metavar="DISTANCE",
+        help="Report photos that look like one already in the destination (resized, re-encoded...). "
+             f"DISTANCE is the largest Hamming distance between perceptual hashes (default: {DEFAULT_MAX_DISTANCE}). "
+             "Needs the 'perceptual' extra."
+    )
+
+    parser.add_argument(
+        "--perceptual-hash",
+        choices=PERCEPTUAL_HASHES,
+        help="Perceptual hash used by --near-duplicates (default: dhash)."
+    )
+
+    parser.add_argument(
+        "--thumbnails",
+        type=positive_int,
+        nargs="?",
+        const=DEFAULT_THUMBNAIL_SIZE,
+        metavar="SIZE",
+        help="Build a thumbnail of every moved photo, at most SIZE pixels wide or high "
+             f"(default: {DEFAULT_THUMBNAIL_SIZE}), in a cache inside the destination. Needs Pillow."
+    )
+
+    parser.add_argument(
+        "--thumbnail-format",
+        choices=THUMBNAIL_FORMATS,
+        help="Image format of the thumbnails (default: jpeg)."
+    )
+
+    parser.add_argument(
+        "--thumbnail-cache-size",
+        type=positive_int,
+        metavar="MB",
+        help="Largest size of the thumbnail cache; the least recently used thumbnails are "
+             f"deleted beyond it (default: {DEFAULT_THUMBNAIL_CACHE_SIZE // MB})."
+    )
+
+    parser.add_argument(
+        "--layout",
+        type=str,
+        help=f"Destination folders, from YYYY, MM and DD separated by '/', '-' or '_' (default: {DEFAULT_LAYOUT}). "
+             "E.g. YYYY/MM/DD or YYYY/YYYY-MM."
+    )
+
+    parser.add_argument(
+        "--max-entries",
+        type=positive_int,
+        metavar="N",
+        help="Split a destination folder once it holds N entries: further photos go into per-day "
+             "(then per-hour) subfolders."
+    )
+
+    parser.add_argument(
+        "--durability",
+        choices=DURABILITY_MODES,
+        help="When renames and moves are forced to disk: none (default, left to the OS), batch "
+             "(folders and journal synced every --sync-every files or --sync-interval seconds) "
+             "or strict (every file synced before the next)."
+    )
+
+    parser.add_argument(
+        "--sync-every",
+        type=positive_int,
+        metavar="N",
+        help=f"Files per sync in batch durability mode (default: {DEFAULT_SYNC_EVERY})."
+    )
+
+    parser.add_argument(
+        "--sync-interval",
+        type=positive_float,
+        metavar="SECONDS",
+        help=f"Longest time between syncs in batch durability mode (default: {DEFAULT_SYNC_INTERVAL})."
+    )
+
+    parser.add_argument(
+        "--link-mode",
+        choices=TRANSFER_MODES,
+        help="How photos get into the destination (default: move). hardlink, reflink and copy keep "
+             "the source untouched; hardlink and reflink share the data instead of copying it where "
+             "source and destination are on one filesystem, and copy it otherwise."
+    )
+
+    parser.add_argument(
+        "--disk-order",
+        choices=DISK_ORDERS,
+        help="Experimental: read each source folder in the order its files lie on the disk, meant to save "
+             "seeks on hard disks and NAS shares (no gain measured yet): by inode number, or by physical "
+             "extent where the filesystem reports it (falling back to inodes). Best with --workers 1."
+    )
+
+    parser.add_argument(
+        "--shard",
+        type=str,
+        metavar="I/N",
+        help="Only process shard I of N (e.g. 1/4), picked by a stable hash of each file name. "
+             "Run one process per shard, on one or several machines, to split one import."
+    )
+
+    parser.add_argument(
+        "--report",
+        type=str,
+        metavar="JSON_FILE",
+        help="Write per-stage timings, bytes hashed, p50/p99 latencies and counters to a JSON file."
+    )
+
+    parser.add_argument(
+        "--prometheus",
+        type=str,
+        metavar="PROM_FILE",
+        help="Write the same metrics as a Prometheus textfile (for node_exporter's textfile collector)."
+    )
+
+    parser.add_argument(
+        "--plan",
+        type=str,
+        metavar="PLAN_FILE",
+        help="Write the renames and moves to a JSON Lines plan file instead of running them."
+    )
+
+    parser.add_argument(
+        "--apply",
+        type=str,
+        metavar="PLAN_FILE",
+        help="Run a plan file written by --plan. Source and destination are taken from the plan."
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and process new photos as they arrive in the source folder (Ctrl+C to stop)."
+    )
+
+    parser.add_argument(
+        "--poll-interval",
+        type=positive_float,
+        metavar="SECONDS",
+        help="With --watch, rescan the source every SECONDS instead of using inotify (e.g. for network shares)."
+    )
+
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Find duplicate files anywhere in the destination archive (-d) and list them."
+    )
+
+    parser.add_argument(
+        "--reclaim",
+        choices=LINK_MODES,
+        help="With --dedupe, replace each extra copy by a hardlink or reflink to the first one."
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run (or --apply) from its journal."
+    )
+
     parser.add_argument(
         "-ro", "--rename-only",
         action="store_true",
@@ -80,6 +303,98 @@ def validate_source_and_target(source: Path, target: Path):
     return source, target
 
 
+def resolve_mode(args, config):
+    """Return the operation mode: CLI flags override the config mode."""
+    if args.rename_only:
+        return "rename-only"
+    if args.move_only:
+        return "move-only"
+    return config.get("mode", "full")
+
+
+def write_plan(args, config, logger):
+    logger.info(f"Writing {resolve_mode(args, config)} plan to '{args.plan}'.")
+    build_pipeline(args, config).plan(args.plan)
+
+
+def check_single_source(args, config):
+    """Several sources are only supported by the full pipeline."""
+    if len(config["source_folders"]) > 1 and (args.plan or config["watch"] or resolve_mode(args, config) != "full"):
+        raise ValueError("Several source folders can only be ingested with the full pipeline.")
+
+
+def build_pipeline(args, config):
+    """The PhotoPipeline for `config`, reporting to the console."""
+    return PhotoPipeline(
+        config["source_folders"],
+        config["target_folder"],
+        mode=resolve_mode(args, config),
+        test_mode=config["test_mode"],
+        workers=config["workers"],
+        use_index=config["use_index"],
+        algorithm=config["algorithm"],
+        recursive=config["recursive"],
+        resume=config["resume"],
+        use_capture_date=config["use_capture_date"],
+        near_duplicates=config["near_duplicates"],
+        perceptual_hash=config["perceptual_hash"],
+        layout=config["layout"],
+        max_entries=config["max_entries"],
+        durability=config["durability"],
+        sync_every=config["sync_every"],
+        sync_interval=config["sync_interval"],
+        report=config["report"],
+        prometheus=config["prometheus"],
+        shard=config["shard"],
+        thumbnails=config["thumbnails"],
+        thumbnail_format=config["thumbnail_format"],
+        thumbnail_cache_size=config["thumbnail_cache_size"] * MB,
+        link_mode=config["link_mode"],
+        disk_order=config["disk_order"],
+        reporter=ConsoleReporter(config["verbose"], config["test_mode"])
+    )
+
+
+def run_pipeline(args, config, logger):
+    sources = config["source_folders"]
+    if len(sources) > 1:
+        logger.info(f"Ingesting {len(sources)} sources.")
+    else:
+        logger.info(f"Running in {resolve_mode(args, config)} mode.")
+    build_pipeline(args, config).run()
+
+
+def run_config(args, config, logger):
+    """Run what `config` asks for, whichever execution mode it came from."""
+    # CLI flags override the config's mode
+    if args.rename_only and args.move_only:
+        raise ValueError("Cannot use --rename-only and --move-only together.")
+    check_single_source(args, config)
+    if config["shard"] and (args.plan or config["watch"]):
+        raise ValueError(
+            "--shard works with rename-only, move-only and the full pipeline, not with plans or watch mode."
+        )
+    if config["link_mode"] != "move" and (args.plan or config["watch"]):
+        raise ValueError("--link-mode works with move-only and the full pipeline, not with plans or watch mode.")
+    if config["disk_order"] and (args.plan or config["watch"]):
+        raise ValueError("--disk-order works with move-only and the full pipeline, not with plans or watch mode.")
+
+    if args.poll_interval is not None and not config["watch"]:
+        raise ValueError("--poll-interval only works with --watch.")
+
+    if args.plan:
+        write_plan(args, config, logger)
+    elif config["watch"]:
+        run_watch(args, config, logger)
+    else:
+        run_pipeline(args, config, logger)
+
+
+def run_watch(args, config, logger):
+    logger.info(f"Watching '{config['source_folder']}' in {resolve_mode(args, config)} mode.")
+    build_pipeline(args, config).watch(args.poll_interval)
+
+
 # ------------------------------------------------------------
 # Mode 1: CLI mode (strict)
 # ------------------------------------------------------------
@@ -95,16 +410,42 @@ def try_cli_mode(args, logger):
 
     logger.info("CLI mode selected.")
 
-    source = Path(args.source_folder).resolve()
+    sources = [Path(folder).resolve() for folder in args.source_folder]
     target = Path(args.destination_folder).resolve()
 
-    validate_source_and_target(source, target)
+    for source in sources:
+        validate_source_and_target(source, target)
 
     return {
-        "source_folder": source,
+        "source_folder": sources[0],
+        "source_folders": sources,
         "target_folder": target,
         "test_mode": args.test,
         "verbose": args.verbose,
+        "workers": args.workers if args.workers is not None else 1,
+        "use_index": not args.no_index,
+        "algorithm": args.algorithm or "md5",
+        "recursive": args.recursive,
+        "resume": args.resume,
+        "use_capture_date": args.capture_date,
+        "watch": args.watch,
+        "near_duplicates": args.near_duplicates,
+        "perceptual_hash": args.perceptual_hash or "dhash",
+        "report": args.report,
+        "prometheus": args.prometheus,
+        "layout": args.layout or DEFAULT_LAYOUT,
+        "max_entries": args.max_entries,
+        "durability": args.durability or "none",
+        "sync_every": args.sync_every if args.sync_every is not None else DEFAULT_SYNC_EVERY,
+        "sync_interval": args.sync_interval if args.sync_interval is not None else DEFAULT_SYNC_INTERVAL,
+        "shard": args.shard,
+        "thumbnails": args.thumbnails,
+        "thumbnail_format": args.thumbnail_format or "jpeg",
+        "thumbnail_cache_size": (
+            args.thumbnail_cache_size if args.thumbnail_cache_size is not None else DEFAULT_THUMBNAIL_CACHE_SIZE // MB
+        ),
+        "link_mode": args.link_mode or "move",
+        "disk_order": args.disk_order,
     }
 
 
@@ -138,10 +479,11 @@ def try_config_mode(args, logger):
     folders = config.get("folders", {})
     flags = config.get("flags", {})
 
-    source = Path(folders.get("source", "")).resolve()
+    sources = [Path(folder).resolve() for folder in folders.get("sources") or [folders.get("source", "")]]
     target = Path(folders.get("target", "")).resolve()
 
-    validate_source_and_target(source, target)
+    for source in sources:
+        validate_source_and_target(source, target)
 
     if "test" not in flags or "verbose" not in flags:
         raise ValueError("Config file missing required flags: 'test' and 'verbose'.")
@@ -151,10 +493,41 @@ def try_config_mode(args, logger):
         raise ValueError("Invalid mode in config file. Must be 'full', 'rename-only', or 'move-only'.")
 
     return {
-        "source_folder": source,
+        "source_folder": sources[0],
+        "source_folders": sources,
         "target_folder": target,
         "test_mode": flags["test"],
         "verbose": flags["verbose"],
+        "workers": args.workers if args.workers is not None else flags.get("workers", 1),
+        "use_index": not args.no_index and flags.get("index", True),
+        "algorithm": args.algorithm or flags.get("algorithm", "md5"),
+        "recursive": args.recursive or flags.get("recursive", False),
+        "resume": args.resume,
+        "use_capture_date": args.capture_date or flags.get("capture_date", False),
+        "watch": args.watch or flags.get("watch", False),
+        "near_duplicates": (
+            args.near_duplicates if args.near_duplicates is not None else flags.get("near_duplicates")
+        ),
+        "perceptual_hash": args.perceptual_hash or flags.get("perceptual_hash", "dhash"),
+        "report": args.report or flags.get("report"),
+        "prometheus": args.prometheus or flags.get("prometheus"),
+        "layout": args.layout or flags.get("layout", DEFAULT_LAYOUT),
+        "max_entries": args.max_entries if args.max_entries is not None else flags.get("max_entries"),
+        "durability": args.durability or flags.get("durability", "none"),
+        "sync_every": args.sync_every if args.sync_every is not None else flags.get("sync_every", DEFAULT_SYNC_EVERY),
+        "sync_interval": (
+            args.sync_interval if args.sync_interval is not None
+            else flags.get("sync_interval", DEFAULT_SYNC_INTERVAL)
+        ),
+        "shard": args.shard or flags.get("shard"),
+        "thumbnails": args.thumbnails if args.thumbnails is not None else flags.get("thumbnails"),
+        "thumbnail_format": args.thumbnail_format or flags.get("thumbnail_format", "jpeg"),
+        "thumbnail_cache_size": (
+            args.thumbnail_cache_size if args.thumbnail_cache_size is not None
+            else flags.get("thumbnail_cache_size", DEFAULT_THUMBNAIL_CACHE_SIZE // MB)
+        ),
+        "link_mode": args.link_mode or flags.get("link_mode", "move"),
+        "disk_order": args.disk_order or flags.get("disk_order"),
         "mode": mode,
     }
 
@@ -191,16 +564,40 @@ def interactive_mode(logger):
         folders = config.get("folders", {})
         flags = config.get("flags", {})
 
-        source = Path(folders.get("source", "")).resolve()
+        sources = [Path(folder).resolve() for folder in folders.get("sources") or [folders.get("source", "")]]
         target = Path(folders.get("target", "")).resolve()
 
-        validate_source_and_target(source, target)
+        for source in sources:
+            validate_source_and_target(source, target)
 
         return {
-            "source_folder": source,
+            "source_folder": sources[0],
+            "source_folders": sources,
             "target_folder": target,
             "test_mode": flags.get("test", False),
             "verbose": flags.get("verbose", False),
+            "workers": flags.get("workers", 1),
+            "use_index": flags.get("index", True),
+            "algorithm": flags.get("algorithm", "md5"),
+            "recursive": flags.get("recursive", False),
+            "resume": False,
+            "use_capture_date": flags.get("capture_date", False),
+            "watch": flags.get("watch", False),
+            "near_duplicates": flags.get("near_duplicates"),
+            "perceptual_hash": flags.get("perceptual_hash", "dhash"),
+            "report": flags.get("report"),
+            "prometheus": flags.get("prometheus"),
+            "layout": flags.get("layout", DEFAULT_LAYOUT),
+            "max_entries": flags.get("max_entries"),
+            "durability": flags.get("durability", "none"),
+            "sync_every": flags.get("sync_every", DEFAULT_SYNC_EVERY),
+            "sync_interval": flags.get("sync_interval", DEFAULT_SYNC_INTERVAL),
+            "shard": flags.get("shard"),
+            "thumbnails": flags.get("thumbnails"),
+            "thumbnail_format": flags.get("thumbnail_format", "jpeg"),
+            "thumbnail_cache_size": flags.get("thumbnail_cache_size", DEFAULT_THUMBNAIL_CACHE_SIZE // MB),
+            "link_mode": flags.get("link_mode", "move"),
+            "disk_order": flags.get("disk_order"),
         }
 
 
@@ -211,6 +608,7 @@ def interactive_mode(logger):
         validate_source_and_target(source, target)
         test_mode = input("Test mode? (y/n): ").strip().lower() == "y"
         verbose = input("Verbose mode? (y/n): ").strip().lower() == "y"
+        recursive = input("Include subfolders? (y/n): ").strip().lower() == "y"
         print("Choose operation mode:")
         print("1) Rename only")
         print("2) Move only")
@@ -226,9 +624,32 @@ def interactive_mode(logger):
             raise ValueError("Invalid selection. Choose 1, 2, or 3.")
         return {
             "source_folder": source,
+            "source_folders": [source],
             "target_folder": target,
             "test_mode": test_mode,
             "verbose": verbose,
+            "workers": 1,
+            "use_index": True,
+            "algorithm": "md5",
+            "recursive": recursive,
+            "resume": False,
+            "use_capture_date": False,
+            "watch": False,
+            "near_duplicates": None,
+            "perceptual_hash": "dhash",
+            "report": None,
+            "prometheus": None,
+            "layout": DEFAULT_LAYOUT,
+            "max_entries": None,
+            "durability": "none",
+            "sync_every": DEFAULT_SYNC_EVERY,
+            "sync_interval": DEFAULT_SYNC_INTERVAL,
+            "shard": None,
+            "thumbnails": None,
+            "thumbnail_format": "jpeg",
+            "thumbnail_cache_size": DEFAULT_THUMBNAIL_CACHE_SIZE // MB,
+            "link_mode": "move",
+            "disk_order": None,
             "mode": mode,
         }
 
@@ -246,196 +667,53 @@ def cli():
     logger = setup_logger("bulk_photo_processor", "logs/bulk_photo_processor.log")
     logger.info("CLI started.")
 
-    # Mode 1: CLI mode
-    try:
-        config = try_cli_mode(args, logger)
-        if config:
-            logger.info("Running in CLI mode.")
-            # ------------------------------------------------------------
-            # Rename-only / Move-only logic (CLI overrides config)
-            # ------------------------------------------------------------
-            if args.rename_only and args.move_only:
-                raise ValueError("Cannot use --rename-only and --move-only together.")
-
-            # CLI overrides config
-            if args.rename_only:
-                logger.info("Running in rename-only mode (CLI override).")
-                rename_photos(
-                    str(config["source_folder"]),
-                    test_mode=config["test_mode"],
-                    verbose=config["verbose"]
-                )
-                return
-
-            if args.move_only:
-                logger.info("Running in move-only mode (CLI override).")
-                move_photos(
-                    str(config["source_folder"]),
-                    str(config["target_folder"]),
-                    test_mode=config["test_mode"],
-                    verbose=config["verbose"]
-                )
-                return
-
-            # ------------------------------------------------------------
-            # No CLI override → use config mode
-            # ------------------------------------------------------------
-            mode = config.get("mode", "full")
-
-            if mode == "rename-only":
-                logger.info("Running in rename-only mode (config).")
-                rename_photos(
-                    str(config["source_folder"]),
-                    test_mode=config["test_mode"],
-                    verbose=config["verbose"]
-                )
-                return
+    if args.hash_strategy:
+        set_default_strategy(args.hash_strategy)
 
-            if mode == "move-only":
-                logger.info("Running in move-only mode (config).")
-                move_photos(
-                    str(config["source_folder"]),
-                    str(config["target_folder"]),
-                    test_mode=config["test_mode"],
-                    verbose=config["verbose"]
-                )
-                return
-
-            # Default: full pipeline
-            logger.info("Running full rename + move pipeline.")
-            config_no_mode = {k: v for k, v in config.items() if k != "mode"}
-            process_photos(**config_no_mode)
-            return
-    except Exception as e:
-        logger.error(f"CLI mode error: {e}")
-        raise
-
-    # Mode 2: Config mode
-    try:
-        config = try_config_mode(args, logger)
-        if config:
-            logger.info("Running in config mode.")
-
-            # ------------------------------------------------------------
-            # Rename-only / Move-only logic (CLI overrides config)
-            # ------------------------------------------------------------
-            if args.rename_only and args.move_only:
-                raise ValueError("Cannot use --rename-only and --move-only together.")
-
-            # CLI overrides config
-            if args.rename_only:
-                logger.info("Running in rename-only mode (CLI override).")
-                rename_photos(
-                    str(config["source_folder"]),
-                    test_mode=config["test_mode"],
-                    verbose=config["verbose"]
-                )
-                return
-
-            if args.move_only:
-                logger.info("Running in move-only mode (CLI override).")
-                move_photos(
-                    str(config["source_folder"]),
-                    str(config["target_folder"]),
-                    test_mode=config["test_mode"],
-                    verbose=config["verbose"]
-                )
-                return
-
-            # ------------------------------------------------------------
-            # No CLI override → use config mode
-            # ------------------------------------------------------------
-            mode = config.get("mode", "full")
-
-            if mode == "rename-only":
-                logger.info("Running in rename-only mode (config).")
-                rename_photos(
-                    str(config["source_folder"]),
-                    test_mode=config["test_mode"],
-                    verbose=config["verbose"]
-                )
-                return
-
-            if mode == "move-only":
-                logger.info("Running in move-only mode (config).")
-                move_photos(
-                    str(config["source_folder"]),
-                    str(config["target_folder"]),
-                    test_mode=config["test_mode"],
-                    verbose=config["verbose"]
-                )
-                return
-
-            # Default: full pipeline
-            logger.info("Running full rename + move pipeline.")
-            config_no_mode = {k: v for k, v in config.items() if k != "mode"}
-            process_photos(**config_no_mode)
-            return
-    except Exception as e:
-        logger.error(f"Config mode error: {e}")
-        raise
-
-    # Mode 3: Interactive mode
-    try:
-        config = interactive_mode(logger)
-        logger.info("Running in interactive mode.")
-
-        # ------------------------------------------------------------
-        # Rename-only / Move-only logic (CLI overrides config)
-        # ------------------------------------------------------------
-        if args.rename_only and args.move_only:
-            raise ValueError("Cannot use --rename-only and --move-only together.")
-
-        # CLI overrides config
-        if args.rename_only:
-            logger.info("Running in rename-only mode (CLI override).")
-            rename_photos(
-                str(config["source_folder"]),
-                test_mode=config["test_mode"],
-                verbose=config["verbose"]
-            )
-            return
-
-        if args.move_only:
-            logger.info("Running in move-only mode (CLI override).")
-            move_photos(
-                str(config["source_folder"]),
-                str(config["target_folder"]),
-                test_mode=config["test_mode"],
-                verbose=config["verbose"]
-            )
-            return
-
-        # ------------------------------------------------------------
-        # No CLI override → use config mode
-        # ------------------------------------------------------------
-        mode = config.get("mode", "full")
-
-        if mode == "rename-only":
-            logger.info("Running in rename-only mode (config).")
-            rename_photos(
-                str(config["source_folder"]),
-                test_mode=config["test_mode"],
-                verbose=config["verbose"]
-            )
+    # Applying a plan needs neither source nor destination
+    if args.apply:
+        try:
+            logger.info(f"Applying plan '{args.apply}'.")
+            workers = args.workers if args.workers is not None else 1
+            apply_plan(args.apply, workers=workers, resume=args.resume, reporter=ConsoleReporter(args.verbose))
             return
+        except Exception as e:
+            logger.error(f"Apply plan error: {e}")
+            raise
 
-        if mode == "move-only":
-            logger.info("Running in move-only mode (config).")
-            move_photos(
-                str(config["source_folder"]),
-                str(config["target_folder"]),
-                test_mode=config["test_mode"],
-                verbose=config["verbose"]
+    # Deduplicating works on the archive alone
+    if args.dedupe:
+        try:
+            if not args.destination_folder:
+                raise ValueError("--dedupe needs the archive folder as -d/--destination-folder.")
+            logger.info(f"Deduplicating '{args.destination_folder}'.")
+            dedupe_archive(
+                args.destination_folder,
+                link_mode=args.reclaim,
+                test_mode=args.test,
+                workers=args.workers if args.workers is not None else 1,
+                use_index=not args.no_index,
+                algorithm=args.algorithm or "md5",
+                reporter=ConsoleReporter(args.verbose, args.test)
             )
             return
-
-        # Default: full pipeline
-        logger.info("Running full rename + move pipeline.")
-        config_no_mode = {k: v for k, v in config.items() if k != "mode"}
-        process_photos(**config_no_mode)
-
-
-    except Exception as e:
-        logger.error(f"Interactive mode error: {e}")
-        raise
+        except Exception as e:
+            logger.error(f"Dedupe error: {e}")
+            raise
+
+    # The execution modes differ only in where the configuration comes from
+    execution_modes = (
+        ("CLI mode", "CLI mode", lambda: try_cli_mode(args, logger)),
+        ("config mode", "Config mode", lambda: try_config_mode(args, logger)),
+        ("interactive mode", "Interactive mode", lambda: interactive_mode(logger)),
+    )
+    for name, title, resolve in execution_modes:
+        try:
+            config = resolve()
+            if config:
+                logger.info(f"Running in {name}.")
+                run_config(args, config, logger)
+                return
+        except Exception as e:
+            logger.error(f"{title} error: {e}")
+            raise
@@ -0,0 +1,177 @@
+import os
+from contextlib import nullcontext
+from pathlib import Path
+
+from .hashing import PARTIAL_HASH_MIN_SIZE, calculate_checksum, new_hash, partial_checksum
+from .parallel import ordered_map
+from .reporting import ConsoleReporter
+from .scanner import scan_files
+from .target_index import TargetIndex
+from .thumbnails import THUMBNAIL_DIR_NAME
+from .transfer import LINK_MODES, replace_with_link
+
+
+class FileCopy:
+    """One inode of the archive and every path that points to it."""
+
+    __slots__ = ('paths', 'size', 'mtime_ns', 'device', 'inode')
+
+    def __init__(self, path, st):
+        self.paths = [path]
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.device = st.st_dev
+        self.inode = st.st_ino
+
+    def unchanged(self):
+        """True if the file still has the size and mtime it was hashed with."""
+        try:
+            st = os.stat(self.paths[0])
+        except FileNotFoundError:
+            return False
+        return (st.st_size, st.st_mtime_ns, st.st_ino) == (self.size, self.mtime_ns, self.inode)
+
+
+def _refine(groups, key_func, workers):
+    """Split each group of copies by key_func(copy), keeping groups of two or more."""
+    buckets = {}
+    keyed = ordered_map(key_func, (copy for group in groups for copy in group), workers)
+    try:
+        for copy, key in keyed:
+            buckets.setdefault((copy.size, key), []).append(copy)
+    finally:
+        keyed.close()
+    return [group for group in buckets.values() if len(group) > 1]
+
+
+def find_duplicates(root, algorithm='md5', index=None, workers=1):
+    """
+    Return the sets of identical files anywhere under `root`.
+
+    Files are grouped by size first; only sizes shared by two or more files
+    are read at all. Large files are then split by a head/tail checksum and
+    only the remaining candidates get a full checksum (taken from `index`
+    when it is up to date). Paths that are already hardlinks of each other
+    count as one copy. Each set is a list of FileCopy, sorted by path so
+    the oldest-named copy comes first. Hidden files (the index, journals,
+    partial copies), the thumbnail cache and empty files are ignored.
+    """
+    root = Path(root).resolve()
+    by_inode = {}
+    for entry in scan_files(root, recursive=True, exclude=[root / THUMBNAIL_DIR_NAME]):
+        if entry.name.startswith('.'):
+            continue
+        st = entry.stat(follow_symlinks=False)
+        if st.st_size == 0:
+            continue
+        key = (st.st_dev, st.st_ino)
+        if key in by_inode:
+            by_inode[key].paths.append(Path(entry.path))
+        else:
+            by_inode[key] = FileCopy(Path(entry.path), st)
+
+    by_size = {}
+    for copy in by_inode.values():
+        copy.paths.sort()
+        by_size.setdefault(copy.size, []).append(copy)
+    groups = [group for group in by_size.values() if len(group) > 1]
+
+    def partial(copy):
+        if index:
+            return index.checksum(copy.paths[0], algorithm, partial=True)
+        return partial_checksum(copy.paths[0], algorithm)
+
+    def full(copy):
+        if index:
+            return index.checksum(copy.paths[0], algorithm)
+        return calculate_checksum(copy.paths[0], algorithm)
+
+    large = [group for group in groups if group[0].size >= PARTIAL_HASH_MIN_SIZE]
+    small = [group for group in groups if group[0].size < PARTIAL_HASH_MIN_SIZE]
+    # Checksums missing from the index are written in batches, not one transaction per file
+    with index.deferred() if index else nullcontext():
+        groups = _refine(small + _refine(large, partial, workers), full, workers)
+
+    duplicate_sets = [sorted(group, key=lambda copy: copy.paths[0]) for group in groups]
+    duplicate_sets.sort(key=lambda group: group[0].paths[0])
+    return duplicate_sets
+
+
+def dedupe_archive(archive_folder, link_mode=None, test_mode=False, verbose=False, workers=1, use_index=True,
+                   algorithm='md5', reporter=None):
+    """
+    Find duplicate files across the whole archive and optionally reclaim their space.
+
+    Every duplicate set is reported to `reporter` (see reporting.Reporter;
+    the console by default). With `link_mode` ('hardlink' or 'reflink'),
+    each extra copy is replaced, atomically, by a link to the first copy of
+    its set; nothing is ever deleted outright. Copies that changed since
+    they were hashed, or that cannot be linked (another filesystem, no
+    reflink support), are left alone and reported. Test mode only reports.
+    Returns a dict of counts and bytes.
+    """
+    archive_path = Path(archive_folder).resolve()
+    if not archive_path.is_dir():
+        raise FileNotFoundError(f"Archive folder '{archive_path}' does not exist or is not a directory.")
+    if link_mode is not None and link_mode not in LINK_MODES:
+        raise ValueError(f"Invalid link mode '{link_mode}'. Must be one of: {', '.join(LINK_MODES)}.")
+    if workers < 1:
+        raise ValueError(f"Number of workers must be at least 1, got {workers}.")
+    new_hash(algorithm)
+
+    reporter = reporter or ConsoleReporter(verbose, test_mode)
+    index = TargetIndex(archive_path) if use_index and not test_mode else None
+    try:
+        duplicate_sets = find_duplicates(archive_path, algorithm, index, workers)
+    finally:
+        if index:
+            index.close()
+
+    summary = {"sets": len(duplicate_sets), "duplicates": 0, "reclaimable": 0, "linked": 0, "reclaimed": 0,
+               "failed": 0}
+    for copies in duplicate_sets:
+        keeper, extras = copies[0], copies[1:]
+        summary["duplicates"] += len(extras)
+        summary["reclaimable"] += keeper.size * len(extras)
+        reporter.event("duplicate_set", keeper.paths[0], copies=[path for copy in extras for path in copy.paths],
+                       size=keeper.size)
+
+        if not link_mode or test_mode:
+            continue
+        if not keeper.unchanged():
+            summary["failed"] += sum(len(copy.paths) for copy in extras)
+            for copy in extras:
+                for path in copy.paths:
+                    reporter.event("left_alone", path, keeper.paths[0],
+                                   reason="the kept copy changed since it was hashed")
+            continue
+
+        for copy in extras:
+            if not copy.unchanged():
+                summary["failed"] += len(copy.paths)
+                for path in copy.paths:
+                    reporter.event("left_alone", path, keeper.paths[0], reason="changed since it was hashed")
+                continue
+            reclaimed = True
+            for path in copy.paths:
+                try:
+                    replace_with_link(keeper.paths[0], path, link_mode)
+                except OSError as e:
+                    summary["failed"] += 1
+                    reclaimed = False
+                    reporter.event("left_alone", path, keeper.paths[0], reason=e.strerror or str(e))
+                    continue
+                summary["linked"] += 1
+                reporter.event("linked", path, keeper.paths[0])
+            if reclaimed:
+                summary["reclaimed"] += keeper.size
+
+    reporter.message(f"\nDuplicate sets: {summary['sets']}")
+    reporter.message(f"Duplicate copies: {summary['duplicates']}")
+    reporter.message(f"Reclaimable: {summary['reclaimable'] / 1e6:.1f} MB")
+    if link_mode and not test_mode:
+        reporter.message(f"Replaced by {link_mode}s: {summary['linked']}")
+        reporter.message(f"Reclaimed: {summary['reclaimed'] / 1e6:.1f} MB")
+        if summary["failed"]:
+            reporter.message(f"Left alone: {summary['failed']}")
+    return summary
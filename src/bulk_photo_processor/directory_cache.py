@@ -0,0 +1,203 @@
+import os
+import re
+import threading
+from pathlib import Path
+
+# The stem of a 'stem_NN.ext' collision name, as unique_path() makes them
+VARIANT_STEM = re.compile(r'(.+)_\d{2,}')
+
+
+class DirectoryCache:
+    """
+    Per-run, in-memory view of the destination folders.
+
+    Each folder is listed once with os.scandir the first time it is needed;
+    after that, existence checks, folder creation and collision naming are
+    answered from memory and kept up to date as files are added. Names are
+    compared with os.path.normcase, so case-insensitive targets behave.
+    The cache is shared with worker threads and guarded by a lock.
+
+    Writers that run side by side (several pipelines filling one archive)
+    take names with claim() and hand them back with release() once the
+    file is in place; wait_settled() lets readers wait until a claimed name
+    holds a complete file before comparing with it.
+
+    With `simulate` (test mode, plans), names added or claimed are only
+    planned, never written: exists() still reports them, so collision
+    names match a real run, but planned() tells callers there is no file
+    to compare with, and matching() and variants() leave them out.
+    """
+
+    def __init__(self, simulate=False):
+        self.simulate = simulate
+        self._names = {}
+        self._existing_folders = set()
+        self._next_suffix = {}
+        # (folder, stem, suffix) -> the 'stem_NN.ext' names in that folder, keyed like _next_suffix
+        self._variants = {}
+        self._claimed = set()
+        self._planned = set()
+        self._lock = threading.Condition()
+
+    def _load(self, folder):
+        # Caller holds the lock
+        names = self._names.get(folder)
+        if names is None:
+            try:
+                with os.scandir(folder) as entries:
+                    names = {os.path.normcase(entry.name) for entry in entries}
+                self._existing_folders.add(folder)
+            except FileNotFoundError:
+                names = set()
+            self._names[folder] = names
+            for name in names:
+                self._index(folder, name)
+        return names
+
+    def _add(self, folder, name):
+        # Caller holds the lock; `name` is normcased
+        self._load(folder).add(name)
+        self._index(folder, name)
+
+    def _index(self, folder, name):
+        # Caller holds the lock
+        stem, suffix = os.path.splitext(name)
+        variant = VARIANT_STEM.fullmatch(stem)
+        if variant:
+            self._variants.setdefault((folder, variant[1], suffix), set()).add(name)
+
+    def ensure_folder(self, folder, create=True):
+        """Create `folder` (and parents) unless it is already known to exist."""
+        folder = Path(folder)
+        with self._lock:
+            self._load(folder)
+            if folder in self._existing_folders:
+                return
+            if create:
+                folder.mkdir(parents=True, exist_ok=True)
+            self._existing_folders.add(folder)
+            # Keep an already listed parent up to date with the new folder
+            if folder.parent in self._names:
+                self._add(folder.parent, os.path.normcase(folder.name))
+
+    def exists(self, path):
+        """Return True if a file named like `path` is in its folder."""
+        path = Path(path)
+        with self._lock:
+            return os.path.normcase(path.name) in self._load(path.parent)
+
+    def count(self, folder):
+        """Return the number of entries (files and folders) in `folder`."""
+        with self._lock:
+            return len(self._load(Path(folder)))
+
+    def add(self, path):
+        """Record that `path` now exists (or, when simulating, will)."""
+        path = Path(path)
+        with self._lock:
+            self._add(path.parent, os.path.normcase(path.name))
+            if self.simulate:
+                self._planned.add((path.parent, os.path.normcase(path.name)))
+
+    def discard(self, path):
+        """Record that `path` no longer exists."""
+        path = Path(path)
+        name = os.path.normcase(path.name)
+        with self._lock:
+            self._load(path.parent).discard(name)
+            self._planned.discard((path.parent, name))
+            stem, suffix = os.path.splitext(name)
+            variant = VARIANT_STEM.fullmatch(stem)
+            if variant:
+                self._variants.get((path.parent, variant[1], suffix), set()).discard(name)
+
+    def planned(self, path):
+        """Return True if the name of `path` is only taken by a simulated file, with nothing to compare."""
+        path = Path(path)
+        with self._lock:
+            return (path.parent, os.path.normcase(path.name)) in self._planned
+
+    def claim(self, path, compared=True):
+        """
+        Take the name of `path`, or its first free 'stem_NN.ext' variant, for
+        a file about to be written, and return it. If the name is already
+        taken and the caller has not compared its file with the one there
+        (`compared` is False), nothing is taken and None is returned.
+        """
+        path = Path(path)
+        with self._lock:
+            names = self._load(path.parent)
+            if os.path.normcase(path.name) in names:
+                if not compared:
+                    return None
+                path = self._unique_path(path, names)
+            self._add(path.parent, os.path.normcase(path.name))
+            self._claimed.add((path.parent, os.path.normcase(path.name)))
+            if self.simulate:
+                self._planned.add((path.parent, os.path.normcase(path.name)))
+            return path
+
+    def release(self, path):
+        """Mark a claimed name as holding a complete file."""
+        path = Path(path)
+        with self._lock:
+            self._claimed.discard((path.parent, os.path.normcase(path.name)))
+            self._lock.notify_all()
+
+    def wait_settled(self, path):
+        """Wait until `path` is not being written under a claim."""
+        path = Path(path)
+        with self._lock:
+            self._lock.wait_for(lambda: (path.parent, os.path.normcase(path.name)) not in self._claimed)
+
+    def unique_path(self, path):
+        """
+        Return `path`, or the first free 'stem_NN.ext' variant of it.
+
+        The next suffix to try is remembered per name, so a burst of files
+        sharing one name is resolved without probing earlier suffixes again.
+        """
+        path = Path(path)
+        with self._lock:
+            names = self._load(path.parent)
+            if os.path.normcase(path.name) not in names:
+                return path
+            return self._unique_path(path, names)
+
+    def matching(self, folder, pattern):
+        """
+        Return the files of `folder` whose (normcased) name fully matches the
+        regex `pattern`, by name; simulated names are left out.
+        """
+        folder = Path(folder)
+        with self._lock:
+            names = sorted(name for name in self._load(folder)
+                           if pattern.fullmatch(name) and (folder, name) not in self._planned)
+        return [folder / name for name in names]
+
+    def variants(self, path):
+        """
+        Return the existing 'stem_NN.ext' variants of `path`, by name.
+        They are indexed as names are listed or added, so no folder is
+        scanned; simulated names are left out.
+        """
+        path = Path(path)
+        folder = path.parent
+        with self._lock:
+            self._load(folder)
+            names = self._variants.get((folder, os.path.normcase(path.stem), os.path.normcase(path.suffix)), ())
+            names = sorted(name for name in names if (folder, name) not in self._planned)
+        return [folder / name for name in names]
+
+    def _unique_path(self, path, names):
+        # Caller holds the lock
+        folder = path.parent
+        key = (folder, os.path.normcase(path.stem), os.path.normcase(path.suffix))
+        counter = self._next_suffix.get(key, 1)
+        while True:
+            candidate = folder / f"{path.stem}_{counter:02}{path.suffix}"
+            if os.path.normcase(candidate.name) not in names:
+                break
+            counter += 1
+        self._next_suffix[key] = counter
+        return candidate
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from .metrics import RunMetrics
+
+DURABILITY_MODES = ('none', 'batch', 'strict')
+# Batch mode syncs after this many operations or seconds, whichever comes first
+DEFAULT_SYNC_EVERY = 100
+DEFAULT_SYNC_INTERVAL = 1.0
+
+
+def fsync_path(path):
+    """Flush a file or folder to disk. Folders cannot be opened on Windows, so they are skipped there."""
+    if os.name == 'nt' and os.path.isdir(path):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Durability:
+    """
+    Decides when completed renames and moves are forced to disk.
+
+    A rename or move only changes folder entries, and the kernel writes
+    those back whenever it likes, so after a power cut a "done" move may
+    have vanished. Operations are handed to commit() once done; it records
+    them in the journal according to `mode`:
+
+    - 'none': committed at once, nothing is synced (fastest).
+    - 'batch': the changed folders are synced every `every` operations or
+      `interval` seconds, then the journal commits of that batch are
+      written and the journal is synced. After a crash, everything the
+      journal shows as committed is on disk; the rest is settled by
+      --resume like any interrupted operation.
+    - 'strict': each file and its folders are synced before its commit is
+      written and synced, so at most the file in flight is lost.
+
+    Folders created during the run (under `root`) are synced together with
+    their parents the first time they are seen, so new YYYY/MM folders
+    survive as well. In 'batch' and 'strict' mode, moves across filesystems
+    also sync the destination folder before the source is removed (see
+    transfer.move_file()). Sync time is recorded as the 'sync' stage of
+    `metrics`.
+    Call close() (or use it as a context manager) to sync the last batch.
+    """
+
+    def __init__(self, mode='none', journal=None, every=DEFAULT_SYNC_EVERY, interval=DEFAULT_SYNC_INTERVAL,
+                 root=None, metrics=None):
+        if mode not in DURABILITY_MODES:
+            raise ValueError(f"Invalid durability mode '{mode}'. Must be one of: {', '.join(DURABILITY_MODES)}.")
+        if every < 1:
+            raise ValueError(f"Sync batch size must be at least 1, got {every}.")
+        self.mode = mode
+        self.journal = journal
+        self.every = every
+        self.interval = interval
+        self.root = Path(root) if root else None
+        self.metrics = metrics or RunMetrics()
+        self._folders = set()
+        self._commits = []
+        self._seen = set()
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _changed_folders(self, paths):
+        # Caller holds the lock
+        folders = set()
+        for path in paths:
+            folder = Path(path).parent
+            folders.add(folder)
+            if folder not in self._seen:
+                self._seen.add(folder)
+                # A new folder is only durable once the entry in its parent is
+                if self.root and folder.is_relative_to(self.root):
+                    folders.update(parent for parent in folder.parents if parent.is_relative_to(self.root))
+        return folders
+
+    def commit(self, op_id, *paths):
+        """
+        Commit journal operation `op_id` (None without a journal), which
+        changed `paths` (its source and destination).
+        """
+        if self.mode == 'none':
+            if self.journal and op_id is not None:
+                self.journal.commit(op_id)
+            return
+
+        with self._lock:
+            folders = self._changed_folders(paths)
+            if self.mode == 'strict':
+                with self.metrics.timed("sync"):
+                    for path in paths:
+                        if os.path.isfile(path):
+                            fsync_path(path)
+                    for folder in folders:
+                        fsync_path(folder)
+                self._commits.append(op_id)
+                self._flush_journal()
+                return
+
+            self._folders.update(folders)
+            self._commits.append(op_id)
+            if len(self._commits) >= self.every or time.monotonic() - self._last_sync >= self.interval:
+                self._sync()
+
+    def _flush_journal(self):
+        # Caller holds the lock
+        commits, self._commits = self._commits, []
+        if self.journal:
+            for op_id in commits:
+                if op_id is not None:
+                    self.journal.commit(op_id)
+            with self.metrics.timed("sync"):
+                self.journal.sync()
+        self.metrics.count("syncs")
+
+    def _sync(self):
+        # Caller holds the lock
+        with self.metrics.timed("sync"):
+            for folder in self._folders:
+                try:
+                    fsync_path(folder)
+                except FileNotFoundError:
+                    pass  # emptied and removed since
+        self._folders.clear()
+        self._flush_journal()
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Sync and commit the operations of the current batch now."""
+        with self._lock:
+            if self._commits:
+                self._sync()
+
+    def close(self):
+        self.sync()
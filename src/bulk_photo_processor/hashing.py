@@ -0,0 +1,256 @@
+import argparse
+import hashlib
+import mmap
+import os
+import time
+from pathlib import Path
+
+# Files smaller than this are compared with a full hash straight away:
+# reading head and tail first would cost about as much as reading everything.
+PARTIAL_HASH_MIN_SIZE = 8 * 1024 * 1024
+PARTIAL_HASH_BLOCK_SIZE = 64 * 1024
+
+XXHASH_ALGORITHMS = ('xxh32', 'xxh64', 'xxh128', 'xxh3_64', 'xxh3_128')
+
+# Ways of feeding a file to a hash object, see calculate_checksum()
+STRATEGIES = ('file_digest', 'readinto', 'mmap', 'read')
+
+# Read sizes are derived from the filesystem's preferred block size and
+# clamped to this range; results are cached per device.
+MIN_BUFFER_SIZE = 256 * 1024
+MAX_BUFFER_SIZE = 4 * 1024 * 1024
+BLOCKS_PER_BUFFER = 256
+
+_default_strategy = 'readinto'
+_device_buffer_sizes = {}
+
+
+def new_hash(algorithm='md5'):
+    """
+    Return a new hash object for `algorithm`.
+
+    Any algorithm known to hashlib is accepted (md5, sha1, blake2b, ...).
+    The xxHash family is supported when the optional 'xxhash' package is installed.
+    """
+    if algorithm in XXHASH_ALGORITHMS:
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError(
+                f"Checksum algorithm '{algorithm}' requires the 'xxhash' package (pip install xxhash)."
+            )
+        return getattr(xxhash, algorithm)()
+
+    try:
+        return hashlib.new(algorithm)
+    except ValueError:
+        raise ValueError(f"Unsupported checksum algorithm '{algorithm}'.")
+
+
+def available_algorithms():
+    """Return the sorted names of all checksum algorithms usable on this system."""
+    algorithms = set(hashlib.algorithms_available)
+    try:
+        import xxhash  # noqa: F401
+        algorithms.update(XXHASH_ALGORITHMS)
+    except ImportError:
+        pass
+    return sorted(algorithms)
+
+
+def set_default_strategy(strategy):
+    """Select the strategy used by calculate_checksum() when none is given."""
+    global _default_strategy
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown hashing strategy '{strategy}'. Choose from: {', '.join(STRATEGIES)}.")
+    _default_strategy = strategy
+
+
+def buffer_size_for(stat_result):
+    """
+    Return the read size to use for a file, tuned to its device.
+
+    Network and RAID filesystems report large preferred block sizes and
+    get larger reads; local disks stay around 1 MiB.
+    """
+    buffer_size = _device_buffer_sizes.get(stat_result.st_dev)
+    if buffer_size is None:
+        block_size = getattr(stat_result, 'st_blksize', 0) or 4096
+        buffer_size = min(max(block_size * BLOCKS_PER_BUFFER, MIN_BUFFER_SIZE), MAX_BUFFER_SIZE)
+        _device_buffer_sizes[stat_result.st_dev] = buffer_size
+    return buffer_size
+
+
+def _hash_readinto(f, hash_alg, buffer_size):
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    while True:
+        n = f.readinto(buffer)
+        if not n:
+            break
+        hash_alg.update(view[:n])
+
+
+def _hash_mmap(f, hash_alg, size):
+    if size == 0:
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, 'madvise'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        hash_alg.update(mapped)
+
+
+def _hash_read(f, hash_alg, buffer_size):
+    for chunk in iter(lambda: f.read(buffer_size), b""):
+        hash_alg.update(chunk)
+
+
+def calculate_checksum(file_path, algorithm='md5', strategy=None, buffer_size=None):
+    """
+    Calculate the checksum of a file using the specified algorithm.
+
+    `strategy` selects how the file is read:
+      - 'file_digest': hashlib.file_digest(), the hashing loop runs in C
+      - 'readinto':    one reused buffer filled with readinto() (default)
+      - 'mmap':        the whole file is memory-mapped and hashed in one call
+      - 'read':        plain read() calls, allocating a new chunk each time
+    `buffer_size` overrides the per-device read size.
+    """
+    strategy = strategy or _default_strategy
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown hashing strategy '{strategy}'. Choose from: {', '.join(STRATEGIES)}.")
+
+    hash_alg = new_hash(algorithm)
+    try:
+        with Path(file_path).open('rb', buffering=0) as f:
+            st = os.fstat(f.fileno())
+            if strategy == 'file_digest':
+                hash_alg = hashlib.file_digest(f, lambda: hash_alg)
+            elif strategy == 'mmap':
+                _hash_mmap(f, hash_alg, st.st_size)
+            else:
+                size = buffer_size or buffer_size_for(st)
+                if strategy == 'readinto':
+                    _hash_readinto(f, hash_alg, size)
+                else:
+                    _hash_read(f, hash_alg, size)
+    except Exception as e:
+        raise RuntimeError(f"Error calculating checksum for {file_path}: {e}")
+    return hash_alg.hexdigest()
+
+
+def partial_checksum(file_path, algorithm='md5', block_size=PARTIAL_HASH_BLOCK_SIZE):
+    """
+    Calculate a checksum over the file size and its first and last blocks.
+
+    Two files with different partial checksums are certainly different;
+    equal partial checksums still need a full comparison.
+    """
+    hash_alg = new_hash(algorithm)
+    try:
+        with Path(file_path).open('rb', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            hash_alg.update(size.to_bytes(8, 'little'))
+            hash_alg.update(f.read(block_size))
+            if size > block_size:
+                f.seek(max(block_size, size - block_size))
+                hash_alg.update(f.read(block_size))
+    except Exception as e:
+        raise RuntimeError(f"Error calculating partial checksum for {file_path}: {e}")
+    return hash_alg.hexdigest()
+
+
+def compare_files(source_file, target_file, index=None, algorithm='md5', checksum_func=calculate_checksum,
+                  partial_checksum_func=partial_checksum):
+    """
+    Compare a source file against an existing target.
+
+    Checks are tiered: size first, then (for large files) a checksum of the
+    head and tail blocks, and only then a full checksum.
+    Returns a tuple (is_duplicate, source_checksum). The source checksum is
+    None when an earlier tier already told the files apart. When an index is
+    given, target checksums are taken from it instead of rereading the file.
+    `checksum_func` and `partial_checksum_func` hash the files (see
+    RunMetrics.checksum_funcs()).
+    """
+    size = source_file.stat().st_size
+    if size != target_file.stat().st_size:
+        return False, None
+
+    if size >= PARTIAL_HASH_MIN_SIZE:
+        if index:
+            target_partial = index.checksum(target_file, algorithm, partial=True)
+        else:
+            target_partial = partial_checksum_func(target_file, algorithm)
+        if partial_checksum_func(source_file, algorithm) != target_partial:
+            return False, None
+
+    source_checksum = checksum_func(source_file, algorithm)
+    if index:
+        target_checksum = index.checksum(target_file, algorithm)
+    else:
+        target_checksum = checksum_func(target_file, algorithm)
+    return source_checksum == target_checksum, source_checksum
+
+
+def is_duplicate(source_file, target_file, index=None, algorithm='md5'):
+    """
+    Return True if both files have the same size and checksum.
+    """
+    return compare_files(source_file, target_file, index, algorithm)[0]
+
+
+def benchmark(file_path, algorithm='md5', strategies=STRATEGIES, buffer_sizes=(None,), repeat=3):
+    """
+    Time calculate_checksum() on a file for each strategy and read size.
+
+    Returns a list of dicts with the best time of `repeat` runs and the
+    resulting throughput in MB/s. The first run also warms the page cache,
+    so use a file larger than RAM to measure the storage itself.
+    """
+    size = os.stat(file_path).st_size
+    results = []
+    for strategy in strategies:
+        # Read size is not configurable for file_digest and mmap
+        sizes = (None,) if strategy in ('file_digest', 'mmap') else buffer_sizes
+        for buffer_size in sizes:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                calculate_checksum(file_path, algorithm, strategy, buffer_size)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results.append({
+                "strategy": strategy,
+                "buffer_size": buffer_size,
+                "seconds": best,
+                "mb_per_s": size / best / 1e6 if best else float('inf'),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark checksum strategies on a file.")
+    parser.add_argument("file", help="File to hash, ideally a large video on the storage to measure.")
+    parser.add_argument("-a", "--algorithm", default="md5", help="Checksum algorithm (default: md5).")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per strategy (default: 3).")
+    parser.add_argument(
+        "-b", "--buffer-size", type=int, action="append",
+        help="Read size in bytes to try, may be repeated (default: tuned per device)."
+    )
+    args = parser.parse_args()
+
+    buffer_sizes = tuple(args.buffer_size) if args.buffer_size else (None,)
+    results = benchmark(args.file, args.algorithm, buffer_sizes=buffer_sizes, repeat=args.repeat)
+    tuned = buffer_size_for(os.stat(args.file))
+
+    print(f"{'strategy':<12} {'buffer':>10} {'seconds':>9} {'MB/s':>9}")
+    for result in sorted(results, key=lambda r: r["seconds"]):
+        buffer_size = result["buffer_size"]
+        if buffer_size is None:
+            buffer_size = tuned if result["strategy"] in ('readinto', 'read') else '-'
+        print(f"{result['strategy']:<12} {buffer_size:>10} {result['seconds']:>9.3f} {result['mb_per_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
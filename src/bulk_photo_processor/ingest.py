@@ -0,0 +1,124 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .metrics import RunMetrics
+from .options import RunOptions
+from .pipeline import TargetState, print_summary, run_pipeline
+from .reporting import ConsoleReporter
+
+
+def device_of(path):
+    """
+    Return a key for the physical device holding `path`.
+
+    On Linux, partitions of one disk map to the disk itself (through
+    /sys/dev/block), so two folders on one card reader share a key.
+    Elsewhere, and for network or virtual filesystems, the filesystem's
+    st_dev is used.
+    """
+    dev = os.stat(path).st_dev
+    try:
+        block = Path(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}").resolve(strict=True)
+    except OSError:
+        return dev
+    if (block / "partition").exists():
+        return block.parent.name
+    return block.name
+
+
+def group_by_device(source_folders):
+    """Return {device key: [sources]}, keeping the given order within each device."""
+    queues = {}
+    for source in source_folders:
+        queues.setdefault(device_of(source), []).append(source)
+    return queues
+
+
+def ingest_sources(source_folders, target_folder, options=None, reporter=None, **settings):
+    """
+    Rename and move photos from several sources into one destination at once.
+
+    Sources are queued per physical device (see device_of()), and each
+    device's queue is worked through by its own thread, one source at a
+    time, with the streaming pipeline of process_photos(). Card readers
+    and disks then all stay busy without two sources on one device
+    fighting over its heads. All pipelines share one TargetState, so
+    collision names and duplicate checks stay consistent across sources
+    and sequence numbers are never handed out twice. `options` (a
+    RunOptions, or keyword `settings`) apply to every pipeline; each gets
+    `workers` hashing threads, and `disk_order` helps most here, with one
+    reader per device. A failing source does not stop the others; the
+    failures are raised together at the end. Progress, events and the
+    summaries go to `reporter` (the console by default).
+    Returns {source: counts}.
+    """
+    sources = [Path(source).resolve() for source in source_folders]
+    target_path = Path(target_folder).resolve()
+
+    if not sources:
+        raise ValueError("At least one source folder must be provided.")
+    for source in sources:
+        if not source.is_dir():
+            raise FileNotFoundError(f"Source folder '{source}' does not exist or is not a directory.")
+    if len(set(sources)) != len(sources):
+        raise ValueError("The same source folder is listed more than once.")
+    options = RunOptions.of(options, **settings)
+    options.check()
+
+    try:
+        target_path.mkdir(parents=True, exist_ok=True)
+    except Exception as e:
+        raise RuntimeError(f"Error creating target folder '{target_path}': {e}")
+
+    reporter = reporter or ConsoleReporter(options.verbose, options.test_mode)
+    queues = group_by_device(sources)
+    positions = {source: number for number, source in enumerate(sources)}
+    reporter.message(f"Ingesting {len(sources)} sources from {len(queues)} devices into '{target_path}'.")
+
+    metrics = RunMetrics()
+    state = TargetState(target_path, metrics, options)
+    results = {}
+    errors = {}
+    stop = threading.Event()
+
+    def drain(queue):
+        # One thread per device: its sources run one after another
+        for source in queue:
+            if stop.is_set():
+                break
+            try:
+                results[source] = run_pipeline(source, target_path, options, metrics=metrics, reporter=reporter,
+                                               state=state, label=source.name, position=positions[source],
+                                               stop=stop)
+            except Exception as e:
+                errors[source] = e
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(queues)) as executor:
+            futures = [executor.submit(drain, queue) for queue in queues.values()]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # Ctrl+C reaches this thread only; let every pipeline finish its current file
+                stop.set()
+                raise
+    except BaseException:
+        metrics.save(options.report, options.prometheus, status="failed")
+        raise
+    finally:
+        state.close()
+    metrics.save(options.report, options.prometheus, status="failed" if errors else "ok")
+
+    # Always show summary
+    for source in sources:
+        if source in results:
+            reporter.message(f"\n{source}:")
+            print_summary(results[source], options.near_duplicates is not None, reporter)
+
+    if errors:
+        details = "; ".join(f"'{source}': {error}" for source, error in errors.items())
+        raise RuntimeError(f"{len(errors)} of {len(sources)} sources failed: {details}")
+    return results
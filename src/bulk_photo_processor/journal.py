@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from .hashing import calculate_checksum
+
+JOURNAL_FILE_NAME = ".bulk_photo_journal.jsonl"
+# Operations that leave their source in place (see transfer.TRANSFER_MODES)
+KEEP_SOURCE_OPS = {"hardlink", "reflink", "copy"}
+
+
+class Journal:
+    """
+    Write-ahead journal of renames and moves.
+
+    Every operation is appended as a 'begin' record before it touches the
+    filesystem and as a 'commit' record once it is done, one JSON object
+    per line, flushed immediately. If a run dies, the journal stays behind;
+    opening it again with `resume=True` finishes or rolls back the
+    operation that was in flight and restores the renamer's sequence
+    counter from the last committed rename. A run that completes removes
+    its journal.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.committed = set()
+        self.last_sequence = 0
+        self._pending = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            if not resume:
+                raise RuntimeError(
+                    f"An unfinished run left a journal at '{self.path}'. "
+                    "Use --resume to continue it, or delete the file to start over."
+                )
+            self._load()
+
+        try:
+            self._file = self.path.open("a", encoding="utf-8")
+            if self._file.tell():
+                # Never append to a line torn by the crash
+                self._file.write("\n")
+        except Exception as e:
+            raise RuntimeError(f"Error opening journal '{self.path}': {e}")
+
+        self._recover()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(remove=exc_type is None)
+
+    def _load(self):
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn line from the crash
+                    op_id = record["id"]
+                    self._next_id = max(self._next_id, op_id + 1)
+                    if record["event"] == "begin":
+                        self._pending[op_id] = record
+                    elif record["event"] == "commit":
+                        self._committed(self._pending.pop(op_id, record))
+                    else:
+                        self._pending.pop(op_id, None)
+        except Exception as e:
+            raise RuntimeError(f"Error reading journal '{self.path}': {e}")
+
+    def _committed(self, record):
+        self.committed.add(record.get("key", record["id"]))
+        self.last_sequence = max(self.last_sequence, record.get("sequence") or 0)
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def _recover(self):
+        """Settle operations that were begun but never committed."""
+        for op_id, record in sorted(self._pending.items()):
+            source = Path(record["src"])
+            destination = Path(record["dst"])
+            partial = destination.with_name(f".{destination.name}.partial")
+            partial.unlink(missing_ok=True)
+
+            if record["op"] in KEEP_SOURCE_OPS:
+                # Links and copies only get their final name once complete
+                done = destination.exists()
+            elif not source.exists() and destination.exists():
+                done = True
+            elif source.exists() and destination.exists():
+                # A cross-device copy finished but the source was not removed yet, or
+                # the destination is another file (a burst frame, another shard's photo):
+                # the source is only deleted if it is byte-identical to the destination
+                done = _same_content(source, destination)
+                if done:
+                    source.unlink()
+            else:
+                done = False
+
+            if done:
+                self._write({"id": op_id, "event": "commit", "key": record.get("key", op_id)})
+                self._committed(record)
+            else:
+                self._write({"id": op_id, "event": "rollback"})
+        self._pending.clear()
+
+    def begin(self, op, source, destination, sequence=None, key=None):
+        """Record an operation about to run and return its id."""
+        with self._lock:
+            op_id = self._next_id
+            self._next_id += 1
+            record = {"id": op_id, "event": "begin", "op": op, "src": str(source), "dst": str(destination)}
+            if sequence is not None:
+                record["sequence"] = sequence
+            if key is not None:
+                record["key"] = key
+            self._pending[op_id] = record
+            self._write(record)
+            return op_id
+
+    def commit(self, op_id):
+        """Record that an operation has completed."""
+        with self._lock:
+            record = self._pending.pop(op_id)
+            self._committed(record)
+            self._write({"id": op_id, "event": "commit", "key": record.get("key", op_id)})
+
+    def sync(self):
+        """Force the records written so far to disk."""
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    @property
+    def in_flight(self):
+        """True while an operation has begun but not yet committed."""
+        with self._lock:
+            return bool(self._pending)
+
+    def close(self, remove=False):
+        """Close the journal, deleting it if the run finished cleanly."""
+        with self._lock:
+            self._file.close()
+            if remove:
+                self.path.unlink(missing_ok=True)
+
+
+def _same_content(first, second):
+    if first.stat().st_size != second.stat().st_size:
+        return False
+    return calculate_checksum(first, 'sha256') == calculate_checksum(second, 'sha256')
+
+
+def open_journal(folder, test_mode=False, resume=False, shard=None):
+    """
+    Return a Journal stored in `folder`, or None in test mode. Each Shard
+    keeps its own journal, so shards can work on one folder at once.
+    """
+    if test_mode:
+        return None
+    name = JOURNAL_FILE_NAME
+    if shard:
+        name = name.replace(".jsonl", f".shard-{shard.index}-of-{shard.count}.jsonl")
+    return Journal(Path(folder) / name, resume)
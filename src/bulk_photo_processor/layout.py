@@ -0,0 +1,100 @@
+import os
+import re
+import threading
+from pathlib import Path
+
+from .directory_cache import DirectoryCache
+
+DEFAULT_LAYOUT = "YYYY/MM"
+# Date fields from the coarsest to the finest; auto-split folders use the
+# ones finer than the layout's last field
+LEVELS = ("year", "month", "day", "hour")
+_TOKENS = {"YYYY": "year", "MM": "month", "DD": "day"}
+_LAYOUT = re.compile(r'(?:YYYY|MM|DD|[-_])+(?:/(?:YYYY|MM|DD|[-_])+)*')
+
+
+def parse_layout(layout):
+    """
+    Return the folder parts of a layout such as 'YYYY/MM', 'YYYY/MM/DD' or
+    'YYYY/YYYY-MM' as format strings, e.g. ('{year}', '{month}').
+    """
+    if not _LAYOUT.fullmatch(layout or "") or "YYYY" not in layout:
+        raise ValueError(
+            f"Invalid layout '{layout}'. Use YYYY, MM and DD separated by '/' (folders), '-' or '_', "
+            "e.g. 'YYYY/MM' or 'YYYY/MM/DD'."
+        )
+    return tuple(re.sub(r'YYYY|MM|DD', lambda token: "{" + _TOKENS[token[0]] + "}", part)
+                 for part in layout.split("/"))
+
+
+class TargetLayout:
+    """
+    Decides which destination folder a photo goes to.
+
+    The folders come from `layout` (see parse_layout()). With `max_entries`,
+    a folder that already holds that many entries is split: new photos go
+    one level deeper, into a subfolder per day (then per hour) of the
+    finest field the layout lacks, e.g. 'YYYY/MM' becomes 'YYYY/MM/DD' for
+    busy months only. A photo whose name is already in a folder on its way
+    down stops there, so duplicate checks still find it, and once a
+    subfolder exists, later photos for it go there too.
+
+    Folder sizes come from the DirectoryCache listing (one scandir per
+    folder) plus the photos routed during the run, so nothing is rescanned.
+    Routing is meant to be done in processing order; it is thread-safe so
+    pipelines sharing a destination can share one layout.
+    """
+
+    def __init__(self, layout=DEFAULT_LAYOUT, max_entries=None, directories=None):
+        if max_entries is not None and max_entries < 1:
+            raise ValueError(f"Maximum entries per folder must be at least 1, got {max_entries}.")
+        self.layout = layout
+        self.parts = parse_layout(layout)
+        self.max_entries = max_entries
+        self.directories = directories or DirectoryCache()
+        deepest = max(LEVELS.index(_TOKENS[token]) for token in re.findall(r'YYYY|MM|DD', layout))
+        self.split_levels = LEVELS[deepest + 1:]
+        # folder -> [entries, {names routed there during the run}]
+        self._folders = {}
+        self._lock = threading.Lock()
+
+    def _folder_state(self, folder):
+        # Caller holds the lock
+        state = self._folders.get(folder)
+        if state is None:
+            state = self._folders[folder] = [self.directories.count(folder), set()]
+        return state
+
+    def _holds(self, folder, name):
+        # Caller holds the lock
+        return self.directories.exists(folder / name) or os.path.normcase(name) in self._folder_state(folder)[1]
+
+    def folder_for(self, target_path, fields, name):
+        """
+        Return the folder for a photo named `name` whose date `fields` are a
+        dict with year, month, day and hour (two-digit strings, four for the
+        year), and count the photo as routed there.
+        """
+        folder = Path(target_path).joinpath(*(part.format(**fields) for part in self.parts))
+        if not self.max_entries:
+            return folder
+
+        with self._lock:
+            for level in self.split_levels:
+                if self._holds(folder, name):
+                    break
+                subfolder = fields[level]
+                entries, _ = self._folder_state(folder)
+                if entries < self.max_entries and not self._holds(folder, subfolder):
+                    break
+                if not self._holds(folder, subfolder):
+                    state = self._folder_state(folder)
+                    state[0] += 1
+                    state[1].add(os.path.normcase(subfolder))
+                folder = folder / subfolder
+
+            state = self._folder_state(folder)
+            if os.path.normcase(name) not in state[1]:
+                state[0] += 1
+                state[1].add(os.path.normcase(name))
+        return folder
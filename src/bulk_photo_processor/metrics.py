@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .hashing import PARTIAL_HASH_BLOCK_SIZE, calculate_checksum, partial_checksum
+
+PROMETHEUS_PREFIX = "bulk_photo"
+
+
+def _percentile_ms(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))] * 1000, 3)
+
+
+class RunMetrics:
+    """
+    Timings and counters of one run, per stage.
+
+    Each call to a stage (scanning one entry, hashing one file, creating
+    one folder...) adds its duration, and optionally the bytes it handled,
+    so the report can show totals, throughput and p50/p99 latency per
+    stage. Counters record outcomes (moved, skipped, collisions...).
+    Safe to update from worker threads.
+    """
+
+    def __init__(self):
+        self.started = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._seconds = None
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, nbytes=0, call=True):
+        """Add one call of `stage`; with call=False, only its time and bytes."""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = {"seconds": 0.0, "bytes": 0, "latencies": array('d')}
+            stats["seconds"] += seconds
+            stats["bytes"] += nbytes
+            if call:
+                stats["latencies"].append(seconds)
+
+    @contextmanager
+    def timed(self, stage, nbytes=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, nbytes)
+
+    def timed_iter(self, stage, iterable):
+        """Yield from `iterable`, timing each step as one call of `stage`."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                # The time to find out there is nothing left still counts
+                self.record(stage, time.perf_counter() - start, call=False)
+                return
+            self.record(stage, time.perf_counter() - start)
+            yield item
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def checksum_funcs(self):
+        """
+        Return (checksum_func, partial_checksum_func) that behave like
+        hashing.calculate_checksum() / partial_checksum() and record each
+        call, with the bytes read, under the 'hash' stage.
+        """
+        def full(file_path, algorithm='md5'):
+            with self.timed("hash", os.stat(file_path).st_size):
+                return calculate_checksum(file_path, algorithm)
+
+        def partial(file_path, algorithm='md5'):
+            size = os.stat(file_path).st_size
+            with self.timed("hash", min(size, 2 * PARTIAL_HASH_BLOCK_SIZE)):
+                return partial_checksum(file_path, algorithm)
+
+        return full, partial
+
+    def finish(self):
+        if self._seconds is None:
+            self._seconds = time.perf_counter() - self._start
+
+    def report(self, status="ok"):
+        """Return the run report as a JSON-serialisable dict."""
+        self.finish()
+        with self._lock:
+            stages = {}
+            for stage, stats in self._stages.items():
+                latencies = sorted(stats["latencies"])
+                throughput = None
+                if stats["bytes"] and stats["seconds"]:
+                    throughput = round(stats["bytes"] / stats["seconds"] / 1e6, 3)
+                stages[stage] = {
+                    "calls": len(latencies),
+                    "seconds": round(stats["seconds"], 6),
+                    "bytes": stats["bytes"],
+                    "mb_per_s": throughput,
+                    "p50_ms": _percentile_ms(latencies, 0.5),
+                    "p99_ms": _percentile_ms(latencies, 0.99),
+                }
+            counters = dict(self._counters)
+        return {
+            "status": status,
+            "started": self.started.isoformat(),
+            "seconds": round(self._seconds, 6),
+            "counters": counters,
+            "stages": stages,
+        }
+
+    def prometheus_text(self, status="ok"):
+        """Return the report in the Prometheus text exposition format."""
+        report = self.report(status)
+        name = PROMETHEUS_PREFIX
+        lines = [
+            f"# HELP {name}_run_success Whether the last run completed.",
+            f"# TYPE {name}_run_success gauge",
+            f"{name}_run_success {1 if status == 'ok' else 0}",
+            f"# HELP {name}_run_duration_seconds Duration of the last run.",
+            f"# TYPE {name}_run_duration_seconds gauge",
+            f"{name}_run_duration_seconds {report['seconds']}",
+            f"# HELP {name}_run_last_timestamp_seconds When the last run started.",
+            f"# TYPE {name}_run_last_timestamp_seconds gauge",
+            f"{name}_run_last_timestamp_seconds {self.started.timestamp():.3f}",
+            f"# HELP {name}_files Files per outcome in the last run.",
+            f"# TYPE {name}_files gauge",
+        ]
+        lines += [f'{name}_files{{outcome="{outcome}"}} {n}' for outcome, n in sorted(report["counters"].items())]
+
+        stages = sorted(report["stages"].items())
+        for metric, key, help_text in (
+            ("stage_seconds", "seconds", "Time spent in each stage."),
+            ("stage_calls", "calls", "Calls of each stage (files, folders...)."),
+            ("stage_bytes", "bytes", "Bytes handled by each stage."),
+        ):
+            lines += [f"# HELP {name}_{metric} {help_text}", f"# TYPE {name}_{metric} gauge"]
+            lines += [f'{name}_{metric}{{stage="{stage}"}} {stats[key]}' for stage, stats in stages]
+
+        lines += [
+            f"# HELP {name}_stage_latency_seconds Per-call latency of each stage.",
+            f"# TYPE {name}_stage_latency_seconds summary",
+        ]
+        for stage, stats in stages:
+            if stats["p50_ms"] is None:
+                continue
+            lines.append(f'{name}_stage_latency_seconds{{stage="{stage}",quantile="0.5"}} {stats["p50_ms"] / 1000}')
+            lines.append(f'{name}_stage_latency_seconds{{stage="{stage}",quantile="0.99"}} {stats["p99_ms"] / 1000}')
+        return "\n".join(lines) + "\n"
+
+    def save(self, report=None, prometheus=None, status="ok"):
+        """
+        Write the JSON report and/or the Prometheus textfile. The textfile is
+        written to a temporary name and renamed, as node_exporter expects.
+        """
+        try:
+            if report:
+                Path(report).write_text(json.dumps(self.report(status), indent=2) + "\n", encoding="utf-8")
+            if prometheus:
+                path = Path(prometheus)
+                partial = path.with_name(f".{path.name}.partial")
+                partial.write_text(self.prometheus_text(status), encoding="utf-8")
+                os.replace(partial, path)
+        except OSError as e:
+            raise RuntimeError(f"Error writing run report: {e}")
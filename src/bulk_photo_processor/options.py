@@ -0,0 +1,108 @@
+from .disk_order import DISK_ORDERS
+from .durability import DEFAULT_SYNC_EVERY, DEFAULT_SYNC_INTERVAL, Durability
+from .hashing import new_hash
+from .layout import DEFAULT_LAYOUT, TargetLayout
+from .perceptual import require_perceptual
+from .thumbnails import DEFAULT_THUMBNAIL_CACHE_SIZE, require_thumbnails
+from .transfer import TRANSFER_MODES
+
+# Every option of a run, with its default
+DEFAULT_OPTIONS = {
+    "test_mode": False,
+    "verbose": False,
+    "workers": 1,
+    "use_index": True,
+    "algorithm": 'md5',
+    "recursive": False,
+    "resume": False,
+    "use_capture_date": False,
+    "near_duplicates": None,
+    "perceptual_hash": 'dhash',
+    "layout": DEFAULT_LAYOUT,
+    "max_entries": None,
+    "durability": 'none',
+    "sync_every": DEFAULT_SYNC_EVERY,
+    "sync_interval": DEFAULT_SYNC_INTERVAL,
+    "report": None,
+    "prometheus": None,
+    "shard": None,
+    "thumbnails": None,
+    "thumbnail_format": 'jpeg',
+    "thumbnail_cache_size": DEFAULT_THUMBNAIL_CACHE_SIZE,
+    "link_mode": 'move',
+    "disk_order": None,
+}
+
+
+class RunOptions:
+    """
+    The options of a run, taken by run_pipeline() and everything built on
+    it: rename_photos(), move_photos(), process_photos(), watch_photos(),
+    ingest_sources() and PhotoPipeline. Each of them also accepts the
+    options as keyword arguments. Defaults are in DEFAULT_OPTIONS.
+
+    - `test_mode`: only report what would be renamed and moved.
+    - `verbose`: report every file on the console.
+    - `workers`: threads comparing photos with the destination.
+    - `use_index`, `algorithm`: keep destination checksums in a
+      persistent index (see TargetIndex), made with `algorithm`.
+    - `recursive`: include the subfolders of the source.
+    - `resume`: finish a run interrupted by a crash first (see Journal).
+    - `use_capture_date`: file photos without a timestamped name by the
+      capture date in their header (see capture_date.py).
+    - `near_duplicates`, `perceptual_hash`: report photos this close (a
+      Hamming distance) to one in the destination (see perceptual.py).
+    - `layout`, `max_entries`: destination folders (see TargetLayout).
+    - `durability`, `sync_every`, `sync_interval`: when renames and
+      moves are synced to disk (see Durability).
+    - `report`, `prometheus`: files the run's metrics are written to.
+    - `shard`: only process this sharding.Shard of the files.
+    - `thumbnails`, `thumbnail_format`, `thumbnail_cache_size`: build
+      thumbnails of the moved photos (see ThumbnailCache).
+    - `link_mode`: 'hardlink', 'reflink' or 'copy' keep the source (see
+      transfer.transfer_file()).
+    - `disk_order`: read each source folder in disk order (see
+      disk_order.py).
+
+    Unknown options raise TypeError, like unexpected keyword arguments.
+    """
+
+    def __init__(self, **options):
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise TypeError(f"Unknown option(s): {', '.join(sorted(unknown))}.")
+        self.__dict__.update(DEFAULT_OPTIONS)
+        self.__dict__.update(options)
+
+    def __repr__(self):
+        changed = ", ".join(f"{name}={value!r}" for name, value in vars(self).items()
+                            if value != DEFAULT_OPTIONS[name])
+        return f"RunOptions({changed})"
+
+    @classmethod
+    def of(cls, options=None, **settings):
+        """Return `options` (the defaults if None) with the keyword `settings` applied."""
+        if options is None:
+            return cls(**settings)
+        return options.replace(**settings) if settings else options
+
+    def replace(self, **settings):
+        """Return a copy with `settings` changed."""
+        return RunOptions(**dict(vars(self), **settings))
+
+    def check(self):
+        """Raise ValueError (or RuntimeError for a missing extra) for options no run can honour."""
+        if self.workers < 1:
+            raise ValueError(f"Number of workers must be at least 1, got {self.workers}.")
+        if self.link_mode not in TRANSFER_MODES:
+            raise ValueError(f"Invalid link mode '{self.link_mode}'. Must be one of: {', '.join(TRANSFER_MODES)}.")
+        if self.disk_order is not None and self.disk_order not in DISK_ORDERS:
+            raise ValueError(f"Invalid disk order '{self.disk_order}'. Must be one of: {', '.join(DISK_ORDERS)}.")
+        # Fail early on unknown algorithms rather than on the first duplicate
+        new_hash(self.algorithm)
+        TargetLayout(self.layout, self.max_entries)
+        Durability(self.durability, every=self.sync_every)
+        if self.near_duplicates is not None:
+            require_perceptual(self.perceptual_hash)
+        if self.thumbnails is not None:
+            require_thumbnails(self.thumbnail_format)
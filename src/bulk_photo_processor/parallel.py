@@ -0,0 +1,28 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def ordered_map(fn, items, workers=1):
+    """
+    Yield (item, fn(item)) in input order.
+
+    With more than one worker, calls run on a thread pool and at most
+    `workers * 4` of them are in flight, so results stay ordered and
+    memory stays bounded whatever the size of `items`.
+    """
+    if workers <= 1:
+        for item in items:
+            yield item, fn(item)
+        return
+
+    window = workers * 4
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item in items:
+            pending.append((item, executor.submit(fn, item)))
+            if len(pending) >= window:
+                done_item, future = pending.popleft()
+                yield done_item, future.result()
+        while pending:
+            done_item, future = pending.popleft()
+            yield done_item, future.result()
@@ -0,0 +1,262 @@
+import argparse
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+FIELDS = ('year', 'month', 'day', 'hour', 'minute', 'second')
+
+_DATE = r'(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})'
+_TIME = r'(?P<hour>\d{2})(?P<minute>\d{2})(?P<second>\d{2})'
+
+# (name, pattern) of the file names the renamer understands, tried in this
+# order. A pattern matches the start of the name and uses the named groups
+# year, month, day and optionally hour, minute and second (00 if absent).
+NAMING_CONVENTIONS = [
+    ("camera", _DATE + '_' + _TIME),                                        # 20240101_120000.jpg
+    ("android", r'(?:IMG|VID|PANO|MVIMG|BURST)_' + _DATE + '_' + _TIME),    # IMG_20240101_120000.jpg
+    ("pixel", r'PXL_' + _DATE + '_' + _TIME + r'\d{3}'),                    # PXL_20240101_120000123.jpg
+    ("screenshot", r'Screenshot_' + _DATE + '[-_]' + _TIME),                # Screenshot_20240101-120000.png
+    ("whatsapp", r'(?:IMG|VID|AUD|PTT)-' + _DATE + r'-WA\d{4}'),            # VID-20240101-WA0003.mp4
+    ("signal", r'signal-(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})-'
+               r'(?P<hour>\d{2})-?(?P<minute>\d{2})-?(?P<second>\d{2})'),   # signal-2024-01-01-12-00-00.jpg
+]
+
+_GROUP = re.compile(r'\(\?P<(\w+)>')
+
+
+class FilenameRecogniser:
+    """
+    Recognises timestamped file names from a table of naming conventions.
+
+    All conventions are compiled into one regex, each alternative wrapped in
+    a group named after its convention, so a name is classified by a single
+    match call whatever the size of the table; the group that matched tells
+    which convention it was, and its date fields are read by precomputed
+    group numbers. Conventions can be added at run time with add().
+    """
+
+    def __init__(self, conventions=NAMING_CONVENTIONS):
+        self._conventions = []
+        self._lock = threading.Lock()
+        for name, pattern in conventions:
+            self._conventions.append((name, pattern))
+        self._compile()
+
+    @property
+    def conventions(self):
+        return list(self._conventions)
+
+    def add(self, name, pattern):
+        """Add a convention, tried after the existing ones."""
+        if not name.isidentifier() or '__' in name:
+            raise ValueError(f"Invalid naming convention name '{name}'.")
+        if any(existing == name for existing, _ in self._conventions):
+            raise ValueError(f"Naming convention '{name}' already exists.")
+        with self._lock:
+            self._conventions.append((name, pattern))
+            try:
+                self._compile()
+            except (re.error, ValueError):
+                self._conventions.pop()
+                raise
+
+    def _compile(self):
+        alternatives = []
+        for name, pattern in self._conventions:
+            groups = set(_GROUP.findall(pattern))
+            if not {'year', 'month', 'day'} <= groups or not groups <= set(FIELDS):
+                raise ValueError(
+                    f"Naming convention '{name}' must use the groups year, month and day, "
+                    f"and may use hour, minute and second."
+                )
+            # Group names must be unique across the alternatives
+            prefixed = _GROUP.sub(lambda group: f"(?P<{name}__{group[1]}>", pattern)
+            alternatives.append(f"(?P<{name}>{prefixed})")
+        # Like the renamer always did, the name must go on to have an extension
+        regex = re.compile(r'(?:' + '|'.join(alternatives) + r').*\.')
+        fields = {}
+        for name, _ in self._conventions:
+            indexes = tuple(regex.groupindex.get(f"{name}__{field}") for field in FIELDS)
+            # With every field present, one group() call reads them all
+            fields[name] = indexes if all(indexes) else None, indexes
+        # Swapped in together, so readers on other threads never mix old and new
+        self._regex, self._fields = regex, fields
+
+    def match(self, file_name):
+        """
+        Return (convention, (year, month, day, hour, minute, second)) for a
+        timestamped name, as strings, or None if no convention matches.
+        """
+        regex, fields = self._regex, self._fields
+        match = regex.match(file_name)
+        if match is None:
+            return None
+        convention = match.lastgroup
+        complete, indexes = fields[convention]
+        if complete:
+            return convention, match.group(*complete)
+        return convention, tuple(match.group(index) if index else '00' for index in indexes)
+
+
+_default = FilenameRecogniser()
+
+
+def recognise(file_name):
+    """Match a file name against the registered naming conventions (see FilenameRecogniser.match())."""
+    return _default.match(file_name)
+
+
+def register_convention(name, pattern):
+    """Teach the renamer another naming convention (see NAMING_CONVENTIONS)."""
+    _default.add(name, pattern)
+
+
+# Renamed names, and the extensions renamed and moved
+VALID_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.mpg', '.mp4', '.avi', '.heic'}
+MOVE_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2})_(\d{2})_(\d{2})-\d{6}.*\..*')
+
+
+def renamed_file_name(file_name, sequence, captured=None, stamp=None):
+    """
+    Return the new name for a timestamped name such as 'YYYYMMDD_HHMMSS*.ext'
+    or 'IMG_YYYYMMDD_HHMMSS*.ext' (see NAMING_CONVENTIONS), i.e.
+    'YYYY-MM-DDTHH_MM_SS-<sequence>.ext', or None if the name does not match.
+    Other names are renamed after the capture date `captured`, if given.
+    `stamp` is the date fields recognise() already returned for this name.
+    """
+    ext = os.path.splitext(file_name)[1]
+    if stamp is None:
+        recognised = recognise(file_name)
+        stamp = recognised[1] if recognised else None
+    if stamp is None:
+        if captured:
+            return f"{captured:%Y-%m-%dT%H_%M_%S}-{sequence:06}{ext.lower()}"
+        return None
+
+    year, month, day, hour, minute, second = stamp
+    return f"{year}-{month}-{day}T{hour}_{minute}_{second}-{sequence:06}{ext.lower()}"
+
+
+def same_shot_pattern(file_name):
+    """
+    Return a regex matching the renamed names of photos taken in the same
+    second as the renamed `file_name`, whatever their sequence number or
+    collision suffix (normcased, as DirectoryCache names are).
+    """
+    stamp = file_name[:len("YYYY-MM-DDTHH_MM_SS-")]
+    ext = os.path.splitext(file_name)[1]
+    return re.compile(re.escape(os.path.normcase(stamp)) + r'\d{6}(_\d{2,})?' + re.escape(os.path.normcase(ext)))
+
+
+def needs_capture_date(file_name):
+    """Return True for supported photos and videos whose name carries no timestamp."""
+    return os.path.splitext(file_name)[1].lower() in VALID_EXTENSIONS and not MOVE_PATTERN.match(file_name)
+
+
+def target_path_for(file_name, target_path, captured=None, layout=None):
+    """
+    Return the destination of a renamed photo, or None if the name does not
+    match the renamed pattern or has an unsupported extension.
+    For other names, the capture date `captured` (if known) picks the folder.
+    Photos go to YYYY/MM folders unless a TargetLayout is given in `layout`.
+    The extension of the destination is lower-cased.
+    """
+    match = MOVE_PATTERN.match(file_name)
+    stem, ext = os.path.splitext(file_name)
+    if ext.lower() not in VALID_EXTENSIONS:
+        return None
+    if match:
+        year, month, day, hour, *_ = match.groups()
+    elif captured:
+        year, month, day, hour = (f"{captured.year:04}", f"{captured.month:02}", f"{captured.day:02}",
+                                  f"{captured.hour:02}")
+    else:
+        return None
+    name = f"{stem}{ext.lower()}"
+    if layout is None:
+        return Path(target_path) / year / month / name
+    fields = {"year": year, "month": month, "day": day, "hour": hour}
+    return layout.folder_for(target_path, fields, name) / name
+
+
+# ------------------------------------------------------------
+# Micro-benchmark
+# ------------------------------------------------------------
+SAMPLE_NAMES = {
+    "camera": "{Y}{M}{D}_{h}{m}{s}.jpg",
+    "android": "IMG_{Y}{M}{D}_{h}{m}{s}.jpg",
+    "pixel": "PXL_{Y}{M}{D}_{h}{m}{s}123.MP.jpg",
+    "screenshot": "Screenshot_{Y}{M}{D}-{h}{m}{s}.png",
+    "whatsapp": "VID-{Y}{M}{D}-WA{n:04}.mp4",
+    "signal": "signal-{Y}-{M}-{D}-{h}-{m}-{s}.jpg",
+    "renamed": "{Y}-{M}-{D}T{h}_{m}_{s}-{n:06}.jpg",
+    "other": "DSC{n:05}.JPG",
+}
+
+
+def sample_names(count, seed=0):
+    """Return `count` file names spread evenly over SAMPLE_NAMES."""
+    rng = random.Random(seed)
+    kinds = list(SAMPLE_NAMES)
+    names = []
+    for number in range(count):
+        names.append(SAMPLE_NAMES[kinds[number % len(kinds)]].format(
+            Y=rng.randint(2000, 2030), M=f"{rng.randint(1, 12):02}", D=f"{rng.randint(1, 28):02}",
+            h=f"{rng.randint(0, 23):02}", m=f"{rng.randint(0, 59):02}", s=f"{rng.randint(0, 59):02}",
+            n=rng.randint(0, 9999),
+        ))
+    return names
+
+
+def _one_by_one(conventions):
+    """The naive alternative: try each convention's own regex in turn."""
+    compiled = [(name, re.compile(pattern + r'.*\.')) for name, pattern in conventions]
+
+    def match(file_name):
+        for name, regex in compiled:
+            found = regex.match(file_name)
+            if found:
+                groups = found.groupdict()
+                return name, tuple(groups.get(field) or '00' for field in FIELDS)
+        return None
+    return match
+
+
+def benchmark(names, repeat=3):
+    """Best time of `repeat` runs for classifying `names` with each method."""
+    recogniser = FilenameRecogniser()
+    methods = {
+        "combined": recogniser.match,
+        "one-by-one": _one_by_one(recogniser.conventions),
+    }
+    results = []
+    for method, match in methods.items():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for name in names:
+                match(name)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results.append({"method": method, "seconds": best, "names_per_s": len(names) / best})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark file name classification over all naming conventions.")
+    parser.add_argument("-n", "--names", type=int, default=1_000_000, help="File names to classify (default: 1000000).")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per method (default: 3).")
+    args = parser.parse_args()
+
+    names = sample_names(args.names)
+    print(f"{len(names)} names, {len(SAMPLE_NAMES)} kinds: {', '.join(SAMPLE_NAMES)}")
+    print(f"{'method':<12} {'seconds':>9} {'names/s':>12}")
+    for result in benchmark(names, args.repeat):
+        print(f"{result['method']:<12} {result['seconds']:>9.3f} {result['names_per_s']:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import os
+import threading
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # optional 'perceptual' extra
+    np = None
+    Image = None
+
+from .parallel import ordered_map
+from .scanner import scan_files
+from .thumbnails import THUMBNAIL_DIR_NAME
+
+PERCEPTUAL_HASHES = ('dhash', 'phash')
+PERCEPTUAL_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+# Hashes are HASH_SIZE x HASH_SIZE = 64 bits
+HASH_SIZE = 8
+# Re-encoded or resized copies of one shot are usually within a few bits
+DEFAULT_MAX_DISTANCE = 6
+
+
+def require_perceptual(kind='dhash'):
+    """Raise unless the optional dependencies are installed and `kind` is a known hash."""
+    if np is None or Image is None:
+        raise RuntimeError(
+            "Near-duplicate detection needs NumPy and Pillow. "
+            "Install them with: pip install 'utility-scripts[perceptual]'"
+        )
+    if kind not in PERCEPTUAL_HASHES:
+        raise ValueError(f"Unknown perceptual hash '{kind}'. Must be one of: {', '.join(PERCEPTUAL_HASHES)}.")
+
+
+def hamming(a, b):
+    """Number of differing bits between two integer hashes."""
+    return (a ^ b).bit_count()
+
+
+# ------------------------------------------------------------
+# Hashes
+# ------------------------------------------------------------
+def _gray_pixels(file_path, size):
+    with Image.open(file_path) as image:
+        # JPEGs are decoded straight at 1/2 to 1/8 scale, in grayscale
+        image.draft('L', (size[0] * 4, size[1] * 4))
+        small = image.convert('L').resize(size, Image.Resampling.LANCZOS)
+    return np.asarray(small, dtype=np.float32)
+
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def dhash(file_path):
+    """64-bit difference hash: is each pixel brighter than its left neighbour?"""
+    pixels = _gray_pixels(file_path, (HASH_SIZE + 1, HASH_SIZE))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+def phash(file_path):
+    """64-bit DCT hash: low frequencies of a 32x32 thumbnail against their median."""
+    size = HASH_SIZE * 4
+    pixels = _gray_pixels(file_path, (size, size))
+    dct = _dct_matrix(size)
+    low = (dct @ pixels @ dct.T)[:HASH_SIZE, :HASH_SIZE]
+    # The DC term only reflects overall brightness
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+def perceptual_hash(file_path, kind='dhash'):
+    """Return the `kind` hash of an image as an int, or None if it cannot be decoded."""
+    require_perceptual(kind)
+    try:
+        return dhash(file_path) if kind == 'dhash' else phash(file_path)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+# ------------------------------------------------------------
+# Multi-index hashing
+# ------------------------------------------------------------
+@lru_cache(maxsize=None)
+def _flip_masks(bits, radius):
+    """Every mask of `bits` bits with at most `radius` bits set."""
+    return tuple(
+        sum(1 << bit for bit in flipped)
+        for count in range(radius + 1)
+        for flipped in combinations(range(bits), count)
+    )
+
+
+class MultiIndexHash:
+    """
+    Index of integer hashes for Hamming-distance searches (multi-index hashing).
+
+    Each hash is cut into `chunks` equal parts, and each part is a key in
+    its own dict. If two hashes differ in at most r bits, one of their
+    parts differs in at most r // chunks bits (pigeonhole), so a search only
+    looks up the few part values that close to the query's and compares the
+    candidates it finds. With 64-bit hashes, 4 chunks and r <= 7, that is 68
+    dict lookups and about N / 1000 candidates, instead of N comparisons.
+    """
+
+    def __init__(self, bits=HASH_SIZE * HASH_SIZE, chunks=4):
+        self.chunk_bits = bits // chunks
+        self._chunk_mask = (1 << self.chunk_bits) - 1
+        self._tables = [{} for _ in range(chunks)]
+        self._values = []
+        self._items = []
+
+    def __len__(self):
+        return len(self._values)
+
+    def _chunks(self, value):
+        return [(value >> (number * self.chunk_bits)) & self._chunk_mask for number in range(len(self._tables))]
+
+    def add(self, value, item):
+        position = len(self._values)
+        self._values.append(value)
+        self._items.append(item)
+        for table, chunk in zip(self._tables, self._chunks(value)):
+            table.setdefault(chunk, []).append(position)
+
+    def search(self, value, max_distance):
+        """Return [(distance, item)] for every hash within `max_distance`, closest first."""
+        masks = _flip_masks(self.chunk_bits, max_distance // len(self._tables))
+        candidates = set()
+        for table, chunk in zip(self._tables, self._chunks(value)):
+            for mask in masks:
+                candidates.update(table.get(chunk ^ mask, ()))
+
+        matches = []
+        for position in candidates:
+            distance = hamming(value, self._values[position])
+            if distance <= max_distance:
+                matches.append((distance, self._items[position]))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+# ------------------------------------------------------------
+# Near-duplicate lookups against the destination
+# ------------------------------------------------------------
+class NearDuplicateFinder:
+    """
+    Flags photos that look like one already in the destination tree.
+
+    The first lookup hashes every image in the destination into a
+    MultiIndexHash; with a TargetIndex, hashes are stored under the hash
+    name and only computed for new or changed files. Photos moved in during the run are
+    added with add(), so near-duplicates within one batch are caught too.
+    find() and add() may be called from several threads.
+    """
+
+    def __init__(self, target_root, index=None, kind='dhash', max_distance=DEFAULT_MAX_DISTANCE, workers=1):
+        require_perceptual(kind)
+        self.root = Path(target_root).resolve()
+        self.index = index
+        self.kind = kind
+        self.max_distance = max_distance
+        self.workers = workers
+        self._hashes = None
+        self._lock = threading.Lock()
+
+    def fingerprint(self, file_path):
+        """Return the perceptual hash of a photo, or None for other files. Thread-safe."""
+        if os.path.splitext(file_path)[1].lower() not in PERCEPTUAL_EXTENSIONS:
+            return None
+        return perceptual_hash(file_path, self.kind)
+
+    def _load(self):
+        self._hashes = MultiIndexHash()
+        known = self.index.records(self.kind) if self.index else {}
+
+        def stored_or_computed(entry):
+            # Runs on a worker thread
+            st = entry.stat()
+            record = known.get(Path(entry.path).relative_to(self.root).as_posix())
+            if record and record[:3] == (st.st_size, st.st_mtime_ns, st.st_ino):
+                return int(record[3], 16), False
+            return self.fingerprint(entry.path), True
+
+        images = (
+            entry for entry in scan_files(self.root, recursive=True, exclude=[self.root / THUMBNAIL_DIR_NAME])
+            if os.path.splitext(entry.name)[1].lower() in PERCEPTUAL_EXTENSIONS
+        )
+        hashed = ordered_map(stored_or_computed, images, self.workers)
+        # New hashes are written in batches: the first run hashes the whole archive
+        try:
+            with self.index.deferred() if self.index else nullcontext():
+                for entry, (value, computed) in hashed:
+                    if value is None:
+                        continue
+                    if computed and self.index:
+                        self.index.record(entry.path, f"{value:016x}", self.kind)
+                    self._hashes.add(value, Path(entry.path))
+        finally:
+            hashed.close()
+
+    def find(self, value):
+        """Return [(distance, path)] of destination photos close to hash `value`."""
+        with self._lock:
+            if self._hashes is None:
+                self._load()
+            return self._hashes.search(value, self.max_distance)
+
+    def add(self, path, value):
+        """Record a photo that now lives in the destination."""
+        with self._lock:
+            if self._hashes is None:
+                self._load()  # the new file is picked up by the scan
+                return
+            self._hashes.add(value, Path(path))
+        if self.index:
+            self.index.record(path, f"{value:016x}", self.kind)
@@ -0,0 +1,413 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from .capture_date import CaptureDateCache
+from .directory_cache import DirectoryCache
+from .disk_order import in_disk_order
+from .durability import Durability
+from .hashing import compare_files
+from .journal import open_journal
+from .layout import TargetLayout
+from .metrics import RunMetrics
+from .options import RunOptions
+from .patterns import needs_capture_date, recognise, renamed_file_name, same_shot_pattern, target_path_for
+from .perceptual import NearDuplicateFinder
+from .reporting import ConsoleReporter
+from .scanner import scan_files
+from .target_index import TargetIndex
+from .thumbnails import ThumbnailCache
+from .transfer import transfer_file
+
+# Directory entries handed from the scan to the classify stage at a time
+BATCH_SIZE = 64
+# Batches waiting between the scan, classify and plan stages
+QUEUE_SIZE = 4
+PIPELINE_MODES = ("full", "rename-only", "move-only")
+
+
+class TargetState:
+    """
+    What pipelines writing into one destination share: the DirectoryCache
+    (so collision names never clash), the TargetLayout (so split folders
+    are counted once), the checksum index, the near-duplicate finder and
+    the sequence counter (limited to the numbers of the shard, if any)
+    and the thumbnail cache, as the RunOptions in `options` ask.
+    run_pipeline() makes its own; ingest.py hands one to pipelines running
+    side by side. Thread-safe.
+    """
+
+    def __init__(self, target_path, metrics, options=None):
+        options = options or RunOptions()
+        checksum_func, partial_checksum_func = metrics.checksum_funcs()
+        self.directories = DirectoryCache(simulate=options.test_mode)
+        self.layout = TargetLayout(options.layout, options.max_entries, self.directories)
+        self.index = None
+        if options.use_index and not options.test_mode:
+            self.index = TargetIndex(target_path, checksum_func, partial_checksum_func)
+        self.near = None
+        if options.near_duplicates is not None:
+            self.near = NearDuplicateFinder(target_path, self.index, options.perceptual_hash,
+                                            options.near_duplicates, options.workers)
+        self.thumbnails = None
+        if options.thumbnails and not options.test_mode:
+            self.thumbnails = ThumbnailCache(target_path, options.thumbnails, options.thumbnail_format,
+                                             options.thumbnail_cache_size, metrics=metrics)
+        self.shard = options.shard
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_sequence(self):
+        with self._lock:
+            if self.shard:
+                self._sequence = self.shard.next_sequence(self._sequence)
+            else:
+                self._sequence += 1
+            return self._sequence
+
+    def skip_sequence_to(self, sequence):
+        """Continue numbering after `sequence` (e.g. from a resumed journal)."""
+        with self._lock:
+            self._sequence = max(self._sequence, sequence)
+
+    def close(self):
+        if self.index:
+            self.index.close()
+        if self.thumbnails:
+            self.thumbnails.close()
+
+
+async def _run_stages(*stages):
+    """Run the stage coroutines together; the first failure cancels the others and is raised."""
+    try:
+        async with asyncio.TaskGroup() as group:
+            for stage in stages:
+                group.create_task(stage)
+    except BaseExceptionGroup as e:
+        raise e.exceptions[0] from None
+
+
+def run_pipeline(source_path, target_path, options=None, mode="full", metrics=None, reporter=None, state=None,
+                 label=None, position=None, stop=None, entries=None, **settings):
+    """
+    Rename and move photos in one streaming pass over the source.
+
+    Five stages run concurrently, connected by bounded asyncio queues:
+    scan (list the source), classify (match names, read capture dates),
+    plan (number the photos and pick their destination), hash (compare
+    with an existing target, on `workers` threads) and move. Each runs on
+    its own threads, so the event loop only hands batches on. Each stage
+    waits when the next one is behind, so memory stays bounded, and a
+    photo is moved while later ones are still being listed and hashed.
+    Sequence numbers and destinations follow scan order, and moves are
+    applied in that order too. A renamed photo goes straight to its final
+    name in the destination in one operation; names with no destination
+    (unsupported extensions) are renamed in place, unless a `link_mode`
+    keeps the source. A kept source may be imported again, so its photos
+    are also compared with the collision names of their destination or,
+    when renamed, with the destination's photos taken in the same second.
+
+    `options` (a RunOptions, or keyword `settings`) say how. `mode`
+    'rename-only' only renames photos in place (`target_path` may then be
+    None); 'move-only' moves them under their current names. Stage times
+    and counters go to `metrics`, progress and per-file events to
+    `reporter` (the console by default). Pipelines that run at the same
+    time into one destination share a TargetState in `state`, and
+    `label` and `position` tell their progress bars apart. Setting the
+    threading.Event `stop` ends the run after the current file. With
+    `entries` (os.DirEntry or scanner.FileEntry objects), those files are
+    processed instead of a scan of the source. Returns a dict of counts.
+    """
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Invalid mode '{mode}'. Must be 'full', 'rename-only', or 'move-only'.")
+    renaming = mode in ("full", "rename-only")
+    moving = mode in ("full", "move-only")
+    if moving and target_path is None:
+        raise ValueError(f"A target folder is needed in {mode} mode.")
+    source_path = Path(source_path).resolve()
+    target_path = Path(target_path).resolve() if moving else None
+    options = RunOptions.of(options, **settings)
+    if not moving:
+        # Nothing is written to a destination
+        options = options.replace(use_index=False, near_duplicates=None, thumbnails=None)
+    options.check()
+    test_mode, algorithm, link_mode, shard = options.test_mode, options.algorithm, options.link_mode, options.shard
+
+    metrics = metrics or RunMetrics()
+    reporter = reporter or ConsoleReporter(options.verbose, test_mode)
+    checksum_func, partial_checksum_func = metrics.checksum_funcs()
+    durable = Durability(options.durability, None, options.sync_every, options.sync_interval, target_path, metrics)
+    own_state = state is None
+    if own_state:
+        state = TargetState(target_path, metrics, options)
+    directories, index, near, thumbs = state.directories, state.index, state.near, state.thumbnails
+
+    try:
+        journal = open_journal(source_path, test_mode, options.resume, shard)
+    except BaseException:
+        if own_state:
+            state.close()
+        raise
+    if journal:
+        state.skip_sequence_to(journal.last_sequence)
+    durable.journal = journal
+    dates = CaptureDateCache() if options.use_capture_date else None
+
+    counts = {"processed": 0, "renamed": 0, "moved": 0, "skipped": 0, "near_duplicates": 0}
+    pbar = reporter.progress(label, position)
+
+    # ------------------------------------------------------------
+    # Blocking work, run on the stage threads
+    # ------------------------------------------------------------
+    def next_batch(entries):
+        return list(islice(entries, BATCH_SIZE))
+
+    def classify(batch):
+        photos = []
+        for entry in batch:
+            if shard and not shard.owns(entry.name):
+                continue
+            with metrics.timed("match"):
+                recognised = recognise(entry.name) if renaming else None
+                stamp = recognised[1] if recognised else None
+                captured = None
+                if not stamp and dates and needs_capture_date(entry.name):
+                    captured = dates.capture_date(entry.path, entry.stat())
+                movable = moving and target_path_for(entry.name, target_path, captured) is not None
+            if (renaming and (stamp or captured)) or movable:
+                photos.append((Path(entry.path), stamp, captured))
+        return photos
+
+    def plan(photos, hashers):
+        # Picking a destination may list the target folder, so this runs off the event loop
+        batch = []
+        for file, stamp, captured in photos:
+            with metrics.timed("plan"):
+                new_name = sequence = destination = None
+                if renaming and (stamp or captured):
+                    sequence = state.next_sequence()
+                    new_name = renamed_file_name(file.name, sequence, captured, stamp)
+                if moving:
+                    destination = target_path_for(new_name or file.name, target_path, captured, state.layout)
+            # The hash stage: duplicate checks start at once on the worker threads
+            check = hashers.submit(check_target, file, destination) if destination else None
+            batch.append((file, new_name, sequence, destination, check))
+        return batch
+
+    def check_target(file, destination):
+        comparison = None
+        # Never compare with a file another move is still writing
+        directories.wait_settled(destination)
+        if directories.exists(destination) and not directories.planned(destination):
+            comparison = compare_files(file, destination, index, algorithm, checksum_func, partial_checksum_func)
+        fingerprint = None
+        if near and not (comparison and comparison[0]):
+            fingerprint = near.fingerprint(file)
+        return comparison, fingerprint
+
+    def rename_in_place(file, new_name, sequence):
+        renamed = file.with_name(new_name)
+        if renamed.exists():
+            raise FileExistsError(f"Target file '{renamed}' already exists.")
+        if not test_mode:
+            op_id = journal.begin("rename", file, renamed, sequence=sequence)
+            with metrics.timed("rename"):
+                file.rename(renamed)
+            durable.commit(op_id, file, renamed)
+        reporter.event("renamed", file, renamed)
+        counts["renamed"] += 1
+        metrics.count("renamed")
+
+    def earlier_copy(file, destination, new_name):
+        # A copy of `file` already in the destination under another name, or None
+        if new_name:
+            # A kept source imported before got other sequence numbers then
+            candidates = directories.matching(destination.parent, same_shot_pattern(destination.name))
+        else:
+            candidates = directories.variants(destination)
+        for candidate in candidates:
+            if candidate.name == os.path.normcase(destination.name):
+                continue  # already compared
+            directories.wait_settled(candidate)
+            if compare_files(file, candidate, index, algorithm, checksum_func, partial_checksum_func)[0]:
+                return candidate
+        return None
+
+    def apply(file, new_name, sequence, destination, comparison, fingerprint):
+        with metrics.timed("mkdir"):
+            directories.ensure_folder(destination.parent, create=not test_mode)
+
+        while True:
+            if comparison is None and directories.planned(destination):
+                # Only simulated by an earlier move in test mode: a collision, with nothing to compare
+                comparison = (False, None)
+            elif comparison is None and directories.exists(destination):
+                # The target was created by an earlier move in this run
+                directories.wait_settled(destination)
+                comparison = compare_files(file, destination, index, algorithm, checksum_func,
+                                           partial_checksum_func)
+            duplicate_of = destination if comparison and comparison[0] else None
+            # Moved photos leave the source, so only a kept source can already be there under another name
+            if duplicate_of is None and link_mode != 'move' and (comparison or new_name):
+                duplicate_of = earlier_copy(file, destination, new_name)
+            if duplicate_of:
+                counts["skipped"] += 1
+                metrics.count("skipped")
+                reporter.event("skipped", file, duplicate_of)
+                return
+            start = time.perf_counter()
+            claimed = directories.claim(destination, compared=comparison is not None)
+            # None: another pipeline took the name first, so compare with its file
+            if claimed:
+                break
+        source_checksum = comparison[1] if comparison else None
+        if claimed != destination:
+            metrics.record("collision", time.perf_counter() - start)
+            metrics.count("collisions")
+        destination = claimed
+
+        if fingerprint is not None:
+            matches = near.find(fingerprint)
+            if matches:
+                distance, similar = matches[0]
+                counts["near_duplicates"] += 1
+                metrics.count("near_duplicates")
+                reporter.event("near_duplicate", file, similar=similar, distance=distance)
+
+        try:
+            if not test_mode:
+                op_id = journal.begin(link_mode, file, destination, sequence=sequence if new_name else None)
+                with metrics.timed("move", file.stat().st_size):
+                    checksum = transfer_file(file, destination, link_mode, algorithm if index else None,
+                                             source_checksum, durable.mode != 'none')
+                durable.commit(op_id, file, destination)
+                if index and checksum:
+                    index.record(destination, checksum, algorithm)
+                if thumbs:
+                    thumbs.submit(destination)
+        finally:
+            directories.release(destination)
+
+        if fingerprint is not None:
+            near.add(destination, fingerprint)
+        reporter.event("moved", file, destination)
+        if new_name:
+            counts["renamed"] += 1
+            metrics.count("renamed")
+        counts["moved"] += 1
+        metrics.count("moved")
+
+    def move_batch(batch):
+        for file, new_name, sequence, destination, check in batch:
+            if stopping.is_set():
+                return
+            if stop is not None and stop.is_set():
+                raise RuntimeError("Stopped before all files were processed.")
+            try:
+                if destination is None:
+                    if link_mode != 'move':
+                        continue  # the source is kept as it is
+                    rename_in_place(file, new_name, sequence)
+                else:
+                    comparison, fingerprint = check.result()
+                    apply(file, new_name, sequence, destination, comparison, fingerprint)
+            except Exception as e:
+                raise RuntimeError(f"Error processing file '{file}': {e}")
+            counts["processed"] += 1
+            pbar.update(1)
+
+    # ------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------
+    # Work crosses between threads a batch at a time; per-file hand-offs
+    # cost more than renaming or moving a small file
+    scanned = asyncio.Queue(QUEUE_SIZE)
+    classified = asyncio.Queue(QUEUE_SIZE)
+    # Holds the pending duplicate checks, so it also bounds the hashing done ahead of the moves
+    checked = asyncio.Queue(QUEUE_SIZE)
+    stopping = threading.Event()
+
+    async def scan_stage(entries, scanner):
+        loop = asyncio.get_running_loop()
+        while batch := await loop.run_in_executor(scanner, next_batch, entries):
+            await scanned.put(batch)
+        await scanned.put(None)
+
+    async def classify_stage(classifier):
+        loop = asyncio.get_running_loop()
+        while (batch := await scanned.get()) is not None:
+            photos = await loop.run_in_executor(classifier, classify, batch)
+            if photos:
+                await classified.put(photos)
+        await classified.put(None)
+
+    async def plan_stage(planner, hashers):
+        loop = asyncio.get_running_loop()
+        while (photos := await classified.get()) is not None:
+            await checked.put(await loop.run_in_executor(planner, plan, photos, hashers))
+        await checked.put(None)
+
+    async def move_stage(mover):
+        loop = asyncio.get_running_loop()
+        while (batch := await checked.get()) is not None:
+            await loop.run_in_executor(mover, move_batch, batch)
+
+    if entries is None:
+        entries = scan_files(source_path, options.recursive, exclude=[target_path] if moving else [])
+    if options.disk_order:
+        entries = in_disk_order(entries, options.disk_order)
+    entries = metrics.timed_iter("scan", entries)
+    # One planner thread, so sequence numbers and destinations follow scan order
+    executors = [ThreadPoolExecutor(1), ThreadPoolExecutor(1), ThreadPoolExecutor(1),
+                 ThreadPoolExecutor(options.workers), ThreadPoolExecutor(1)]
+    scanner, classifier, planner, hashers, mover = executors
+    try:
+        try:
+            asyncio.run(_run_stages(
+                scan_stage(entries, scanner),
+                classify_stage(classifier),
+                plan_stage(planner, hashers),
+                move_stage(mover),
+            ))
+        finally:
+            stopping.set()
+            # Let running calls finish before the journal and index are closed
+            for executor in executors:
+                executor.shutdown(cancel_futures=True)
+            entries.close()
+            # Completed moves are synced and committed even if the run failed
+            durable.close()
+    except BaseException:
+        if journal:
+            journal.close()
+        raise
+    else:
+        if journal:
+            journal.close(remove=True)
+    finally:
+        pbar.close()
+        if own_state:
+            state.close()
+        if dates:
+            dates.close()
+
+    return counts
+
+
+def print_summary(counts, near_duplicates=False, reporter=None):
+    """Print the counts returned by run_pipeline(), or hand them to `reporter` as messages."""
+    message = reporter.message if reporter else print
+    if counts["processed"] == 0:
+        message("No files matching the pattern were found.")
+        return
+
+    message(f"\nProcessed: {counts['processed']} files")
+    message(f"Renamed: {counts['renamed']}")
+    message(f"Moved: {counts['moved']}")
+    message(f"Skipped (already existed or duplicate): {counts['skipped']}")
+    if near_duplicates:
+        message(f"Near-duplicates flagged: {counts['near_duplicates']}")
@@ -0,0 +1,270 @@
+import json
+import os
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .capture_date import CaptureDateCache
+from .directory_cache import DirectoryCache
+from .hashing import compare_files, new_hash
+from .journal import Journal
+from .layout import DEFAULT_LAYOUT, TargetLayout
+from .parallel import ordered_map
+from .patterns import needs_capture_date, renamed_file_name, target_path_for
+from .reporting import ConsoleReporter
+from .scanner import scan_files
+from .target_index import TargetIndex
+from .transfer import move_file
+
+PLAN_VERSION = 1
+PLAN_MODES = ("full", "rename-only", "move-only")
+
+
+def plan_photos(source_folder, target_folder, plan_file, mode="full", verbose=False, workers=1,
+                use_index=True, algorithm='md5', recursive=False, use_capture_date=False, layout=DEFAULT_LAYOUT,
+                max_entries=None, reporter=None):
+    """
+    Scan the source once and write every rename/move to a JSON Lines plan.
+
+    The first line is a header describing the run; each following line is
+    one operation: {"op": "rename" | "move" | "skip", "src": ..., "dst": ...}.
+    In full mode a file's rename and move are folded into a single "move"
+    to its final name. Sequence numbers, duplicate checks and collision
+    suffixes are all resolved here, so apply_plan() needs no further scan.
+    No photo is renamed or moved; only the checksum index may be updated.
+    `use_capture_date`, `layout` and `max_entries` work as in
+    move_photos(). `target_folder` may be None in 'rename-only' mode. Each
+    operation is reported to `reporter` as a 'planned' event (see
+    reporting.Reporter), to the console by default.
+    """
+    if mode not in PLAN_MODES:
+        raise ValueError(f"Invalid mode '{mode}'. Must be 'full', 'rename-only', or 'move-only'.")
+
+    renaming = mode in ("full", "rename-only")
+    moving = mode in ("full", "move-only")
+    if target_folder is None and moving:
+        raise ValueError(f"A target folder is needed in {mode} mode.")
+
+    source_path = Path(source_folder).resolve()
+    target_path = Path(target_folder).resolve() if target_folder is not None else None
+    plan_path = Path(plan_file)
+
+    if not source_path.is_dir():
+        raise FileNotFoundError(f"Source directory '{source_path}' does not exist or is not a directory.")
+
+    if workers < 1:
+        raise ValueError(f"Number of workers must be at least 1, got {workers}.")
+
+    new_hash(algorithm)
+
+    reporter = reporter or ConsoleReporter(verbose)
+    # Planned moves are not written, so never compared with
+    directories = DirectoryCache(simulate=True)
+    target_layout = TargetLayout(layout, max_entries, directories)
+    dates = CaptureDateCache() if use_capture_date else None
+    sequence = 0
+
+    def classify(entries):
+        # Runs on the main thread, so sequence numbers follow scan order
+        nonlocal sequence
+        for entry in entries:
+            name = entry.name
+            captured = None
+            if dates and needs_capture_date(name):
+                captured = dates.capture_date(entry.path, entry.stat())
+            if renaming:
+                new_name = renamed_file_name(name, sequence + 1, captured)
+                if new_name:
+                    sequence += 1
+                    name = new_name
+            destination = target_path_for(name, target_path, captured, target_layout) if moving else None
+            if destination:
+                yield Path(entry.path), name, destination
+            elif name != entry.name:
+                yield Path(entry.path), name, None
+
+    def check_target(item):
+        file, _, destination = item
+        if destination is None or not directories.exists(destination) or directories.planned(destination):
+            return None
+        return compare_files(file, destination, index, algorithm)
+
+    counts = {"rename": 0, "move": 0, "skip": 0}
+    exclude = [target_path] if moving else []
+    index = TargetIndex(target_path) if moving and use_index else None
+    planned = ordered_map(check_target, classify(scan_files(source_path, recursive, exclude)), workers)
+    pbar = reporter.progress()
+
+    try:
+        plan_path.parent.mkdir(parents=True, exist_ok=True)
+        with plan_path.open("w", encoding="utf-8") as f:
+            header = {
+                "version": PLAN_VERSION,
+                "created": datetime.now(timezone.utc).isoformat(),
+                "mode": mode,
+                "source": str(source_path),
+                "target": str(target_path) if target_path else None,
+                "algorithm": algorithm,
+                "use_index": use_index,
+                "layout": layout,
+                "max_entries": max_entries,
+            }
+            f.write(json.dumps(header) + "\n")
+
+            for (file, name, destination), comparison in planned:
+                operation = {"src": str(file)}
+                if destination is None:
+                    renamed = file.parent / name
+                    if os.path.lexists(renamed):
+                        raise FileExistsError(f"Target file '{renamed}' already exists.")
+                    operation.update(op="rename", dst=str(renamed))
+                else:
+                    if comparison is None and directories.exists(destination) and not directories.planned(destination):
+                        comparison = compare_files(file, destination, index, algorithm)
+                    duplicate, source_checksum = comparison or (False, None)
+                    if duplicate:
+                        operation.update(op="skip", dst=str(destination), reason="duplicate")
+                    else:
+                        destination = directories.unique_path(destination)
+                        directories.add(destination)
+                        operation.update(op="move", dst=str(destination))
+                        if source_checksum:
+                            operation["checksum"] = source_checksum
+
+                counts[operation["op"]] += 1
+                reporter.event("planned", file, Path(operation["dst"]), op=operation["op"])
+                f.write(json.dumps(operation) + "\n")
+                pbar.update(1)
+    except Exception as e:
+        raise RuntimeError(f"Error writing plan '{plan_path}': {e}")
+    finally:
+        planned.close()
+        pbar.close()
+        if index:
+            index.close()
+        if dates:
+            dates.close()
+
+    reporter.message(f"\nPlan written to: {plan_path}")
+    reporter.message(f"Renames: {counts['rename']}")
+    reporter.message(f"Moves: {counts['move']}")
+    reporter.message(f"Skipped (duplicate): {counts['skip']}")
+    return counts
+
+
+def read_plan(plan_file):
+    """Return (header, operations); operations is a generator over the plan lines."""
+    plan_path = Path(plan_file)
+    try:
+        f = plan_path.open("r", encoding="utf-8")
+        header = json.loads(f.readline())
+    except Exception as e:
+        raise RuntimeError(f"Failed to read plan from {plan_path}: {e}")
+
+    if header.get("version") != PLAN_VERSION:
+        f.close()
+        raise ValueError(f"Unsupported plan version in {plan_path}: {header.get('version')}")
+
+    def operations():
+        with f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return header, operations()
+
+
+def apply_operation(operation, directories, algorithm=None):
+    """
+    Apply one plan operation and return its outcome:
+    'renamed', 'moved', 'skipped' or 'already-applied'.
+
+    Moves to another filesystem are copied and verified; with `algorithm`,
+    the copied data is hashed and the checksum stored in the operation.
+    """
+    if operation["op"] == "skip":
+        return "skipped"
+
+    source = Path(operation["src"])
+    destination = Path(operation["dst"])
+
+    if not os.path.lexists(source) and os.path.lexists(destination):
+        return "already-applied"
+    if os.path.lexists(destination):
+        raise FileExistsError(f"Target file '{destination}' already exists.")
+
+    if operation["op"] == "rename":
+        source.rename(destination)
+        return "renamed"
+
+    directories.ensure_folder(destination.parent)
+    checksum = move_file(source, destination, algorithm, operation.get("checksum"))
+    if checksum:
+        operation["checksum"] = checksum
+    return "moved"
+
+
+def apply_plan(plan_file, workers=1, verbose=False, resume=False, reporter=None):
+    """
+    Apply a plan written by plan_photos().
+
+    Operations are independent of each other, so they run on `workers`
+    threads. Operations whose source is gone and whose destination exists
+    are treated as already applied, so a plan can be re-run safely.
+    Progress is journaled in '<plan_file>.journal'; with `resume`, operations
+    committed by an interrupted run are skipped without touching the disk.
+    Each outcome is reported to `reporter` as an event ('renamed', 'moved',
+    'skipped' or 'already_applied'), to the console by default.
+    """
+    if workers < 1:
+        raise ValueError(f"Number of workers must be at least 1, got {workers}.")
+
+    header, operations = read_plan(plan_file)
+    reporter = reporter or ConsoleReporter(verbose)
+    directories = DirectoryCache()
+    journal = Journal(Path(f"{plan_file}.journal"), resume)
+    index = None
+    if header.get("use_index") and header.get("mode") != "rename-only":
+        index = TargetIndex(header["target"])
+
+    def run(item):
+        number, operation = item
+        if number in journal.committed:
+            return "already-applied"
+        if operation["op"] == "skip":
+            return "skipped"
+        try:
+            op_id = journal.begin(operation["op"], operation["src"], operation["dst"], key=number)
+            outcome = apply_operation(operation, directories, header["algorithm"] if index else None)
+            journal.commit(op_id)
+        except Exception as e:
+            raise RuntimeError(f"Error applying '{operation['src']}' --> '{operation['dst']}': {e}")
+        if index and outcome == "moved" and operation.get("checksum"):
+            index.record(operation["dst"], operation["checksum"], header["algorithm"])
+        return outcome
+
+    counts = {}
+    applied = ordered_map(run, enumerate(operations, start=1), workers)
+    pbar = reporter.progress()
+    try:
+        with index.deferred() if index else nullcontext():
+            for (_, operation), outcome in applied:
+                counts[outcome] = counts.get(outcome, 0) + 1
+                reporter.event(outcome.replace("-", "_"), Path(operation["src"]), Path(operation["dst"]))
+                pbar.update(1)
+    except BaseException:
+        applied.close()  # let in-flight operations finish before closing the journal
+        journal.close()
+        raise
+    else:
+        journal.close(remove=True)
+    finally:
+        applied.close()
+        pbar.close()
+        if index:
+            index.close()
+
+    reporter.message(f"\nApplied plan: {plan_file}")
+    for outcome in ("renamed", "moved", "skipped", "already-applied"):
+        reporter.message(f"{outcome.capitalize()}: {counts.get(outcome, 0)}")
+    return counts
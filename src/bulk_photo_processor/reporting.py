@@ -0,0 +1,124 @@
+import threading
+from tqdm import tqdm
+from colorama import Fore, Style
+
+
+class Reporter:
+    """
+    Receives what a run does: progress, one event per file and summary
+    messages. This base class drops everything, so a run reporting to it
+    does no console I/O at all.
+
+    Event kinds are 'renamed' (renamed in place), 'moved' (to its final
+    name in the destination, or linked or copied there with a link mode),
+    'skipped' (a duplicate of `destination`) and 'near_duplicate' (with
+    `similar` and `distance`). Plans add 'planned' (with `op`) and
+    'already_applied'. Deduplication reports 'duplicate_set' (`source` is
+    the copy kept, with `copies` and `size`), 'linked' (an extra copy
+    replaced by a link to `destination`) and 'left_alone' (with `reason`).
+    Runs with several workers or sources report from their worker threads.
+    """
+
+    def progress(self, label=None, position=None):
+        """Return a progress bar with update(n) and close() for one run or source."""
+        return _Progress()
+
+    def event(self, kind, source, destination=None, **details):
+        pass
+
+    def message(self, text, detail=False):
+        """A line for the user; `detail` lines are only wanted in verbose output."""
+
+
+class _Progress:
+    def update(self, n=1):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleReporter(Reporter):
+    """
+    The command-line output: a tqdm bar per run, near-duplicates and
+    duplicate sets always, every rename and move in test or verbose mode,
+    everything else and detail messages in verbose mode.
+    """
+
+    def __init__(self, verbose=False, test_mode=False):
+        self.verbose = verbose
+        self.test_mode = test_mode
+
+    def progress(self, label=None, position=None):
+        return tqdm(
+            desc=label,
+            position=position,
+            ncols=70,
+            bar_format="{l_bar}%s{bar}%s{r_bar}" % (Fore.GREEN, Style.RESET_ALL)
+        )
+
+    def event(self, kind, source, destination=None, **details):
+        if kind == "near_duplicate":
+            print(f"Near-duplicate of '{details['similar']}' (distance {details['distance']}): {source}")
+        elif kind == "duplicate_set":
+            print(f"\n{len(details['copies']) + 1} copies of {details['size']} bytes:")
+            print(f"  keep  {source}")
+            for path in details["copies"]:
+                print(f"  dup   {path}")
+        elif kind == "left_alone":
+            print(f"  skip  {source} ({details['reason']})")
+        elif kind in ("renamed", "moved"):
+            if self.test_mode or self.verbose:
+                print(f"{source} --> {destination}")
+        elif not self.verbose:
+            pass
+        elif kind == "skipped":
+            print(f"Duplicate file found and skipped: {source}")
+        elif kind == "planned":
+            print(f"{source} --> {destination} ({details['op']})")
+        elif kind == "already_applied":
+            print(f"Already applied: {source} --> {destination}")
+        elif kind == "linked":
+            print(f"  link  {source}")
+
+    def message(self, text, detail=False):
+        if self.verbose or not detail:
+            print(text)
+
+
+class CallbackReporter(Reporter):
+    """
+    Hands progress and events to the callables `on_progress(done)`, with the
+    number of files done so far over all sources, and `on_event(event)`,
+    with a dict holding 'kind', 'source', 'destination' and any details.
+    Either may be None. Messages are dropped.
+    """
+
+    def __init__(self, on_progress=None, on_event=None):
+        self.on_progress = on_progress
+        self.on_event = on_event
+        self._done = 0
+        self._lock = threading.Lock()
+
+    def progress(self, label=None, position=None):
+        if self.on_progress is None:
+            return _Progress()
+        return _CallbackProgress(self)
+
+    def _advance(self, n):
+        with self._lock:
+            self._done += n
+            done = self._done
+        self.on_progress(done)
+
+    def event(self, kind, source, destination=None, **details):
+        if self.on_event is not None:
+            self.on_event({"kind": kind, "source": source, "destination": destination, **details})
+
+
+class _CallbackProgress(_Progress):
+    def __init__(self, reporter):
+        self._reporter = reporter
+
+    def update(self, n=1):
+        self._reporter._advance(n)
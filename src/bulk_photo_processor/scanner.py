@@ -0,0 +1,63 @@
+import os
+import stat
+from pathlib import Path
+
+
+class FileEntry:
+    """
+    The parts of os.DirEntry that scan_files() callers use, for a file
+    known by its path only (e.g. one reported by the watcher).
+    """
+
+    __slots__ = ('path', 'name', '_stat')
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.name = os.path.basename(self.path)
+        self._stat = None
+
+    def stat(self, follow_symlinks=True):
+        if self._stat is None:
+            self._stat = os.stat(self.path, follow_symlinks=follow_symlinks)
+        return self._stat
+
+    def inode(self):
+        return self.stat().st_ino
+
+    def is_file(self, follow_symlinks=True):
+        try:
+            return stat.S_ISREG(os.stat(self.path, follow_symlinks=follow_symlinks).st_mode)
+        except OSError:
+            return False
+
+
+def scan_files(root, recursive=False, exclude=()):
+    """
+    Yield an os.DirEntry for every regular file under `root`.
+
+    Entries are yielded as soon as they are read, so callers can start
+    working before the scan finishes, and only the list of directories
+    still to visit is kept in memory. File types come from the cached
+    DirEntry data and need no extra stat() call on most filesystems.
+    With `recursive`, subfolders are walked depth-first; folders listed
+    in `exclude` (e.g. a destination inside the source) are skipped.
+    """
+    excluded = {os.path.normcase(str(Path(p).resolve())) for p in exclude}
+    pending = [str(Path(root).resolve())]
+
+    while pending:
+        directory = pending.pop()
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and os.path.normcase(entry.path) not in excluded:
+                            subdirectories.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except OSError as e:
+            raise RuntimeError(f"Error accessing files in directory '{directory}': {e}")
+
+        # Visit subfolders in name order so runs are reproducible
+        pending.extend(sorted(subdirectories, reverse=True))
@@ -0,0 +1,66 @@
+import re
+import zlib
+
+# Sequence numbers shared out between the shards of one import: six digits, as in the renamed names
+SEQUENCE_SPACE = 999_999
+# Renamed names carry the sequence number they were given (see bulk_photo_renamer.renamed_file_name)
+SEQUENCE_NAME = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}_\d{2}_\d{2}-(\d{6})', re.IGNORECASE)
+
+
+class Shard:
+    """
+    Shard `index` of `count` (1-based), for splitting one import between
+    several processes or machines without any coordination.
+
+    Each shard numbers its renames from its own set of sequence numbers:
+    shard i of N uses i, i + N, i + 2N, ... up to SEQUENCE_SPACE, so
+    renamed names from two shards never clash. A renamed name belongs to
+    the shard its sequence number came from, so a file another shard has
+    just renamed in place is never picked up twice, and a tree renamed
+    earlier without shards still splits evenly. Any other file belongs to
+    the shard picked by a CRC-32 of its lower-cased name, so every host
+    puts every name in the same shard and names that differ only in case
+    (which would clash on case-insensitive targets) stay together.
+    """
+
+    def __init__(self, index, count):
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {index}/{count}: use i/N with 1 <= i <= N.")
+        self.index = index
+        self.count = count
+        self.first_sequence = index
+        self.last_sequence = index + (SEQUENCE_SPACE - index) // count * count
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+    def owns(self, file_name):
+        """Return True if `file_name` belongs to this shard."""
+        match = SEQUENCE_NAME.match(file_name)
+        if match:
+            return (int(match[1]) - 1) % self.count == self.index - 1
+        key = file_name.lower().encode('utf-8', 'surrogateescape')
+        return zlib.crc32(key) % self.count == self.index - 1
+
+    def next_sequence(self, sequence):
+        """Return this shard's first sequence number after `sequence` (0 to start)."""
+        if sequence < self.first_sequence:
+            following = self.first_sequence
+        else:
+            following = sequence + self.count - (sequence - self.index) % self.count
+        if following > self.last_sequence:
+            raise RuntimeError(
+                f"Shard {self} has used up its sequence numbers (up to {self.last_sequence}); "
+                f"split the import into fewer shards."
+            )
+        return following
+
+
+def parse_shard(text):
+    """Return the Shard for 'i/N', or None for None."""
+    if text is None:
+        return None
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', str(text))
+    if not match:
+        raise ValueError(f"Invalid shard '{text}': use i/N, e.g. 1/4.")
+    return Shard(int(match[1]), int(match[2]))
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from .hashing import calculate_checksum, partial_checksum
+
+INDEX_FILE_NAME = ".bulk_photo_index.sqlite"
+# Checksums buffered by deferred() before they are written in one transaction
+DEFERRED_ROWS = 1000
+
+
+class TargetIndex:
+    """
+    Persistent index of checksums for files in the destination tree.
+
+    Entries are keyed by path (relative to the destination root) and
+    algorithm, and are only trusted while the file's size, mtime and inode
+    still match the recorded values. Anything else is rehashed and updated.
+    Partial (head and tail) checksums are stored next to full ones under
+    the key '<algorithm>/partial'. Whole-tree passes record many
+    checksums at once with record_many() or inside deferred(), instead of
+    one transaction per file.
+    """
+
+    def __init__(self, root, checksum_func=calculate_checksum, partial_checksum_func=partial_checksum,
+                 file_name=INDEX_FILE_NAME):
+        self.root = Path(root).resolve()
+        self.db_path = self.root / file_name
+        self._checksum_func = checksum_func
+        self._partial_checksum_func = partial_checksum_func
+        self._lock = threading.Lock()
+        # (path, algorithm) -> row, while deferred() buffers writes
+        self._pending = None
+
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checksums (
+                    path TEXT NOT NULL,
+                    algorithm TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    digest TEXT NOT NULL,
+                    PRIMARY KEY (path, algorithm)
+                )
+                """
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error opening checksum index '{self.db_path}': {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _key(self, file_path):
+        return Path(file_path).resolve().relative_to(self.root).as_posix()
+
+    def lookup(self, file_path, algorithm='md5', stat_result=None):
+        """Return the recorded checksum if the file is unchanged, else None."""
+        st = stat_result or os.stat(file_path)
+        key = self._key(file_path)
+        with self._lock:
+            row = self._pending.get((key, algorithm)) if self._pending else None
+            if row:
+                row = row[2:]
+            else:
+                row = self._conn.execute(
+                    "SELECT size, mtime_ns, inode, digest FROM checksums WHERE path = ? AND algorithm = ?",
+                    (key, algorithm),
+                ).fetchone()
+        if row and row[:3] == (st.st_size, st.st_mtime_ns, st.st_ino):
+            return row[3]
+        return None
+
+    def records(self, algorithm='md5'):
+        """
+        Return {relative path: (size, mtime_ns, inode, digest)} for one algorithm,
+        so whole-tree passes need a single query instead of one per file.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns, inode, digest FROM checksums WHERE algorithm = ?",
+                (algorithm,),
+            ).fetchall()
+        return {path: tuple(values) for path, *values in rows}
+
+    def record(self, file_path, digest, algorithm='md5', stat_result=None):
+        """Store a checksum for a file under the destination root."""
+        self.record_many([(file_path, digest, stat_result)], algorithm)
+
+    def record_many(self, entries, algorithm='md5'):
+        """
+        Store the checksums of many files in one transaction. `entries`
+        holds (file_path, digest, stat_result) tuples; a None stat_result
+        is taken from the file.
+        """
+        rows = []
+        for file_path, digest, st in entries:
+            st = st or os.stat(file_path)
+            rows.append((self._key(file_path), algorithm, st.st_size, st.st_mtime_ns, st.st_ino, digest))
+        with self._lock:
+            if self._pending is not None:
+                self._pending.update((row[:2], row) for row in rows)
+                if len(self._pending) < DEFERRED_ROWS:
+                    return
+                rows = list(self._pending.values())
+                self._pending.clear()
+            self._write(rows)
+
+    def _write(self, rows):
+        # Caller holds the lock
+        self._conn.executemany("INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self._conn.commit()
+
+    @contextmanager
+    def deferred(self):
+        """
+        Buffer the checksums recorded inside the block and write them
+        DEFERRED_ROWS at a time, and the rest when the block ends. Nothing
+        is held open in the database meanwhile, so other runs on the same
+        index are not blocked. Buffered checksums are seen by lookup().
+        """
+        with self._lock:
+            outermost = self._pending is None
+            if outermost:
+                self._pending = {}
+        try:
+            yield self
+        finally:
+            if outermost:
+                self.flush(stop=True)
+
+    def flush(self, stop=False):
+        """Write the checksums buffered by deferred(); with `stop`, stop buffering."""
+        with self._lock:
+            rows = list(self._pending.values()) if self._pending else []
+            if self._pending is not None:
+                self._pending = None if stop else {}
+            if rows:
+                self._write(rows)
+
+    def checksum(self, file_path, algorithm='md5', partial=False):
+        """Return the checksum of a file, hashing it only if the index is stale."""
+        st = os.stat(file_path)
+        key = f"{algorithm}/partial" if partial else algorithm
+        digest = self.lookup(file_path, key, st)
+        if digest is None:
+            checksum_func = self._partial_checksum_func if partial else self._checksum_func
+            digest = checksum_func(file_path, algorithm)
+            self.record(file_path, digest, key, st)
+        return digest
+
+    def close(self):
+        self.flush(stop=True)
+        with self._lock:
+            self._conn.close()
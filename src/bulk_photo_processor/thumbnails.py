@@ -0,0 +1,248 @@
+import functools
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional 'perceptual' extra
+    Image = None
+    ImageOps = None
+
+try:
+    from pillow_heif import register_heif_opener
+except ImportError:  # HEIC thumbnails need the pillow-heif plugin
+    register_heif_opener = None
+else:
+    # Also runs in each worker process, which imports this module to build thumbnails
+    register_heif_opener()
+
+from .metrics import RunMetrics
+from .scanner import scan_files
+
+THUMBNAIL_DIR_NAME = ".bulk_photo_thumbnails"
+THUMBNAIL_FORMATS = ('jpeg', 'webp')
+THUMBNAIL_EXTENSIONS = {'.jpg', '.jpeg', '.png'} | ({'.heic'} if register_heif_opener else set())
+# Longest edge in pixels
+DEFAULT_THUMBNAIL_SIZE = 256
+DEFAULT_THUMBNAIL_CACHE_SIZE = 1024 * 1024 * 1024
+# Once over its size limit, the cache is trimmed to this share of it, so it is not trimmed for every new file
+EVICT_TO = 0.9
+# Photos queued per worker process; submit() blocks beyond this, so a large run does not pile up futures
+QUEUED_PER_WORKER = 2
+
+
+def require_thumbnails(thumbnail_format='jpeg'):
+    """Raise unless Pillow is installed and `thumbnail_format` is supported."""
+    if Image is None:
+        raise RuntimeError(
+            "Thumbnails need Pillow. "
+            "Install it with: pip install 'utility-scripts[perceptual]'"
+        )
+    if thumbnail_format not in THUMBNAIL_FORMATS:
+        raise ValueError(
+            f"Unknown thumbnail format '{thumbnail_format}'. Must be one of: {', '.join(THUMBNAIL_FORMATS)}."
+        )
+
+
+def thumbnail_key(relative_path, st):
+    """
+    The cache key of a photo: a BLAKE2b digest of its path in the archive,
+    size and mtime, so finding its thumbnail takes one stat() and no read.
+    """
+    return hashlib.blake2b(f"{relative_path}\0{st.st_size}\0{st.st_mtime_ns}".encode(), digest_size=16).hexdigest()
+
+
+def thumbnail_path(cache_root, key, size=DEFAULT_THUMBNAIL_SIZE, thumbnail_format='jpeg'):
+    """Where the thumbnail of the photo with `key` is stored."""
+    extension = 'jpg' if thumbnail_format == 'jpeg' else thumbnail_format
+    return Path(cache_root) / str(size) / key[:2] / f"{key}.{extension}"
+
+
+def make_thumbnail(file_path, thumbnail, size=DEFAULT_THUMBNAIL_SIZE, thumbnail_format='jpeg'):
+    """
+    Write the thumbnail of `file_path`, at most `size` pixels on its longest
+    edge, to `thumbnail` and return the bytes written. Runs in the worker
+    processes of ThumbnailCache.
+    """
+    thumbnail = Path(thumbnail)
+    with Image.open(file_path) as image:
+        # JPEGs are decoded straight at 1/2 to 1/8 scale
+        image.draft('RGB', (size, size))
+        small = ImageOps.exif_transpose(image)
+        small.thumbnail((size, size), Image.Resampling.LANCZOS)
+        small = small.convert('RGB')
+
+    thumbnail.parent.mkdir(parents=True, exist_ok=True)
+    # Written under a hidden name and renamed, so a thumbnail in the cache is always complete
+    partial = thumbnail.with_name(f".{thumbnail.name}.{os.getpid()}.partial")
+    try:
+        small.save(partial, format=thumbnail_format.upper(), quality=85)
+        os.replace(partial, thumbnail)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return thumbnail.stat().st_size
+
+
+def scan_thumbnails(cache_root):
+    """Return the thumbnails under `cache_root` as (mtime_ns, size, path), least recently used first."""
+    cache_root = Path(cache_root)
+    if not cache_root.is_dir():
+        return []
+    thumbnails = []
+    for entry in scan_files(cache_root, recursive=True):
+        if entry.name.startswith('.'):
+            continue  # still being written
+        st = entry.stat()
+        thumbnails.append((st.st_mtime_ns, st.st_size, entry.path))
+    thumbnails.sort()
+    return thumbnails
+
+
+def _evict(thumbnails, total, limit):
+    """
+    Delete thumbnails from `thumbnails`, a mapping of path to size in least
+    recently used order, until `total` is at most `limit` bytes. Returns
+    (bytes kept, thumbnails deleted).
+    """
+    deleted = 0
+    while total > limit and thumbnails:
+        path, size = thumbnails.popitem(last=False)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        deleted += 1
+    return total, deleted
+
+
+def evict_thumbnails(cache_root, limit):
+    """
+    Delete the least recently used thumbnails until the cache holds at
+    most `limit` bytes. Returns (bytes kept, thumbnails deleted).
+    """
+    thumbnails = OrderedDict((path, size) for _, size, path in scan_thumbnails(cache_root))
+    return _evict(thumbnails, sum(thumbnails.values()), limit)
+
+
+class ThumbnailCache:
+    """
+    Thumbnails of the photos in a destination, built as they land.
+
+    submit() queues a moved photo; `workers` processes (one per CPU by
+    default) decode it and write a `thumbnail_format` ('jpeg' or 'webp')
+    thumbnail of at most `size` pixels into a hidden folder under
+    `target_root`. Thumbnails are keyed by the photo's path, size and mtime
+    (see thumbnail_key()), so a photo whose thumbnail exists is neither read
+    nor decoded again, and a photo that changed gets a new one. The cache
+    is kept under `limit` bytes by deleting the least recently used
+    thumbnails: it is scanned once when opened, then its size and the
+    order its thumbnails were used in are kept in memory. submit() blocks
+    while QUEUED_PER_WORKER photos per worker are waiting for a thumbnail.
+    Thumbnails are a convenience: a photo that cannot be
+    decoded is counted as a 'thumbnail_failures' counter of `metrics` and
+    skipped. Built and cached thumbnails are counted as
+    'thumbnails' and 'thumbnails_cached'. Call close() (or use it as a
+    context manager) to wait for the queued photos; it raises if the
+    worker processes died.
+    """
+
+    def __init__(self, target_root, size=DEFAULT_THUMBNAIL_SIZE, thumbnail_format='jpeg',
+                 limit=DEFAULT_THUMBNAIL_CACHE_SIZE, workers=None, metrics=None):
+        require_thumbnails(thumbnail_format)
+        if size < 1:
+            raise ValueError(f"Thumbnail size must be at least 1 pixel, got {size}.")
+        self.target_root = Path(target_root)
+        self.root = self.target_root / THUMBNAIL_DIR_NAME
+        self.size = size
+        self.format = thumbnail_format
+        self.limit = limit
+        self.metrics = metrics or RunMetrics()
+        self._lock = threading.Lock()
+        self._broken = None
+        # Path to size, least recently used first; keyed like the paths submit() builds, which are not resolved
+        resolved = self.root.resolve()
+        self._thumbnails = OrderedDict((str(self.root / os.path.relpath(path, resolved)), size)
+                                       for _, size, path in scan_thumbnails(self.root))
+        self._size, _ = _evict(self._thumbnails, sum(self._thumbnails.values()), self.limit)
+        workers = workers or os.cpu_count()
+        self._queued = threading.BoundedSemaphore(workers * QUEUED_PER_WORKER)
+        # Forking a process that runs the pipeline threads could copy a held lock
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self._pool = ProcessPoolExecutor(workers, mp_context=context)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, file_path):
+        """Queue a thumbnail for the photo at `file_path`; other files are ignored."""
+        if os.path.splitext(str(file_path))[1].lower() not in THUMBNAIL_EXTENSIONS:
+            return
+        if self._broken:
+            return
+        try:
+            thumbnail = self._thumbnail_path(file_path)
+        except OSError:
+            self.metrics.count("thumbnail_failures")
+            return
+        try:
+            # A cache hit: mark it as recently used, so eviction keeps it longest
+            os.utime(thumbnail)
+        except FileNotFoundError:
+            self._queued.acquire()
+            try:
+                future = self._pool.submit(make_thumbnail, str(file_path), str(thumbnail), self.size, self.format)
+            except BaseException:
+                self._queued.release()
+                raise
+            future.add_done_callback(functools.partial(self._done, str(thumbnail)))
+        else:
+            self.metrics.count("thumbnails_cached")
+            with self._lock:
+                if str(thumbnail) in self._thumbnails:
+                    self._thumbnails.move_to_end(str(thumbnail))
+
+    def lookup(self, file_path):
+        """Return the cached thumbnail of the photo at `file_path`, or None."""
+        thumbnail = self._thumbnail_path(file_path)
+        return thumbnail if thumbnail.exists() else None
+
+    def _thumbnail_path(self, file_path):
+        key = thumbnail_key(os.path.relpath(file_path, self.target_root), os.stat(file_path))
+        return thumbnail_path(self.root, key, self.size, self.format)
+
+    def _done(self, thumbnail, future):
+        self._queued.release()
+        try:
+            written = future.result()
+        except BrokenProcessPool as e:
+            self._broken = e
+            return
+        except Exception:
+            self.metrics.count("thumbnail_failures")
+            return
+        self.metrics.count("thumbnails")
+        with self._lock:
+            # Rewritten by a concurrent run: its old size is no longer in the cache
+            self._size += written - self._thumbnails.pop(thumbnail, 0)
+            self._thumbnails[thumbnail] = written
+            if self._size > self.limit:
+                with self.metrics.timed("evict"):
+                    self._size, deleted = _evict(self._thumbnails, self._size, int(self.limit * EVICT_TO))
+                self.metrics.count("thumbnails_evicted", deleted)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        if self._broken:
+            raise RuntimeError(f"Thumbnail workers failed, thumbnails are incomplete: {self._broken}")
@@ -0,0 +1,240 @@
+import errno
+import os
+import shutil
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .durability import fsync_path
+from .hashing import buffer_size_for, calculate_checksum, new_hash
+
+# Largest chunk handed to copy_file_range()/sendfile() in one call
+ZERO_COPY_CHUNK_SIZE = 1024 * 1024 * 1024
+# Copies that replace a move are verified with this algorithm when the caller needs no checksum
+VERIFY_ALGORITHM = 'md5'
+
+
+def _copy_zero_copy(src_fd, dst_fd, size):
+    """
+    Copy `size` bytes inside the kernel. Returns False if neither
+    copy_file_range() nor sendfile() is usable between these files.
+    """
+    for name in ('copy_file_range', 'sendfile'):
+        copy = getattr(os, name, None)
+        if copy is None:
+            continue
+        copied = 0
+        try:
+            while copied < size:
+                if name == 'copy_file_range':
+                    n = copy(src_fd, dst_fd, min(ZERO_COPY_CHUNK_SIZE, size - copied))
+                else:
+                    n = copy(dst_fd, src_fd, copied, min(ZERO_COPY_CHUNK_SIZE, size - copied))
+                if n == 0:
+                    break
+                copied += n
+        except OSError as e:
+            if copied or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                                         errno.ENOTSUP, errno.EBADF):
+                raise
+            # Not supported for this pair of files: try the next method
+            continue
+        if copied == size:
+            return True
+        if copied:
+            raise OSError(f"{name}() stopped after {copied} of {size} bytes.")
+    return False
+
+
+def _copy_hashing(src, dst, hash_alg, buffer_size):
+    """Copy through one reused buffer, hashing each block as it passes."""
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    while True:
+        n = src.readinto(buffer)
+        if not n:
+            break
+        chunk = view[:n]
+        hash_alg.update(chunk)
+        while chunk:
+            chunk = chunk[dst.write(chunk):]
+
+
+def copy_file(source, destination, algorithm=None):
+    """
+    Copy `source` to `destination` in a single pass over the data.
+
+    Without `algorithm`, the kernel copies the data (copy_file_range or
+    sendfile) and nothing goes through Python buffers. With `algorithm`,
+    the data is read once into a reused buffer, hashed and written, and the
+    checksum of the copied bytes is returned.
+    The copy is written to a hidden '.partial' file, flushed to disk and
+    only then renamed to `destination`. Timestamps and mode are preserved.
+    """
+    source = Path(source)
+    destination = Path(destination)
+    partial = destination.with_name(f".{destination.name}.partial")
+    checksum = None
+
+    try:
+        with source.open('rb', buffering=0) as src, partial.open('wb', buffering=0) as dst:
+            st = os.fstat(src.fileno())
+            if algorithm:
+                hash_alg = new_hash(algorithm)
+                _copy_hashing(src, dst, hash_alg, buffer_size_for(st))
+                checksum = hash_alg.hexdigest()
+            elif not _copy_zero_copy(src.fileno(), dst.fileno(), st.st_size):
+                shutil.copyfileobj(src, dst, buffer_size_for(st))
+
+            if os.fstat(dst.fileno()).st_size != st.st_size:
+                raise OSError(f"Copied {os.fstat(dst.fileno()).st_size} of {st.st_size} bytes.")
+            os.fsync(dst.fileno())
+        shutil.copystat(source, partial)
+        os.replace(partial, destination)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return checksum
+
+
+def verified_copy(source, destination, algorithm=None, expected_checksum=None):
+    """
+    copy_file() `source` to `destination` and check the copy before the
+    caller relies on it: the copy is read back and must hash the same as
+    the data read from `source`, and `source` must not have changed during
+    the copy (nor differ from `expected_checksum`, a checksum with
+    `algorithm`). Otherwise the copy is removed and RuntimeError raised.
+    Returns the checksum with `algorithm`, or None without one.
+    """
+    before = os.stat(source)
+    checksum = copy_file(source, destination, algorithm or VERIFY_ALGORITHM)
+    after = os.stat(source)
+    if ((before.st_size, before.st_mtime_ns) != (after.st_size, after.st_mtime_ns)
+            or (algorithm and expected_checksum and checksum != expected_checksum)):
+        problem = "the source changed during the copy"
+    elif calculate_checksum(destination, algorithm or VERIFY_ALGORITHM) != checksum:
+        problem = "the copy differs from the source"
+    else:
+        return checksum if algorithm else None
+    Path(destination).unlink(missing_ok=True)
+    raise RuntimeError(f"Checksum mismatch after copying '{source}': {problem}.")
+
+
+def move_file(source, destination, algorithm=None, expected_checksum=None, sync=False):
+    """
+    Move `source` to `destination`, also across filesystems.
+
+    A plain rename is tried first. If source and destination are on
+    different devices, the file is copied and verified (see
+    verified_copy()) and only then removed from the source. With `sync`,
+    the destination folder is flushed to disk before that, so a power cut
+    cannot lose both names. With `algorithm`, the checksum of the copied
+    data is returned, and compared with `expected_checksum` when one is
+    given; a same-device rename returns `expected_checksum`.
+    """
+    try:
+        os.rename(source, destination)
+        return expected_checksum
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    checksum = verified_copy(source, destination, algorithm, expected_checksum)
+    if sync:
+        fsync_path(Path(destination).parent)
+    os.unlink(source)
+    return checksum
+
+
+# ioctl(dest_fd, FICLONE, src_fd) from <linux/fs.h>
+FICLONE = 0x40049409
+LINK_MODES = ('hardlink', 'reflink')
+
+
+def reflink_file(source, destination):
+    """
+    Create `destination` as a copy-on-write clone of `source` (FICLONE).
+
+    Only the file's extent map is copied; the data blocks are shared until
+    either file is modified. Needs a filesystem with reflinks (Btrfs, XFS,
+    bcachefs...) and both files on it; raises OSError otherwise.
+    """
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform.")
+    with open(source, 'rb') as src, open(destination, 'xb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except BaseException:
+            os.unlink(destination)
+            raise
+
+
+def replace_with_link(keeper, duplicate, mode='hardlink'):
+    """
+    Atomically replace `duplicate` with a hardlink or reflink to `keeper`.
+
+    The link is made under a hidden temporary name next to `duplicate` and
+    renamed over it, so `duplicate` is never missing. A reflink keeps the
+    duplicate's own timestamps and mode; a hardlink shares the keeper's.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Invalid link mode '{mode}'. Must be one of: {', '.join(LINK_MODES)}.")
+    duplicate = Path(duplicate)
+    temporary = duplicate.with_name(f".{duplicate.name}.link")
+    temporary.unlink(missing_ok=True)
+    try:
+        if mode == 'hardlink':
+            os.link(keeper, temporary)
+        else:
+            reflink_file(keeper, temporary)
+            shutil.copystat(duplicate, temporary)
+        os.replace(temporary, duplicate)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+# How photos get into the destination: all but 'move' keep the source
+TRANSFER_MODES = ('move',) + LINK_MODES + ('copy',)
+# Errors meaning these two files cannot share their data, so a copy is made instead
+LINK_FALLBACK_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EINVAL, errno.ENOTTY, errno.EOPNOTSUPP,
+                        errno.ENOTSUP}
+
+
+def transfer_file(source, destination, mode='move', algorithm=None, expected_checksum=None, sync=False):
+    """
+    Put `source` at `destination` as `mode` says.
+
+    'move' is move_file(). The other modes keep the source: 'hardlink'
+    adds a second name for the same file and 'reflink' a copy-on-write
+    clone, so no data is duplicated; where the two files cannot share
+    their data (another filesystem, no reflink support), they fall back to
+    'copy', a verified_copy(). A clone is made under a hidden
+    '.partial' name first, so `destination` is complete once it exists.
+    Checksums are returned and checked, and `sync` is honoured, as in
+    move_file().
+    """
+    if mode == 'move':
+        return move_file(source, destination, algorithm, expected_checksum, sync)
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"Invalid transfer mode '{mode}'. Must be one of: {', '.join(TRANSFER_MODES)}.")
+
+    if mode in LINK_MODES:
+        try:
+            if mode == 'hardlink':
+                os.link(source, destination)
+            else:
+                partial = Path(destination).with_name(f".{Path(destination).name}.partial")
+                partial.unlink(missing_ok=True)
+                reflink_file(source, partial)
+                shutil.copystat(source, partial)
+                os.rename(partial, destination)
+            return expected_checksum
+        except OSError as e:
+            if e.errno not in LINK_FALLBACK_ERRNOS:
+                raise
+
+    return verified_copy(source, destination, algorithm, expected_checksum)
@@ -0,0 +1,228 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+# Seconds between polls, and how long a file must stay unchanged to count as complete
+DEFAULT_POLL_INTERVAL = 2.0
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+_READ_SIZE = 64 * 1024
+
+
+class Inotify:
+    """
+    Minimal inotify(7) binding through ctypes.
+
+    Folders are watched for files closed after writing, entries moved in
+    and new subfolders. read_events() blocks in select() until the kernel
+    has something to report, so an idle watch uses no CPU.
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        self._folders = {}
+
+    def add_watch(self, folder):
+        wd = self._add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(folder))
+        self._folders[wd] = Path(folder)
+
+    def read_events(self, timeout=None):
+        """
+        Return a list of (path, mask), waiting up to `timeout` seconds
+        (forever if None). A queue overflow is reported as (None, mask).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\x00')
+            offset += length
+
+            if mask & IN_IGNORED:
+                self._folders.pop(wd, None)  # the folder was removed
+            elif mask & IN_Q_OVERFLOW:
+                events.append((None, mask))
+            elif name and wd in self._folders:
+                events.append((self._folders[wd] / os.fsdecode(name), mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def open_inotify():
+    """Return an Inotify instance, or None where inotify is not available."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return Inotify()
+    except (OSError, AttributeError):
+        return None
+
+
+def inotify_available():
+    """Return True if watch_files() can use inotify on this system."""
+    inotify = open_inotify()
+    if inotify is None:
+        return False
+    inotify.close()
+    return True
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def watch_batches(root, recursive=False, exclude=(), poll_interval=None):
+    """
+    Yield lists of the Paths of complete files in `root`, as files arrive.
+
+    Files already in the folder are included. On Linux, inotify reports
+    files as soon as their writer closes them. Files that were already there
+    or that appear with a new subfolder have no such event, so they are
+    yielded once they stop changing for one `poll_interval`. Where inotify
+    is unavailable, or when `poll_interval` is given, the folder is
+    rescanned every `poll_interval` seconds instead and the same "stopped
+    changing" rule applies to every file. Each list holds the files that
+    completed in one read of inotify events or one poll, so a burst of
+    arrivals (a card being copied) is handed over together. The generator
+    runs until it is closed or interrupted.
+    """
+    root = Path(root).resolve()
+    excluded = {os.path.normcase(str(Path(p).resolve())) for p in exclude}
+    inotify = open_inotify() if poll_interval is None else None
+    interval = poll_interval or DEFAULT_POLL_INTERVAL
+
+    def scan(folder, seen):
+        # Watch folders before listing them, so no file falls between the two
+        if inotify:
+            inotify.add_watch(folder)
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and os.path.normcase(entry.path) not in excluded:
+                            scan(entry.path, seen)
+                    elif entry.is_file():
+                        seen[Path(entry.path)] = _signature(entry.path)
+        except FileNotFoundError:
+            pass  # removed while we were looking at it
+        except OSError as e:
+            raise RuntimeError(f"Error accessing files in directory '{folder}': {e}")
+
+    try:
+        if inotify:
+            # Files without a close event yet: path -> (signature, when it was taken)
+            settling = {}
+
+            def settle(folder):
+                found = {}
+                scan(folder, found)
+                now = time.monotonic()
+                for path, signature in found.items():
+                    settling[path] = (signature, now)
+
+            settle(root)
+            while True:
+                timeout = None
+                if settling:
+                    due = min(taken for _, taken in settling.values()) + interval
+                    timeout = max(0.0, due - time.monotonic())
+
+                batch = []
+                for path, mask in inotify.read_events(timeout):
+                    if path is None:
+                        # Events were lost: fall back to looking at everything
+                        settle(root)
+                    elif mask & IN_ISDIR:
+                        if recursive and os.path.normcase(str(path)) not in excluded:
+                            settle(path)
+                    elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        settling.pop(path, None)
+                        batch.append(path)
+                    # A plain IN_CREATE on a file waits for its IN_CLOSE_WRITE
+
+                now = time.monotonic()
+                for path, (signature, taken) in list(settling.items()):
+                    if now - taken < interval:
+                        continue
+                    current = _signature(path)
+                    if current is None:
+                        del settling[path]
+                    elif current == signature:
+                        del settling[path]
+                        batch.append(path)
+                    else:
+                        settling[path] = (current, now)
+                if batch:
+                    yield batch
+        else:
+            # Signatures seen on the last poll, and when each file was yielded
+            settling = {}
+            yielded = {}
+            while True:
+                seen = {}
+                scan(root, seen)
+                batch = []
+                for path, signature in seen.items():
+                    if signature is None or yielded.get(path) == signature:
+                        continue
+                    if settling.get(path) == signature:
+                        yielded[path] = signature
+                        batch.append(path)
+                if batch:
+                    yield batch
+                # Forget files that are gone; remember the rest for the next poll
+                settling = seen
+                yielded = {path: signature for path, signature in yielded.items() if path in seen}
+                time.sleep(interval)
+    finally:
+        if inotify:
+            inotify.close()
+
+
+def watch_files(root, recursive=False, exclude=(), poll_interval=None):
+    """Yield the Path of every complete file in `root`, one at a time, as watch_batches() finds them."""
+    batches = watch_batches(root, recursive, exclude, poll_interval)
+    try:
+        for batch in batches:
+            yield from batch
+    finally:
+        batches.close()
@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.fixture
+def write():
+    """Return write(path, data): write `data` to `path`, creating its folders, and return the path."""
+    def write(path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    return write
@@ -0,0 +1,74 @@
+import pytest
+
+from bulk_photo_processor import PhotoPipeline, RunOptions, apply_plan, dedupe_archive
+
+
+def test_pipeline_reports_through_callbacks_only(tmp_path, capsys, write):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    write(source / "20240101_100000.jpg", b"new")
+    write(source / "2024-01-02T10_00_00-000009.jpg", b"same")
+    write(target / "2024" / "01" / "2024-01-02T10_00_00-000009.jpg", b"same")
+    events = []
+    progress = []
+
+    counts = PhotoPipeline(source, target, use_index=False, on_event=events.append,
+                           on_progress=progress.append).run()
+
+    assert counts == {"processed": 2, "renamed": 1, "moved": 1, "skipped": 1, "near_duplicates": 0}
+    assert sorted(event["kind"] for event in events) == ["moved", "skipped"]
+    moved = next(event for event in events if event["kind"] == "moved")
+    assert moved["destination"] == target / "2024" / "01" / "2024-01-01T10_00_00-000001.jpg"
+    assert moved["destination"].exists()
+    assert progress == [1, 2]
+    assert capsys.readouterr() == ("", "")
+
+
+def test_rename_only_needs_no_target(tmp_path, write):
+    write(tmp_path / "20240101_100000.jpg", b"a")
+
+    counts = PhotoPipeline(tmp_path, mode="rename-only").run()
+
+    assert counts["renamed"] == 1
+    assert (tmp_path / "2024-01-01T10_00_00-000001.jpg").exists()
+    with pytest.raises(ValueError):
+        PhotoPipeline([tmp_path, tmp_path / "other"], tmp_path / "dst", mode="move-only")
+
+
+def test_plan_apply_and_dedupe_report_through_callbacks_only(tmp_path, capsys, write):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    write(source / "20240101_100000.jpg", b"same")
+    write(target / "2023" / "01" / "old.jpg", b"same")
+    plan_file = tmp_path / "plan.jsonl"
+    events = []
+
+    assert PhotoPipeline(source, target, use_index=False, on_event=events.append).plan(plan_file)["move"] == 1
+    assert apply_plan(plan_file, on_event=events.append) == {"moved": 1}
+    summary = dedupe_archive(target, use_index=False, on_event=events.append)
+
+    assert summary["sets"] == 1
+    assert [event["kind"] for event in events] == ["planned", "moved", "duplicate_set"]
+    assert events[0]["op"] == "move"
+    assert events[2]["source"] == target / "2023" / "01" / "old.jpg"
+    assert events[2]["copies"] == [target / "2024" / "01" / "2024-01-01T10_00_00-000001.jpg"]
+    assert capsys.readouterr() == ("", "")
+
+
+def test_plans_reject_options_they_would_ignore(tmp_path):
+    pipeline = PhotoPipeline(tmp_path, tmp_path / "dst", near_duplicates=0)
+
+    with pytest.raises(ValueError, match="near_duplicates"):
+        pipeline.plan(tmp_path / "plan.jsonl")
+
+
+def test_run_options_are_shared_and_overridden_by_keywords(tmp_path, write):
+    source = tmp_path / "src"
+    write(source / "DCIM" / "20240101_120000.jpg", b"a")
+    options = RunOptions(use_index=False)
+
+    assert PhotoPipeline(source, tmp_path / "dst", options=options).run()["moved"] == 0
+    assert PhotoPipeline(source, tmp_path / "dst", options=options, recursive=True).run()["moved"] == 1
+    assert options.recursive is False
+    with pytest.raises(TypeError, match="recursiv"):
+        RunOptions(recursiv=True)
@@ -0,0 +1,38 @@
+import json
+import sys
+from pathlib import Path
+
+from bulk_photo_processor.bench import generate_tree, main, run_benchmark
+
+
+def test_generated_tree_exercises_every_mover_path(tmp_path):
+    tree = generate_tree(tmp_path, files=40, duplicate_ratio=0.25, bursts=2, burst_size=3, size_profile="tiny")
+
+    assert (tree["duplicates"], tree["collisions"], tree["to_rename"]) == (10, 6, 24)
+    assert generate_tree(tmp_path / "again", files=40, duplicate_ratio=0.25, bursts=2, burst_size=3,
+                         size_profile="tiny")["bytes"] == tree["bytes"]
+
+    results = run_benchmark(tree["source"], tree["target"], workers=2)
+
+    assert [result["stage"] for result in results] == ["checksum", "rename", "move"]
+    assert all(result["files"] == 40 and result["seconds"] > 0 for result in results)
+    archived = [path for path in Path(tree["target"]).rglob("*.jpg")]
+    assert len(archived) == 12 + 24 + 6
+    assert sum(path.stem.endswith(("_01", "_02", "_03")) for path in archived) == 6
+    # Duplicates stay behind in the source
+    assert len([path for path in Path(tree["source"]).rglob("*.jpg")]) == 10
+
+
+def test_json_report_keeps_each_configurations_tree(tmp_path, monkeypatch):
+    report_file = tmp_path / "report.json"
+    monkeypatch.setattr(sys, "argv", [
+        "bench", "--files", "20", "--bursts", "1", "--sizes", "tiny", "--dir", str(tmp_path / "trees"),
+        "--durability", "none", "batch", "--json", str(report_file),
+    ])
+    main()
+
+    runs = json.loads(report_file.read_text())["runs"]
+    assert [run["durability"] for run in runs] == ["none", "batch"]
+    for run in runs:
+        assert Path(run["tree"]["source"]).parent.name == f"{run['durability']}-off"
+        assert {result["durability"] for result in run["results"]} == {run["durability"]}
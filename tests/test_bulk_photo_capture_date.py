@@ -0,0 +1,100 @@
+import struct
+from datetime import datetime, timedelta
+
+from bulk_photo_processor.capture_date import CaptureDateCache, read_capture_date
+from bulk_photo_processor.pipeline import run_pipeline
+from bulk_photo_processor.reporting import Reporter
+
+
+def _exif_tiff(value):
+    tiff = b"II*\x00" + struct.pack("<I", 8)
+    tiff += struct.pack("<H", 1) + struct.pack("<HHII", 0x8769, 4, 1, 26) + struct.pack("<I", 0)
+    tiff += struct.pack("<H", 1) + struct.pack("<HHII", 0x9003, 2, 20, 44) + struct.pack("<I", 0)
+    return tiff + value.encode("ascii") + b"\x00"
+
+
+def _exif_jpeg(value):
+    app1 = b"Exif\x00\x00" + _exif_tiff(value)
+    return b"\xff\xd8" + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + b"\xff\xda\x00\x02" + b"\x00" * 1000
+
+
+def _box(box_type, payload):
+    return struct.pack(">I", len(payload) + 8) + box_type + payload
+
+
+def _heic(value):
+    # ftyp, then a meta box whose iinf lists an image and an Exif item and whose iloc points into mdat
+    exif = struct.pack(">I", 0) + b"Exif\x00\x00" + _exif_tiff(value)
+    infe = [_box(b"infe", b"\x02\x00\x00\x00" + struct.pack(">HH", item_id, 0) + item_type + b"\x00")
+            for item_id, item_type in ((1, b"hvc1"), (2, b"Exif"))]
+    iinf = _box(b"iinf", b"\x00\x00\x00\x00" + struct.pack(">H", len(infe)) + b"".join(infe))
+
+    def meta(exif_offset):
+        items = [(1, exif_offset + len(exif), 100), (2, exif_offset, len(exif))]
+        iloc = b"\x00\x00\x00\x00" + bytes([0x44, 0x00]) + struct.pack(">H", len(items))
+        for item_id, offset, length in items:
+            iloc += struct.pack(">HHHII", item_id, 0, 1, offset, length)
+        return _box(b"meta", b"\x00\x00\x00\x00" + iinf + _box(b"iloc", iloc))
+
+    ftyp = _box(b"ftyp", b"heic\x00\x00\x00\x00mif1heic")
+    exif_offset = len(ftyp) + len(meta(0)) + 8
+    return ftyp + meta(exif_offset) + _box(b"mdat", exif + b"\x00" * 100)
+
+
+def test_read_capture_date_from_jpeg_exif(tmp_path):
+    photo = tmp_path / "IMG_0001.jpg"
+    photo.write_bytes(_exif_jpeg("2023:07:14 09:30:05"))
+
+    assert read_capture_date(photo) == datetime(2023, 7, 14, 9, 30, 5)
+
+
+def test_read_capture_date_from_heic_exif_item(tmp_path):
+    photo = tmp_path / "IMG_0001.HEIC"
+    photo.write_bytes(_heic("2021:12:24 18:45:00"))
+
+    assert read_capture_date(photo) == datetime(2021, 12, 24, 18, 45)
+
+
+def test_read_capture_date_from_mp4_mvhd_after_mdat(tmp_path):
+    seconds = int((datetime(2022, 1, 2, 3, 4, 5) - datetime(1904, 1, 1)).total_seconds())
+    mvhd = _box(b"mvhd", b"\x00\x00\x00\x00" + struct.pack(">I", seconds) + b"\x00" * 92)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(_box(b"ftyp", b"isom\x00\x00\x00\x00") + _box(b"mdat", b"\x00" * 5000) + _box(b"moov", mvhd))
+
+    utc = datetime(2022, 1, 2, 3, 4, 5)
+    local = read_capture_date(video)
+    assert abs(local - utc) <= timedelta(hours=14)
+    assert local.minute == 4 and local.second == 5
+
+
+def test_capture_date_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    from bulk_photo_processor import capture_date
+
+    photo = tmp_path / "IMG_0002.jpg"
+    photo.write_bytes(_exif_jpeg("2023:07:14 09:30:05"))
+
+    with CaptureDateCache(tmp_path / "cache.sqlite") as cache:
+        assert cache.capture_date(photo) == datetime(2023, 7, 14, 9, 30, 5)
+        monkeypatch.setattr(capture_date, "read_capture_date", None)  # must not be reached
+        assert cache.capture_date(photo) == datetime(2023, 7, 14, 9, 30, 5)
+
+
+def test_pipeline_files_photos_by_capture_date(tmp_path, monkeypatch):
+    # The default cache lives under XDG_CACHE_HOME: keep it out of the real home folder
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    source.mkdir()
+    target.mkdir()
+    (source / "DSC01234.JPG").write_bytes(_exif_jpeg("2023:07:14 09:30:05"))
+    (source / "IMG_5678.HEIC").write_bytes(_heic("2021:12:24 18:45:00"))
+    (source / "DSC09999.JPG").write_bytes(b"\xff\xd8no exif")
+
+    counts = run_pipeline(source, target, use_capture_date=True, reporter=Reporter())
+
+    assert (counts["renamed"], counts["moved"]) == (2, 2)
+    # Sequence numbers follow scan order
+    moved = sorted((str(p.parent.relative_to(target)), p.name[:19], p.suffix) for p in target.glob("*/*/*"))
+    assert moved == [("2021/12", "2021-12-24T18_45_00", ".heic"), ("2023/07", "2023-07-14T09_30_05", ".jpg")]
+    assert [p.name for p in source.iterdir()] == ["DSC09999.JPG"]
+    assert (tmp_path / "cache" / "bulk_photo_processor" / "capture_dates.sqlite").exists()
@@ -0,0 +1,21 @@
+import sys
+
+import pytest
+
+from bulk_photo_processor.cli import cli
+
+
+@pytest.mark.parametrize("option, value", [
+    ("--workers", "0"),
+    ("--sync-every", "0"),
+    ("--sync-interval", "0"),
+    ("--max-entries", "-1"),
+    ("--thumbnail-cache-size", "0"),
+])
+def test_cli_rejects_values_below_their_minimum(tmp_path, monkeypatch, capsys, option, value):
+    monkeypatch.chdir(tmp_path)  # the CLI logs to ./logs
+    monkeypatch.setattr(sys, "argv", ["bulk-photo", "-s", str(tmp_path), "-d", str(tmp_path / "dst"), option, value])
+
+    with pytest.raises(SystemExit):
+        cli()
+    assert option in capsys.readouterr().err
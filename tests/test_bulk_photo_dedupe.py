@@ -0,0 +1,36 @@
+import os
+
+from bulk_photo_processor.dedupe import dedupe_archive
+
+
+def _archive(root):
+    for folder, name, data in (("2023/01", "a.jpg", b"same"), ("2023/02", "b.jpg", b"same"),
+                               ("2024/01", "c.jpg", b"same"), ("2024/01", "d.jpg", b"diff")):
+        (root / folder).mkdir(parents=True, exist_ok=True)
+        (root / folder / name).write_bytes(data)
+
+
+def test_dedupe_reports_then_hardlinks_duplicates(tmp_path):
+    _archive(tmp_path)
+
+    summary = dedupe_archive(tmp_path, use_index=False)
+    assert (summary["sets"], summary["duplicates"], summary["linked"]) == (1, 2, 0)
+
+    summary = dedupe_archive(tmp_path, link_mode="hardlink")
+    assert (summary["linked"], summary["reclaimed"]) == (2, 8)
+    assert os.path.samefile(tmp_path / "2023/01/a.jpg", tmp_path / "2024/01/c.jpg")
+    assert (tmp_path / "2023/02/b.jpg").read_bytes() == b"same"
+
+    # Hardlinked copies count as one
+    assert dedupe_archive(tmp_path)["sets"] == 0
+
+
+def test_dedupe_reflink_never_loses_a_copy(tmp_path):
+    _archive(tmp_path)
+
+    summary = dedupe_archive(tmp_path, link_mode="reflink", use_index=False)
+
+    # Whether or not this filesystem supports reflinks, every file is still there
+    assert summary["linked"] + summary["failed"] == 2
+    assert [p.read_bytes() for p in sorted(tmp_path.rglob("*.jpg"))] == [b"same", b"same", b"same", b"diff"]
+    assert not list(tmp_path.rglob(".*.link"))
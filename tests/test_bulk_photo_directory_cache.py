@@ -0,0 +1,36 @@
+from bulk_photo_processor.directory_cache import DirectoryCache
+
+
+def test_directory_cache_assigns_collision_suffixes_in_memory(tmp_path, write):
+    folder = tmp_path / "2024" / "05"
+    write(folder / "a.jpg", b"")
+    write(folder / "a_01.jpg", b"")
+
+    cache = DirectoryCache()
+    cache.ensure_folder(folder)
+    names = []
+    for _ in range(3):
+        path = cache.unique_path(folder / "a.jpg")
+        cache.add(path)
+        names.append(path.name)
+
+    assert names == ["a_02.jpg", "a_03.jpg", "a_04.jpg"]
+    assert not (folder / "a_02.jpg").exists()
+
+
+def test_directory_cache_indexes_collision_variants(tmp_path, write):
+    folder = tmp_path / "2024" / "05"
+    for name in ("a.jpg", "a_01.jpg", "a_1.jpg", "b_01.jpg", "a_02.png", "x_a_03.jpg"):
+        write(folder / name, b"")
+
+    cache = DirectoryCache()
+    assert cache.variants(folder / "a.jpg") == [folder / "a_01.jpg"]
+
+    cache.add(cache.unique_path(folder / "a.jpg"))
+    cache.discard(folder / "a_01.jpg")
+    assert cache.variants(folder / "a.jpg") == [folder / "a_02.jpg"]
+    assert cache.variants(folder / "x_a.jpg") == [folder / "x_a_03.jpg"]
+
+    simulated = DirectoryCache(simulate=True)
+    simulated.add(simulated.unique_path(folder / "a.jpg"))
+    assert simulated.variants(folder / "a.jpg") == [folder / "a_01.jpg"]
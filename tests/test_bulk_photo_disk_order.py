@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from bulk_photo_processor.bulk_photo_mover import move_photos
+from bulk_photo_processor.disk_order import first_extent, in_disk_order, sort_folder
+from bulk_photo_processor.scanner import scan_files
+
+
+def test_in_disk_order_sorts_each_folder_by_inode(tmp_path, write):
+    for folder in ("100CANON", "101CANON"):
+        for number in range(20):
+            write(tmp_path / folder / f"IMG_{number:04}.JPG", b"x" * (number + 1))
+
+    entries = list(in_disk_order(scan_files(tmp_path, recursive=True), "inode"))
+
+    assert len(entries) == 40
+    folders = [os.path.dirname(entry.path) for entry in entries]
+    # Each folder is read in one run
+    assert folders == sorted(folders, key=folders.index)
+    for folder in set(folders):
+        inodes = [entry.inode() for entry in entries if os.path.dirname(entry.path) == folder]
+        assert inodes == sorted(inodes)
+
+
+def test_extent_order_keeps_every_file(tmp_path, write):
+    write(tmp_path / "empty.jpg", b"")
+    for number in range(10):
+        write(tmp_path / f"{number}.jpg", os.urandom(8192))
+
+    entries = sort_folder(list(os.scandir(tmp_path)), "extent")
+
+    assert sorted(entry.name for entry in entries) == sorted(os.listdir(tmp_path))
+    assert first_extent(tmp_path / "empty.jpg") in (0, None)
+    with pytest.raises(ValueError):
+        sort_folder([], "name")
+
+
+def test_move_photos_in_disk_order(tmp_path, write):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    for number in range(30):
+        write(source / f"10{number // 10}CANON" / f"2024-01-{number + 1:02}T10_00_00-000001.jpg", bytes([number]))
+
+    result = move_photos(source, target, recursive=True, disk_order="extent")
+
+    assert result["moved"] == 30
+    assert len(list(target.rglob("*.jpg"))) == 30
+    with pytest.raises(ValueError):
+        move_photos(source, target, disk_order="name")
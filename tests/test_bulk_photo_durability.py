@@ -0,0 +1,41 @@
+from bulk_photo_processor.bulk_photo_mover import move_photos
+from bulk_photo_processor.durability import Durability
+from bulk_photo_processor.journal import Journal
+from bulk_photo_processor.metrics import RunMetrics
+
+
+def test_batch_mode_commits_once_synced(tmp_path, write):
+    journal = Journal(tmp_path / "journal.jsonl")
+    durable = Durability("batch", journal, every=2, interval=3600, root=tmp_path)
+    moves = []
+    for number in range(3):
+        source = write(tmp_path / "src" / f"{number}.jpg", b"x")
+        destination = tmp_path / "dst" / "2024" / f"{number}.jpg"
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        op_id = journal.begin("move", source, destination)
+        source.rename(destination)
+        durable.commit(op_id, source, destination)
+        moves.append(op_id)
+
+    # The first two were synced as a batch; the third waits for the next one
+    assert journal.committed == set(moves[:2])
+    assert journal.in_flight
+    durable.close()
+    assert journal.committed == set(moves)
+    journal.close()
+
+
+def test_move_photos_strict_syncs_every_move(tmp_path, write):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    write(source / "2024-01-01T10_00_00-000001.jpg", b"a")
+    write(source / "2024-02-01T10_00_00-000002.jpg", b"b")
+    metrics = RunMetrics()
+
+    move_photos(source, target, durability="strict", metrics=metrics)
+
+    assert (target / "2024" / "02" / "2024-02-01T10_00_00-000002.jpg").exists()
+    report = metrics.report()
+    assert report["counters"]["syncs"] == 2
+    assert report["stages"]["sync"]["calls"] >= 2
+    assert not (source / ".bulk_photo_journal.jsonl").exists()
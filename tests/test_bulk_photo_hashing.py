@@ -0,0 +1,19 @@
+from bulk_photo_processor import hashing
+from bulk_photo_processor.hashing import STRATEGIES, calculate_checksum
+
+
+def test_checksum_strategies_agree(tmp_path, write):
+    photo = write(tmp_path / "a.jpg", bytes(range(256)) * 5000)
+    digests = {calculate_checksum(photo, "sha1", strategy, buffer_size=4096) for strategy in STRATEGIES}
+    assert len(digests) == 1
+
+
+def test_compare_files_rejects_large_files_on_partial_hash(tmp_path, monkeypatch, write):
+    size = 64 * 1024
+    monkeypatch.setattr(hashing, "PARTIAL_HASH_MIN_SIZE", size)
+    monkeypatch.setattr(hashing, "calculate_checksum", None)  # must not be reached
+
+    source = write(tmp_path / "a.mp4", b"a" * size)
+    target = write(tmp_path / "b.mp4", b"a" * (size - 1) + b"b")
+
+    assert hashing.compare_files(source, target, algorithm="blake2b") == (False, None)
@@ -0,0 +1,61 @@
+import sys
+
+from bulk_photo_processor import ingest
+from bulk_photo_processor.cli import cli
+from bulk_photo_processor.ingest import group_by_device, ingest_sources
+
+
+def _card(root, name, photos):
+    card = root / name / "DCIM"
+    card.mkdir(parents=True)
+    for file_name, data in photos.items():
+        (card / file_name).write_bytes(data)
+    return card
+
+
+def test_ingest_shares_names_and_sequence_across_sources(tmp_path, monkeypatch):
+    # One queue per card, so the three pipelines run side by side
+    monkeypatch.setattr(ingest, "device_of", lambda path: path)
+    cards = [
+        _card(tmp_path, f"card{number}", {
+            "20240101_120000.jpg": f"shot {number}".encode(),
+            "20240101_120001.jpg": f"next {number}".encode(),
+            # The same already-renamed photo on every card
+            "2024-02-01T09_00_00-000001.jpg": b"copied",
+        })
+        for number in range(3)
+    ]
+    target = tmp_path / "archive"
+
+    results = ingest_sources(cards, target, use_index=False, workers=2)
+
+    assert sum(counts["moved"] for counts in results.values()) == 7
+    assert sum(counts["skipped"] for counts in results.values()) == 2
+    january = sorted(path.name for path in (target / "2024" / "01").iterdir())
+    # Six photos numbered 1 to 6, whichever card each came from
+    assert sorted(name[-10:-4] for name in january) == [f"{n:06}" for n in range(1, 7)]
+    assert [path.name for path in (target / "2024" / "02").iterdir()] == ["2024-02-01T09_00_00-000001.jpg"]
+    assert {path.read_bytes() for path in (target / "2024" / "01").iterdir()} == {
+        f"{kind} {number}".encode() for kind in ("shot", "next") for number in range(3)
+    }
+
+
+def test_group_by_device_keeps_order(tmp_path):
+    sources = [tmp_path / "a", tmp_path / "b"]
+    for source in sources:
+        source.mkdir()
+    assert list(group_by_device(sources).values()) == [sources]
+
+
+def test_cli_ingests_repeated_sources(tmp_path, monkeypatch):
+    first = _card(tmp_path, "card1", {"20240101_120000.jpg": b"a"})
+    second = _card(tmp_path, "card2", {"20240101_120000.jpg": b"b"})
+    target = tmp_path / "archive"
+
+    monkeypatch.chdir(tmp_path)  # the CLI logs to ./logs
+    monkeypatch.setattr(sys, "argv", ["bulk-photo", "-s", str(first), "-s", str(second), "-d", str(target)])
+    cli()
+
+    assert sorted(path.name for path in (target / "2024" / "01").iterdir()) == [
+        "2024-01-01T12_00_00-000001.jpg", "2024-01-01T12_00_00-000002.jpg",
+    ]
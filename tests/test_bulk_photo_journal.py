@@ -0,0 +1,55 @@
+import os
+
+from bulk_photo_processor.journal import Journal
+
+
+def test_resume_keeps_a_source_that_differs_from_the_destination(tmp_path):
+    source = tmp_path / "src" / "2024-01-01T10_00_00-000001.jpg"
+    destination = tmp_path / "dst" / "2024-01-01T10_00_00-000001.jpg"
+    for path, data in ((source, b"frame 1"), (destination, b"frame 2")):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    journal_path = tmp_path / "run.journal"
+
+    journal = Journal(journal_path)
+    journal.begin("move", source, destination)
+    journal.close()  # crash before the move
+
+    resumed = Journal(journal_path, resume=True)
+    # Same size, other content: not a finished copy, so the only copy of the source stays
+    assert not resumed.committed
+    assert source.read_bytes() == b"frame 1"
+    resumed.close(remove=True)
+
+
+def test_resume_finishes_a_copied_move(tmp_path):
+    source = tmp_path / "src" / "a.jpg"
+    destination = tmp_path / "dst" / "a.jpg"
+    for path in (source, destination):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"same")
+    journal_path = tmp_path / "run.journal"
+
+    journal = Journal(journal_path)
+    op_id = journal.begin("move", source, destination)
+    journal.close()  # crash after the copy, before the source was removed
+
+    resumed = Journal(journal_path, resume=True)
+    assert resumed.committed == {op_id}
+    assert not source.exists()
+    resumed.close(remove=True)
+
+
+def test_resume_never_removes_the_source_of_a_link(tmp_path, write):
+    source = write(tmp_path / "src" / "a.jpg", b"same")
+    linked = tmp_path / "dst" / "a.jpg"
+    linked.parent.mkdir()
+    os.link(source, linked)
+    journal_path = tmp_path / "run.journal"
+
+    journal = Journal(journal_path)
+    journal.begin("hardlink", source, linked)
+    journal.close()  # crash before the commit
+
+    Journal(journal_path, resume=True).close(remove=True)
+    assert source.exists()
@@ -0,0 +1,55 @@
+import pytest
+
+from bulk_photo_processor.bulk_photo_mover import move_photos
+from bulk_photo_processor.layout import TargetLayout, parse_layout
+
+
+def _fields(day, hour="10"):
+    return {"year": "2024", "month": "01", "day": day, "hour": hour}
+
+
+def test_parse_layout():
+    assert parse_layout("YYYY/MM/DD") == ("{year}", "{month}", "{day}")
+    assert parse_layout("YYYY/YYYY-MM") == ("{year}", "{year}-{month}")
+    for layout in ("", "MM/DD", "YYYY/%m", "YYYY//MM"):
+        with pytest.raises(ValueError):
+            parse_layout(layout)
+
+
+def test_move_photos_into_day_folders(tmp_path, write):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    write(source / "2024-01-01T10_00_00-000001.jpg", b"a")
+    write(source / "2024-01-02T10_00_00-000002.jpg", b"b")
+
+    move_photos(source, target, layout="YYYY/MM/DD")
+
+    assert (target / "2024" / "01" / "01" / "2024-01-01T10_00_00-000001.jpg").exists()
+    assert (target / "2024" / "01" / "02" / "2024-01-02T10_00_00-000002.jpg").exists()
+
+
+def test_full_folder_is_split_by_day(tmp_path, write):
+    month = tmp_path / "2024" / "01"
+    write(month / "old-1.jpg", b"1")
+    write(month / "old-2.jpg", b"2")
+    layout = TargetLayout("YYYY/MM", max_entries=3)
+
+    # One more entry fits, then new photos go one level deeper
+    assert layout.folder_for(tmp_path, _fields("05"), "a.jpg") == month
+    assert layout.folder_for(tmp_path, _fields("05"), "b.jpg") == month / "05"
+    assert layout.folder_for(tmp_path, _fields("06"), "c.jpg") == month / "06"
+    # A name already in the folder stays there, so it is still checked for duplicates
+    assert layout.folder_for(tmp_path, _fields("07"), "old-1.jpg") == month
+    # Day folders split by hour in turn
+    for name in ("d.jpg", "e.jpg"):
+        layout.folder_for(tmp_path, _fields("05"), name)
+    assert layout.folder_for(tmp_path, _fields("05", "11"), "f.jpg") == month / "05" / "11"
+
+
+def test_existing_split_folder_is_reused(tmp_path, write):
+    month = tmp_path / "2024" / "01"
+    write(month / "05" / "old.jpg", b"1")
+    layout = TargetLayout("YYYY/MM", max_entries=100)
+
+    assert layout.folder_for(tmp_path, _fields("05"), "a.jpg") == month / "05"
+    assert layout.folder_for(tmp_path, _fields("06"), "b.jpg") == month
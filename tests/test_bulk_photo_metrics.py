@@ -0,0 +1,33 @@
+import json
+import sys
+
+from bulk_photo_processor.cli import cli
+
+
+def test_cli_full_pipeline_writes_run_reports(tmp_path, monkeypatch):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    source.mkdir()
+    (source / "20240101_120000.jpg").write_bytes(b"a")
+    (source / "20240102_120000.jpg").write_bytes(b"b")
+    (target / "2024" / "01").mkdir(parents=True)
+    (target / "2024" / "01" / "2024-01-01T12_00_00-000001.jpg").write_bytes(b"c")
+    (target / "2024" / "01" / "2024-01-01T12_00_00-000002.jpg").write_bytes(b"c")
+    (target / "2024" / "01" / "2024-01-02T12_00_00-000001.jpg").write_bytes(b"c")
+    (target / "2024" / "01" / "2024-01-02T12_00_00-000002.jpg").write_bytes(b"c")
+
+    monkeypatch.chdir(tmp_path)  # the CLI logs to ./logs
+    monkeypatch.setattr(sys, "argv", [
+        "bulk-photo", "-s", str(source), "-d", str(target), "--no-index",
+        "--report", str(tmp_path / "report.json"), "--prometheus", str(tmp_path / "run.prom"),
+    ])
+    cli()
+
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert report["status"] == "ok"
+    assert report["counters"] == {"renamed": 2, "moved": 2, "collisions": 2}
+    assert report["stages"]["hash"]["bytes"] == 4
+    assert {"scan", "match", "plan", "mkdir", "collision", "move"} <= set(report["stages"])
+    # Photos go straight to their final name: nothing is renamed in place
+    assert "rename" not in report["stages"]
+    assert 'bulk_photo_files{outcome="moved"} 2' in (tmp_path / "run.prom").read_text()
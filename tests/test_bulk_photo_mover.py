@@ -0,0 +1,123 @@
+import pytest
+
+from bulk_photo_processor import pipeline
+from bulk_photo_processor.bulk_photo_mover import move_photos
+from bulk_photo_processor.options import RunOptions
+from bulk_photo_processor.reporting import CallbackReporter, Reporter, _Progress
+
+
+def test_move_photos_with_workers_skips_duplicates(tmp_path, write):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    write(source / "2024-01-01T10_00_00-000001.jpg", b"same")
+    write(source / "2024-01-02T10_00_00-000002.jpg", b"new")
+    write(target / "2024" / "01" / "2024-01-01T10_00_00-000001.jpg", b"same")
+    write(target / "2024" / "01" / "2024-01-02T10_00_00-000002.jpg", b"different")
+
+    move_photos(source, target, workers=4)
+
+    moved = sorted(p.name for p in (target / "2024" / "01").iterdir())
+    assert moved == [
+        "2024-01-01T10_00_00-000001.jpg",
+        "2024-01-02T10_00_00-000002.jpg",
+        "2024-01-02T10_00_00-000002_01.jpg",
+    ]
+    assert (source / "2024-01-01T10_00_00-000001.jpg").exists()
+
+
+def test_move_photos_recursive_skips_target_inside_source(tmp_path, write):
+    source = tmp_path / "DCIM"
+    target = source / "Album"
+    write(source / "100CANON" / "2024-03-01T10_00_00-000001.jpg", b"a")
+    write(source / "101CANON" / "2024-03-02T10_00_00-000002.JPG", b"b")
+    write(target / "2024" / "03" / "2024-03-01T10_00_00-000001.jpg", b"a")
+
+    move_photos(source, target, recursive=True)
+
+    assert sorted(p.name for p in (target / "2024" / "03").iterdir()) == [
+        "2024-03-01T10_00_00-000001.jpg",
+        "2024-03-02T10_00_00-000002.jpg",
+    ]
+    assert (source / "100CANON" / "2024-03-01T10_00_00-000001.jpg").exists()
+
+
+def test_link_modes_keep_the_source(tmp_path, write):
+    source = tmp_path / "src"
+    write(source / "2024-01-01T10_00_00-000001.jpg", b"same")
+    write(source / "2024-01-02T10_00_00-000002.jpg", b"new")
+    for mode in ("hardlink", "reflink", "copy"):
+        target = tmp_path / mode
+        write(target / "2024" / "01" / "2024-01-02T10_00_00-000002.jpg", b"different")
+
+        counts = move_photos(source, target, link_mode=mode)
+        # A second run finds every photo already there
+        again = move_photos(source, target, link_mode=mode)
+
+        assert sorted(p.name for p in source.iterdir()) == [
+            "2024-01-01T10_00_00-000001.jpg",
+            "2024-01-02T10_00_00-000002.jpg",
+        ]
+        assert sorted(p.name for p in (target / "2024" / "01").iterdir()) == [
+            "2024-01-01T10_00_00-000001.jpg",
+            "2024-01-02T10_00_00-000002.jpg",
+            "2024-01-02T10_00_00-000002_01.jpg",
+        ]
+        assert (counts["moved"], again["moved"], again["skipped"]) == (2, 0, 2)
+
+    linked = tmp_path / "hardlink" / "2024" / "01" / "2024-01-01T10_00_00-000001.jpg"
+    assert linked.stat().st_ino == (source / "2024-01-01T10_00_00-000001.jpg").stat().st_ino
+
+
+def test_test_mode_collision_needs_no_written_file(tmp_path, write):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    for folder, data in (("a", b"1"), ("b", b"2"), ("c", b"1")):
+        write(source / folder / "2024-01-01T12_00_00-000001.jpg", data)
+    events = []
+    reporter = CallbackReporter(on_event=events.append)
+
+    counts = move_photos(source, target, test_mode=True, recursive=True, reporter=reporter)
+
+    # Simulated moves are not compared, so even the copy of the first is only a collision
+    assert (counts["moved"], counts["skipped"]) == (3, 0)
+    assert [event["destination"].name for event in events] == [
+        "2024-01-01T12_00_00-000001.jpg",
+        "2024-01-01T12_00_00-000001_01.jpg",
+        "2024-01-01T12_00_00-000001_02.jpg",
+    ]
+    assert not (target / "2024").exists()
+
+
+def test_move_photos_takes_run_options(tmp_path, write):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    write(source / "2024-01-01T10_00_00-000001.jpg", b"a")
+
+    move_photos(source, target, RunOptions(workers=2, use_index=False))
+
+    assert (target / "2024" / "01" / "2024-01-01T10_00_00-000001.jpg").read_bytes() == b"a"
+
+
+def test_progress_bar_is_closed_when_a_move_fails(tmp_path, write, monkeypatch):
+    class RecordingProgress(_Progress):
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    class RecordingReporter(Reporter):
+        def progress(self, label=None, position=None):
+            self.bar = RecordingProgress()
+            return self.bar
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk gone")
+
+    source = tmp_path / "src"
+    write(source / "2024-01-01T10_00_00-000001.jpg", b"a")
+    monkeypatch.setattr(pipeline, "transfer_file", fail)
+    reporter = RecordingReporter()
+
+    with pytest.raises(RuntimeError, match="disk gone"):
+        move_photos(source, tmp_path / "dst", workers=2, reporter=reporter)
+    assert reporter.bar.closed
@@ -0,0 +1,38 @@
+import pytest
+
+from bulk_photo_processor.bulk_photo_renamer import renamed_file_name
+from bulk_photo_processor.patterns import FilenameRecogniser, SAMPLE_NAMES, benchmark, sample_names
+
+
+@pytest.mark.parametrize("file_name, expected", [
+    ("20240101_120000.jpg", "2024-01-01T12_00_00-000007.jpg"),
+    ("20240101_120000_HDR.JPG", "2024-01-01T12_00_00-000007.jpg"),
+    ("IMG_20240101_120000.jpg", "2024-01-01T12_00_00-000007.jpg"),
+    ("PXL_20240101_120000123.MP.jpg", "2024-01-01T12_00_00-000007.jpg"),
+    ("Screenshot_20240101-120000.png", "2024-01-01T12_00_00-000007.png"),
+    ("VID-20240101-WA0003.mp4", "2024-01-01T00_00_00-000007.mp4"),
+    ("signal-2024-01-01-12-00-00.jpg", "2024-01-01T12_00_00-000007.jpg"),
+    ("2024-01-01T12_00_00-000001.jpg", None),
+    ("DSC01234.JPG", None),
+    ("20240101_120000", None),
+])
+def test_renamed_file_name_knows_phone_conventions(file_name, expected):
+    assert renamed_file_name(file_name, 7) == expected
+
+
+def test_added_convention_is_matched_after_the_builtin_ones():
+    recogniser = FilenameRecogniser()
+    recogniser.add("gopro", r"GX(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})")
+
+    assert recogniser.match("GX20240105.MP4") == ("gopro", ("2024", "01", "05", "00", "00", "00"))
+    assert recogniser.match("IMG_20240101_120000.jpg")[0] == "android"
+    with pytest.raises(ValueError):
+        recogniser.add("broken", r"X(?P<when>\d+)")
+    assert recogniser.match("GX20240105.MP4")  # the table is unchanged after a rejected convention
+
+
+def test_benchmark_covers_every_sample_kind():
+    names = sample_names(len(SAMPLE_NAMES) * 2)
+    recognised = {FilenameRecogniser().match(name) is not None for name in names}
+    assert recognised == {True, False}
+    assert [result["method"] for result in benchmark(names, repeat=1)] == ["combined", "one-by-one"]
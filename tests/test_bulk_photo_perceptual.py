@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from bulk_photo_processor.perceptual import MultiIndexHash, hamming
+
+
+def test_multi_index_hash_search_matches_brute_force():
+    rng = random.Random(42)
+    hashes = [rng.getrandbits(64) for _ in range(2000)]
+    index = MultiIndexHash()
+    for number, value in enumerate(hashes):
+        index.add(value, number)
+
+    query = hashes[123] ^ 0b1011  # three bits away from a stored hash
+    expected = sorted((hamming(query, value), number) for number, value in enumerate(hashes)
+                      if hamming(query, value) <= 6)
+
+    assert len(index) == 2000
+    assert sorted(index.search(query, 6)) == expected
+    assert index.search(query, 6)[0] == (3, 123)
+
+    # Radii of 8 and more probe two flipped bits per chunk
+    far = hashes[7] ^ 0xFF00000000000001
+    assert [number for _, number in index.search(far, 9)] == [7]
+
+
+def test_move_photos_flags_resized_copy_as_near_duplicate(tmp_path, capsys):
+    np = pytest.importorskip("numpy")
+    Image = pytest.importorskip("PIL.Image")
+    from bulk_photo_processor.bulk_photo_mover import move_photos
+
+    source = tmp_path / "src"
+    target = tmp_path / "dst" / "2024" / "01"
+    source.mkdir()
+    target.mkdir(parents=True)
+    gradient = np.add.outer(np.arange(256), np.arange(256) * 2 % 256).astype(np.uint8)
+    Image.fromarray(gradient).save(target / "2024-01-01T12_00_00-000001.jpg", quality=95)
+    Image.fromarray(gradient).resize((128, 128)).save(source / "2024-01-05T08_00_00-000001.jpg", quality=60)
+
+    move_photos(source, tmp_path / "dst", near_duplicates=6)
+
+    output = capsys.readouterr().out
+    assert "Near-duplicate of" in output
+    assert "Near-duplicates flagged: 1" in output
+    assert (target / "2024-01-05T08_00_00-000001.jpg").exists()
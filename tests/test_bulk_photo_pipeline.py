@@ -0,0 +1,96 @@
+import pytest
+
+from bulk_photo_processor.bulk_photo_processor import process_photos
+from bulk_photo_processor.bulk_photo_renamer import rename_photos
+from bulk_photo_processor.journal import JOURNAL_FILE_NAME
+from bulk_photo_processor.pipeline import run_pipeline
+from bulk_photo_processor.reporting import Reporter
+
+
+def test_pipeline_renames_and_moves_in_one_pass(tmp_path):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    (source / "DCIM" / "A").mkdir(parents=True)
+    (source / "DCIM" / "B").mkdir(parents=True)
+    # Numbered in scan order: this folder, then subfolders by name
+    (source / "20240101_120000.jpg").write_bytes(b"a")
+    (source / "2024-03-01T08_00_00-000007.jpg").write_bytes(b"c")
+    (source / "DCIM" / "A" / "20240104_120000.txt").write_bytes(b"t")
+    (source / "DCIM" / "B" / "20240102_120000.jpg").write_bytes(b"b")
+    (target / "2024" / "01").mkdir(parents=True)
+    (target / "2024" / "01" / "2024-01-01T12_00_00-000001.jpg").write_bytes(b"x")
+    (target / "2024" / "01" / "2024-01-02T12_00_00-000003.jpg").write_bytes(b"b")
+
+    process_photos(source, target, test_mode=False, verbose=False, use_index=False, recursive=True, workers=2)
+
+    assert sorted(p.relative_to(target).as_posix() for p in target.rglob("*.jpg")) == [
+        "2024/01/2024-01-01T12_00_00-000001.jpg",
+        "2024/01/2024-01-01T12_00_00-000001_01.jpg",
+        "2024/01/2024-01-02T12_00_00-000003.jpg",
+        "2024/03/2024-03-01T08_00_00-000007.jpg",
+    ]
+    assert (target / "2024" / "01" / "2024-01-01T12_00_00-000001_01.jpg").read_bytes() == b"a"
+    # Duplicates stay behind untouched; names with no destination are renamed in place
+    assert sorted(p.relative_to(source).as_posix() for p in source.rglob("*.*")) == [
+        "DCIM/A/2024-01-04T12_00_00-000002.txt", "DCIM/B/20240102_120000.jpg",
+    ]
+    assert not (source / JOURNAL_FILE_NAME).exists()
+
+
+def test_pipeline_failure_keeps_the_journal(tmp_path):
+    source = tmp_path / "src"
+    source.mkdir()
+    (source / "20240101_120000.txt").write_bytes(b"t")
+    (source / "2024-01-01T12_00_00-000001.txt").write_bytes(b"u")
+
+    with pytest.raises(RuntimeError, match="already exists"):
+        process_photos(source, tmp_path / "dst", test_mode=False, verbose=False, use_index=False)
+
+    assert (source / JOURNAL_FILE_NAME).exists()
+
+
+def test_pipeline_keeps_source_and_skips_it_when_run_again(tmp_path):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    source.mkdir()
+    (source / "20240101_120000.jpg").write_bytes(b"a")
+    (source / "20240101_120000(1).jpg").write_bytes(b"burst")
+    (source / "20240102_120000.txt").write_bytes(b"t")
+
+    first = process_photos(source, target, test_mode=False, verbose=False, link_mode="hardlink")
+    (source / "20240103_120000.jpg").write_bytes(b"new")
+    second = process_photos(source, target, test_mode=False, verbose=False, link_mode="hardlink")
+
+    assert sorted(p.name for p in source.iterdir()) == [
+        "20240101_120000(1).jpg", "20240101_120000.jpg", "20240102_120000.txt", "20240103_120000.jpg",
+    ]
+    assert (first["moved"], second["moved"], second["skipped"]) == (2, 1, 2)
+    assert len(list(target.rglob("*.jpg"))) == 3
+
+
+@pytest.mark.parametrize("mode", ["full", "move-only"])
+def test_test_mode_pipeline_handles_collisions_without_writing(tmp_path, write, mode):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    write(source / "a" / "2024-01-01T12_00_00-000001.jpg", b"1")
+    write(source / "b" / "2024-01-01T12_00_00-000001.jpg", b"2")
+
+    counts = run_pipeline(source, target, test_mode=True, recursive=True, mode=mode, reporter=Reporter())
+
+    assert (counts["moved"], counts["skipped"]) == (2, 0)
+    assert not target.exists() or not any(target.iterdir())
+
+
+def test_rename_photos_renames_in_place_through_the_pipeline(tmp_path, write):
+    write(tmp_path / "20240101_120000.jpg", b"a")
+    write(tmp_path / "DCIM" / "IMG_20240102_120000.jpg", b"b")
+    write(tmp_path / "notes.txt", b"n")
+
+    counts = rename_photos(tmp_path, recursive=True, reporter=Reporter())
+
+    assert (counts["processed"], counts["renamed"], counts["moved"]) == (2, 2, 0)
+    assert sorted(str(p.relative_to(tmp_path)) for p in tmp_path.rglob("*") if p.is_file()) == [
+        "2024-01-01T12_00_00-000001.jpg",
+        "DCIM/2024-01-02T12_00_00-000002.jpg",
+        "notes.txt",
+    ]
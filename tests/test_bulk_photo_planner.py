@@ -0,0 +1,64 @@
+import json
+
+from bulk_photo_processor.planner import apply_plan, plan_photos
+from bulk_photo_processor.reporting import Reporter
+
+
+def test_plan_then_apply_full_pipeline(tmp_path):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    source.mkdir()
+    (source / "20240101_120000.jpg").write_bytes(b"a")
+    (source / "20240102_120000.JPG").write_bytes(b"b")
+    plan_file = tmp_path / "plan.jsonl"
+
+    counts = plan_photos(source, target, plan_file, use_index=False)
+
+    assert counts == {"rename": 0, "move": 2, "skip": 0}
+    assert (source / "20240101_120000.jpg").exists()
+    operations = [json.loads(line) for line in plan_file.read_text().splitlines()[1:]]
+    assert sorted(op["dst"].rsplit("-", 1)[1] for op in operations) == ["000001.jpg", "000002.jpg"]
+
+    assert apply_plan(plan_file, workers=2) == {"moved": 2}
+    assert not any(source.iterdir())
+    assert len(list((target / "2024" / "01").iterdir())) == 2
+
+    # Re-running a plan is harmless
+    assert apply_plan(plan_file) == {"already-applied": 2}
+
+
+def test_journal_resume_settles_interrupted_move(tmp_path):
+    from bulk_photo_processor.journal import Journal
+
+    source = tmp_path / "a.jpg"
+    destination = tmp_path / "b.jpg"
+    source.write_bytes(b"a")
+    journal_path = tmp_path / "run.journal"
+
+    journal = Journal(journal_path)
+    journal.commit(journal.begin("rename", tmp_path / "x", tmp_path / "y", sequence=7))
+    journal.begin("move", source, destination)
+    source.rename(destination)
+    journal.close()  # crash before the commit
+
+    resumed = Journal(journal_path, resume=True)
+    assert resumed.last_sequence == 7
+    assert len(resumed.committed) == 2
+    resumed.close(remove=True)
+    assert not journal_path.exists()
+
+
+def test_plan_gives_same_named_photos_collision_names(tmp_path):
+    source = tmp_path / "src"
+    for folder, data in (("a", b"1"), ("b", b"2")):
+        (source / folder).mkdir(parents=True)
+        (source / folder / "2024-01-01T12_00_00-000001.jpg").write_bytes(data)
+    plan_file = tmp_path / "plan.jsonl"
+
+    assert plan_photos(source, tmp_path / "dst", plan_file, mode="move-only", recursive=True, use_index=False,
+                       reporter=Reporter()) == {"rename": 0, "move": 2, "skip": 0}
+    operations = [json.loads(line) for line in plan_file.read_text().splitlines()[1:]]
+    assert [op["dst"].rsplit("/", 1)[1] for op in operations] == [
+        "2024-01-01T12_00_00-000001.jpg",
+        "2024-01-01T12_00_00-000001_01.jpg",
+    ]
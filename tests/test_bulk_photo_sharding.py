@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bulk_photo_processor.api import PhotoPipeline
+from bulk_photo_processor.sharding import SEQUENCE_SPACE, Shard, parse_shard
+
+
+def test_shards_partition_names():
+    names = [f"IMG_{number:04}.JPG" for number in range(500)]
+    shards = [Shard(index, 4) for index in range(1, 5)]
+    owners = [[shard for shard in shards if shard.owns(name)] for name in names]
+    assert all(len(owner) == 1 for owner in owners)
+    assert all(any(shard.owns(name) for name in names) for shard in shards)
+    # Names that only differ in case stay together
+    assert Shard(1, 4).owns("a.jpg") == Shard(1, 4).owns("A.JPG")
+
+
+def test_sequence_numbers_do_not_overlap():
+    shards = [Shard(index, 3) for index in range(1, 4)]
+    numbers = []
+    for shard in shards:
+        sequence = 0
+        for _ in range(100):
+            sequence = shard.next_sequence(sequence)
+            numbers.append(sequence)
+            # A name renamed by a shard stays in that shard
+            assert shard.owns(f"2024-01-01T10_00_00-{sequence:06}.jpg")
+    assert sorted(numbers) == list(range(1, 301))
+    assert all(shard.last_sequence <= SEQUENCE_SPACE for shard in shards)
+    with pytest.raises(RuntimeError):
+        shards[0].next_sequence(shards[0].last_sequence)
+
+
+def test_parse_shard():
+    assert parse_shard(None) is None
+    assert str(parse_shard(" 2/5 ")) == "2/5"
+    for text in ("0/3", "4/3", "1-3", "x"):
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+def test_shards_split_one_import(tmp_path, write):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    for number in range(200):
+        write(source / f"2024{number % 12 + 1:02}01_10{number // 60:02}{number % 60:02}.jpg", bytes([number]))
+
+    # Both shards run at once on the same source, as two processes would
+    with ThreadPoolExecutor(2) as pool:
+        runs = [pool.submit(PhotoPipeline(source, target, shard=f"{index}/2").run) for index in (1, 2)]
+        moved = [run.result()["moved"] for run in runs]
+
+    assert sum(moved) == 200
+    assert all(moved)
+    assert not list(source.glob("*.jpg"))
+    sequences = {path.name.split("-")[-1] for path in target.rglob("*.jpg")}
+    assert len(sequences) == 200
@@ -0,0 +1,47 @@
+import sqlite3
+
+from bulk_photo_processor.hashing import calculate_checksum
+from bulk_photo_processor.target_index import INDEX_FILE_NAME, TargetIndex
+
+
+def _stored(root):
+    with sqlite3.connect(root / INDEX_FILE_NAME) as conn:
+        return conn.execute("SELECT COUNT(*) FROM checksums").fetchone()[0]
+
+
+def test_target_index_reuses_checksum_until_file_changes(tmp_path, write):
+    calls = []
+
+    def counting_checksum(path, algorithm):
+        calls.append(path)
+        return calculate_checksum(path, algorithm)
+
+    photo = write(tmp_path / "2024" / "01" / "a.jpg", b"one")
+    with TargetIndex(tmp_path, counting_checksum) as index:
+        first = index.checksum(photo)
+        assert index.checksum(photo) == first
+        assert len(calls) == 1
+
+        photo.write_bytes(b"changed")
+        assert index.checksum(photo) != first
+        assert len(calls) == 2
+
+
+def test_deferred_records_are_written_together(tmp_path):
+    files = []
+    for number in range(3):
+        files.append(tmp_path / f"{number}.jpg")
+        files[-1].write_bytes(bytes([number]))
+
+    with TargetIndex(tmp_path) as index:
+        with index.deferred():
+            for number, path in enumerate(files):
+                index.record(path, f"digest-{number}")
+            # Buffered, but already answered from memory
+            assert _stored(tmp_path) == 0
+            assert index.lookup(files[1]) == "digest-1"
+        assert _stored(tmp_path) == 3
+
+        index.record_many([(path, "other", None) for path in files], "sha1")
+        assert index.lookup(files[2], "sha1") == "other"
+    assert _stored(tmp_path) == 6
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from bulk_photo_processor import thumbnails
+from bulk_photo_processor.bulk_photo_mover import move_photos
+from bulk_photo_processor.metrics import RunMetrics
+from bulk_photo_processor.thumbnails import (QUEUED_PER_WORKER, THUMBNAIL_DIR_NAME, THUMBNAIL_EXTENSIONS,
+                                             ThumbnailCache, evict_thumbnails)
+
+
+def _photo(path, color, size=(640, 480)):
+    Image = pytest.importorskip("PIL.Image")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path, "JPEG")
+    return path
+
+
+def test_move_photos_builds_thumbnails_once(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    _photo(source / "2024-01-01T10_00_00-000001.jpg", "red")
+    _photo(source / "2024-01-02T10_00_00-000002.jpg", "blue")
+    metrics = RunMetrics()
+
+    move_photos(source, target, thumbnails=64, metrics=metrics)
+
+    thumbnails = sorted((target / THUMBNAIL_DIR_NAME).rglob("*.jpg"))
+    assert len(thumbnails) == 2
+    with Image.open(thumbnails[0]) as image:
+        assert max(image.size) == 64
+    assert metrics.report()["counters"]["thumbnails"] == 2
+    # The cache is not mistaken for photos of the archive
+    assert len(list((target / "2024").rglob("*.jpg"))) == 2
+
+    photo = target / "2024" / "01" / "2024-01-02T10_00_00-000002.jpg"
+    metrics = RunMetrics()
+    with ThumbnailCache(target, 64, workers=1, metrics=metrics) as cache:
+        assert cache.lookup(photo) in thumbnails
+        cache.submit(photo)
+    assert metrics.report()["counters"] == {"thumbnails_cached": 1}
+
+    # A photo that changed is not matched with its old thumbnail
+    os.utime(photo, ns=(0, 0))
+    with ThumbnailCache(target, 64, workers=1) as cache:
+        assert cache.lookup(photo) is None
+
+
+def test_heic_thumbnails_need_the_heif_plugin():
+    try:
+        import pillow_heif  # noqa: F401
+    except ImportError:
+        assert ".heic" not in THUMBNAIL_EXTENSIONS
+    else:
+        assert ".heic" in THUMBNAIL_EXTENSIONS
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    for number in range(4):
+        thumbnail = tmp_path / "256" / "ab" / f"{number}.jpg"
+        thumbnail.parent.mkdir(parents=True, exist_ok=True)
+        thumbnail.write_bytes(b"x" * 100)
+        os.utime(thumbnail, ns=(number * 10**9, number * 10**9))
+
+    assert evict_thumbnails(tmp_path, 250) == (200, 2)
+    assert sorted(path.name for path in tmp_path.rglob("*.jpg")) == ["2.jpg", "3.jpg"]
+
+
+def test_cache_tracks_its_size_without_rescanning(tmp_path, monkeypatch):
+    target = tmp_path / "dst"
+    photos = [_photo(target / "2024" / "01" / f"{number}.jpg", color) for number, color in enumerate(("red", "blue"))]
+    with ThumbnailCache(target, 64, workers=1) as cache:
+        for photo in photos:
+            cache.submit(photo)
+    first, second = (cache.lookup(photo) for photo in photos)
+    os.utime(first, ns=(10**9, 10**9))
+    os.utime(second, ns=(2 * 10**9, 2 * 10**9))
+    # Room for about three thumbnails, trimmed back to two
+    limit = int((first.stat().st_size + second.stat().st_size) * 1.4)
+
+    third = _photo(target / "2024" / "01" / "2.jpg", "green")
+    metrics = RunMetrics()
+    # Within the limit when opened, so only scanned once
+    with ThumbnailCache(target, 64, limit=limit, workers=1, metrics=metrics) as cache:
+        monkeypatch.setattr(thumbnails, "scan_thumbnails", None)
+        cache.submit(photos[0])  # a hit: now the most recently used
+        cache.submit(third)
+
+    assert metrics.report()["counters"]["thumbnails_evicted"] == 1
+    assert cache.lookup(photos[1]) is None
+    assert cache.lookup(photos[0]) and cache.lookup(third)
+    assert cache._size == sum(path.stat().st_size for path in (first, cache.lookup(third)))
+    # Every queued photo gave back its slot
+    assert cache._queued._value == QUEUED_PER_WORKER
@@ -0,0 +1,111 @@
+import errno
+
+import pytest
+
+from bulk_photo_processor import transfer
+from bulk_photo_processor.hashing import calculate_checksum
+from bulk_photo_processor.transfer import copy_file
+
+
+def cross_device_rename(source, destination):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+def test_copy_file_hashes_while_copying(tmp_path, write):
+    source = write(tmp_path / "a.mp4", bytes(range(256)) * 4000)
+    destination = tmp_path / "out" / "a.mp4"
+    destination.parent.mkdir()
+
+    assert copy_file(source, destination, "sha1") == calculate_checksum(source, "sha1")
+    assert copy_file(source, tmp_path / "out" / "b.mp4") is None
+    assert (tmp_path / "out" / "b.mp4").read_bytes() == source.read_bytes()
+    assert sorted(p.name for p in destination.parent.iterdir()) == ["a.mp4", "b.mp4"]
+
+
+def test_move_across_devices_syncs_the_destination_before_removing_the_source(tmp_path, write, monkeypatch):
+    source = write(tmp_path / "a.jpg", b"photo")
+    destination = tmp_path / "out" / "a.jpg"
+    destination.parent.mkdir()
+    synced = []
+    monkeypatch.setattr(transfer.os, "rename", cross_device_rename)
+    monkeypatch.setattr(transfer, "fsync_path", lambda path: synced.append((path, source.exists())))
+
+    transfer.move_file(source, destination)
+    assert synced == []
+
+    source = write(tmp_path / "a.jpg", b"photo")
+    destination.unlink()
+    transfer.move_file(source, destination, sync=True)
+    assert synced == [(destination.parent, True)]
+    assert not source.exists()
+    assert destination.read_bytes() == b"photo"
+
+
+def test_move_across_devices_verifies_the_copy_and_keeps_the_source_on_mismatch(tmp_path, write, monkeypatch):
+    source = write(tmp_path / "a.jpg", b"photo")
+    destination = tmp_path / "out" / "a.jpg"
+    destination.parent.mkdir()
+    monkeypatch.setattr(transfer.os, "rename", cross_device_rename)
+
+    assert transfer.move_file(source, destination, "sha1") == calculate_checksum(destination, "sha1")
+    assert not source.exists()
+
+    # The copy reads back differently
+    source = write(tmp_path / "b.jpg", b"photo")
+    monkeypatch.setattr(transfer, "calculate_checksum", lambda path, algorithm: "corrupt")
+    with pytest.raises(RuntimeError, match="the copy differs"):
+        transfer.move_file(source, destination.with_name("b.jpg"))
+    assert source.read_bytes() == b"photo"
+    assert sorted(p.name for p in destination.parent.iterdir()) == ["a.jpg"]
+
+    # Writing the copy fails halfway: the partial file goes too
+    def failing_fsync(fd):
+        raise OSError(errno.EIO, "I/O error")
+
+    monkeypatch.setattr(transfer.os, "fsync", failing_fsync)
+    with pytest.raises(OSError):
+        transfer.move_file(source, destination.with_name("b.jpg"))
+    assert source.read_bytes() == b"photo"
+    assert sorted(p.name for p in destination.parent.iterdir()) == ["a.jpg"]
+
+
+def test_move_across_devices_rejects_a_source_that_differs_from_its_checksum(tmp_path, write, monkeypatch):
+    source = write(tmp_path / "a.jpg", b"edited photo")
+    destination = tmp_path / "out" / "a.jpg"
+    destination.parent.mkdir()
+    monkeypatch.setattr(transfer.os, "rename", cross_device_rename)
+
+    with pytest.raises(RuntimeError, match="the source changed"):
+        transfer.move_file(source, destination, "sha1", "0" * 40)
+    assert source.exists()
+    assert not destination.exists()
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "reflink"])
+def test_transfer_falls_back_to_a_verified_copy_when_files_cannot_share_data(tmp_path, write, monkeypatch, mode):
+    source = write(tmp_path / "a.jpg", b"photo")
+    destination = tmp_path / "out" / "a.jpg"
+    destination.parent.mkdir()
+
+    def cannot_share(*args):
+        raise OSError(errno.EXDEV if mode == "hardlink" else errno.EOPNOTSUPP, "cannot share data")
+
+    monkeypatch.setattr(transfer.os, "link", cannot_share)
+    monkeypatch.setattr(transfer, "reflink_file", cannot_share)
+
+    assert transfer.transfer_file(source, destination, mode, "sha1") == calculate_checksum(source, "sha1")
+    assert source.read_bytes() == destination.read_bytes() == b"photo"
+    assert destination.stat().st_ino != source.stat().st_ino
+    assert sorted(p.name for p in destination.parent.iterdir()) == ["a.jpg"]
+
+
+def test_transfer_raises_link_errors_that_a_copy_would_not_fix(tmp_path, write, monkeypatch):
+    source = write(tmp_path / "a.jpg", b"photo")
+
+    def denied(*args):
+        raise OSError(errno.EACCES, "Permission denied")
+
+    monkeypatch.setattr(transfer.os, "link", denied)
+    with pytest.raises(PermissionError):
+        transfer.transfer_file(source, tmp_path / "b.jpg", "hardlink")
+    assert not (tmp_path / "b.jpg").exists()
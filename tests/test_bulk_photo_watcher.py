@@ -0,0 +1,57 @@
+from bulk_photo_processor import bulk_photo_processor
+from bulk_photo_processor.bulk_photo_processor import watch_photos
+from bulk_photo_processor.reporting import Reporter
+from bulk_photo_processor.watcher import watch_files
+
+
+def test_polling_yields_files_once_they_stop_changing(tmp_path):
+    (tmp_path / "20240101_120000.jpg").write_bytes(b"a")
+
+    arrivals = watch_files(tmp_path, poll_interval=0.01)
+    try:
+        assert next(arrivals) == tmp_path / "20240101_120000.jpg"
+        (tmp_path / "20240102_120000.jpg").write_bytes(b"b")
+        assert next(arrivals) == tmp_path / "20240102_120000.jpg"
+    finally:
+        arrivals.close()
+
+
+def test_watch_photos_renames_and_moves_each_arrival(tmp_path, monkeypatch):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    source.mkdir()
+    (source / "20240101_120000.jpg").write_bytes(b"a")
+    (source / "notes.txt").write_bytes(b"n")
+    (target / "2024" / "01").mkdir(parents=True)
+    (target / "2024" / "01" / "2024-01-02T12_00_00-000002.jpg").write_bytes(b"b")
+    (source / "20240102_120000.jpg").write_bytes(b"b")
+
+    batches = [[source / "20240101_120000.jpg", source / "notes.txt"], [source / "20240102_120000.jpg"]]
+    monkeypatch.setattr(bulk_photo_processor, "watch_batches", lambda *args: (batch for batch in batches))
+
+    counts = watch_photos(source, target, use_index=False, reporter=Reporter())
+
+    # Sequence numbers carry on from one batch to the next
+    assert counts == {"processed": 2, "renamed": 1, "moved": 1, "skipped": 1, "near_duplicates": 0}
+    assert (target / "2024" / "01" / "2024-01-01T12_00_00-000001.jpg").read_bytes() == b"a"
+    assert sorted(p.name for p in source.iterdir()) == ["20240102_120000.jpg", "notes.txt"]
+
+
+def test_watch_photos_keeps_one_destination_view(tmp_path, monkeypatch):
+    source = tmp_path / "src"
+    target = tmp_path / "dst"
+    source.mkdir()
+    batches = []
+    for number in range(4):
+        photo = source / f"2024-01-01T12_00_0{number}-00000{number + 1}.jpg"
+        photo.write_bytes(bytes([number]))
+        batches.append([photo])
+    monkeypatch.setattr(bulk_photo_processor, "watch_batches", lambda *args: (batch for batch in batches))
+
+    counts = watch_photos(source, target, mode="move-only", max_entries=2, durability="strict",
+                          reporter=Reporter())
+
+    # The folder fills up across arrivals, so later photos go to a per-day folder
+    assert counts["moved"] == 4
+    assert len(list((target / "2024" / "01").glob("*.jpg"))) == 2
+    assert len(list((target / "2024" / "01" / "01").glob("*.jpg"))) == 2